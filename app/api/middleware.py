@@ -0,0 +1,110 @@
+"""ASGI 中间件"""
+from __future__ import annotations
+
+import time
+from urllib.parse import parse_qsl
+
+from starlette.routing import Mount
+
+from app.services.metrics import HTTP_DURATION, HTTP_REQUESTS
+from app.services.profiler import CURRENT_PROFILE, ProfileSession, save_profile
+
+
+def _route_label(scope) -> str:
+    route = scope.get("route")
+    template = getattr(route, "path", None)
+    if not template:
+        return "unmatched"
+    # 挂在子路由下的 route.path 不含前缀；没有路径参数时请求路径本身就是完整的路由模板
+    if "{" not in template and not isinstance(route, Mount):
+        return scope.get("path", template)
+    return template
+
+
+class MetricsMiddleware:
+    """
+    记录每个路由的请求数与耗时
+
+    route 标签使用路由模板（例如 /api/metadata/manifest），未匹配任何路由的请求统一记为 "unmatched"，
+    避免任意路径导致标签基数膨胀。实现为纯 ASGI 中间件，不包装请求 / 响应对象。
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            method = scope.get("method", "")
+            route = _route_label(scope)
+            HTTP_REQUESTS.inc(1, method, route, str(status[0]))
+            HTTP_DURATION.observe(time.perf_counter() - started, method, route)
+
+
+_TRUTHY = {"1", "true", "yes", "on"}
+
+
+def _profile_requested(scope) -> bool:
+    path = scope.get("path", "")
+    if not path.startswith("/api/") or path.startswith("/api/profiles"):
+        return False
+    for name, value in scope.get("headers") or []:
+        if name == b"x-profile" and value.decode("latin-1").lower() in _TRUTHY:
+            return True
+    query = scope.get("query_string", b"").decode("latin-1")
+    return any(k == "profile" and v.lower() in _TRUTHY for k, v in parse_qsl(query))
+
+
+class ProfilingMiddleware:
+    """
+    对带 profile=1（或请求头 X-Profile: 1）的 /api 请求进行采样 profiling
+
+    采样在响应头发出时结束并保存，响应头中带上 X-Profile-Id（通过 /api/profiles/{id} 查看或导出）。
+    流式响应在响应头发出之后的部分不计入。
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not _profile_requested(scope):
+            await self.app(scope, receive, send)
+            return
+
+        session = ProfileSession(f"{scope.get('method', '')} {scope.get('path', '')}")
+        token = CURRENT_PROFILE.set(session)
+        session.start()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and session.started and not session.elapsed:
+                session.stop()
+                summary = save_profile(session, {
+                    "method": scope.get("method", ""),
+                    "path": scope.get("path", ""),
+                    "query": scope.get("query_string", b"").decode("latin-1"),
+                    "status": message["status"],
+                })
+                headers = list(message.get("headers") or [])
+                headers.append((b"x-profile-id", summary["id"].encode("latin-1")))
+                headers.append((b"x-profile-samples", str(summary["samples"]).encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            session.stop()
+            CURRENT_PROFILE.reset(token)
@@ -0,0 +1,89 @@
+"""JSON 响应编码
+
+- 使用 json_utils.dumps_bytes 直接序列化（优先 orjson），绕过 FastAPI 默认的 jsonable_encoder
+- 根据 Accept-Encoding 协商压缩：zstd（安装 zstandard 时）优先，其次 gzip
+- 小于 RESPONSE_COMPRESS_MIN_BYTES 的响应不压缩
+"""
+from __future__ import annotations
+
+import gzip
+from typing import Any, AsyncIterator, Iterable, Iterator, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import Response, StreamingResponse
+
+from app.config import RESPONSE_COMPRESS_LEVEL, RESPONSE_COMPRESS_MIN_BYTES
+from app.services.executor import BLOCKING_EXECUTOR, run_blocking
+from app.services.json_utils import dumps_bytes
+from app.services.metrics import stage
+
+try:  # zstd 压缩为可选依赖
+    import zstandard  # type: ignore
+except Exception:  # pragma: no cover
+    zstandard = None
+
+
+def _accepted_encodings(accept_encoding: str) -> set:
+    encodings = set()
+    for part in (accept_encoding or "").split(","):
+        name, _, params = part.strip().partition(";")
+        # 忽略 q=0 的编码
+        if params.replace(" ", "").lower() in {"q=0", "q=0.0", "q=0.00", "q=0.000"}:
+            continue
+        if name:
+            encodings.add(name.strip().lower())
+    return encodings
+
+
+def encode_json(payload: Any, accept_encoding: str = "") -> Tuple[bytes, Optional[str]]:
+    """序列化并按 Accept-Encoding 压缩，返回 (body, content-encoding 或 None)"""
+    with stage("encode_serialize"):
+        body = dumps_bytes(payload)
+    if len(body) < RESPONSE_COMPRESS_MIN_BYTES:
+        return body, None
+    accepted = _accepted_encodings(accept_encoding)
+    if zstandard is not None and "zstd" in accepted:
+        with stage("encode_compress"):
+            return zstandard.ZstdCompressor(level=RESPONSE_COMPRESS_LEVEL).compress(body), "zstd"
+    if "gzip" in accepted:
+        with stage("encode_compress"):
+            return gzip.compress(body, compresslevel=min(9, max(1, RESPONSE_COMPRESS_LEVEL))), "gzip"
+    return body, None
+
+
+async def json_response(request: Optional[Request], payload: Any, status_code: int = 200) -> Response:
+    """在执行器中序列化、压缩 JSON 响应（大响应的编码同样是 CPU 密集操作）"""
+    accept_encoding = request.headers.get("accept-encoding", "") if request is not None else ""
+    body, encoding = await run_blocking("encode", encode_json, payload, accept_encoding)
+    headers = {"Vary": "Accept-Encoding"}
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, status_code=status_code, media_type="application/json", headers=headers)
+
+
+def _ndjson_lines(items: Iterable[Any], error_prefix: str) -> Iterator[bytes]:
+    try:
+        for item in items:
+            yield dumps_bytes(item) + b"\n"
+    except Exception as e:
+        # 响应头已经发出，只能在流末尾追加一行错误信息
+        yield dumps_bytes({"type": "error", "error": f"{error_prefix}: {e}"}) + b"\n"
+
+
+async def ndjson_response(op: str, items: Iterable[Any], error_prefix: str = "处理失败") -> StreamingResponse:
+    """
+    以 NDJSON（每行一个 JSON）流式返回
+
+    整个流占用执行器中 op 的一个并发名额，迭代在执行器的线程池中分批进行；
+    排队已满时直接抛出 503，不会先发出 200 响应头。
+    """
+    batches = await BLOCKING_EXECUTOR.stream(op, _ndjson_lines(items, error_prefix))
+
+    async def body() -> AsyncIterator[bytes]:
+        try:
+            async for lines in batches:
+                yield b"".join(lines)
+        finally:
+            batches.close()
+
+    return StreamingResponse(body(), media_type="application/x-ndjson")
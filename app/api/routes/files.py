@@ -1,23 +1,38 @@
-from fastapi import APIRouter, HTTPException, Query
-from pathlib import Path
+from typing import Optional
 
+from fastapi import APIRouter, HTTPException, Query, Request
+
+from app.api.responses import json_response, ndjson_response
 from app.security.path_safety import normalize_local_path
-from app.services.iceberg_parser import parse_avro_file, scan_metadata_directory, extract_table_metadata_info
-from app.services.json_utils import format_json, parse_json_file
+from app.services.iceberg_parser import (
+    extract_table_metadata_info,
+    get_snapshot_manifest_paths,
+    iter_avro_records,
+    read_avro_page,
+)
+from app.services.executor import BLOCKING_EXECUTOR, run_blocking
+from app.services.filesystem import metadata_dir_of, path_exists
+from app.services.json_utils import format_json
+from app.services.metadata_stream import read_metadata_header
+from app.services.parse_cache import PARSE_CACHE, cached_parse_avro_file, cached_parse_json_file
+from app.services.scan_state import scan_metadata_directory_incremental
 
 router = APIRouter()
 
 
 @router.get("/list-dir")
-async def list_directory(path: str = Query(..., description="表根目录路径 (Table Root)")):
+async def list_directory(
+    path: str = Query(..., description="表根目录路径 (Table Root)"),
+    mode: Optional[str] = Query(None, description="snapshot 解析模式: eager / parallel / lazy"),
+    since: Optional[str] = Query(None, description="上次返回的 token，只返回此后的变化"),
+):
     try:
         safe_dir = normalize_local_path(path)
 
         # CHANGED: accept table root, append /metadata unless already points to metadata
-        p = Path(safe_dir)
-        metadata_dir = p if p.name == "metadata" else (p / "metadata")
+        metadata_dir = metadata_dir_of(safe_dir)
 
-        result = scan_metadata_directory(str(metadata_dir))
+        result = await run_blocking("scan", scan_metadata_directory_incremental, metadata_dir, mode=mode, since=since)
         if not result["success"]:
             raise HTTPException(status_code=400, detail=result["error"])
         return result
@@ -27,21 +42,51 @@ async def list_directory(path: str = Query(..., description="表根目录路径
         raise HTTPException(status_code=500, detail=f"扫描目录失败: {str(e)}")
 
 
+@router.get("/snapshot-manifests")
+async def list_snapshot_manifests(file_path: str = Query(..., description="Snapshot Avro 文件路径")):
+    """lazy 扫描模式下按需获取单个 snapshot 的 manifest_paths"""
+    try:
+        safe_path = normalize_local_path(file_path)
+        if not await run_blocking("avro", path_exists, safe_path):
+            raise HTTPException(status_code=404, detail=f"文件不存在: {file_path}")
+        manifest_paths = await run_blocking("avro", get_snapshot_manifest_paths, safe_path)
+        return {"success": True, "path": safe_path, "manifest_paths": manifest_paths}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"解析 Snapshot 文件失败: {str(e)}")
+
+
 @router.get("/avro")
 async def parse_avro(
+    request: Request,
     file_path: str = Query(..., description="Avro 文件路径"),
-    formatted: bool = Query(True, description="是否格式化输出"),
+    formatted: bool = Query(False, description="是否额外返回格式化后的字符串"),
+    offset: int = Query(0, ge=0, description="分页起始记录下标"),
+    limit: Optional[int] = Query(None, ge=1, le=10000, description="分页大小；不传则返回整个文件"),
+    stream: bool = Query(False, description="以 NDJSON 流式返回记录（每行一条）"),
 ):
     try:
         safe_path = normalize_local_path(file_path)
-        result = parse_avro_file(safe_path)
+
+        if stream:
+            if not await run_blocking("avro", path_exists, safe_path):
+                raise HTTPException(status_code=400, detail=f"文件不存在: {file_path}")
+            return await ndjson_response("avro", iter_avro_records(safe_path, offset, limit), "解析 Avro 失败")
+
+        if limit is not None or offset:
+            result = await run_blocking("avro", read_avro_page, safe_path, offset, limit or 100)
+        else:
+            result = await run_blocking("avro", cached_parse_avro_file, safe_path)
         if not result["success"]:
             raise HTTPException(status_code=400, detail=result["error"])
 
         response_data = {"success": True, "data": result["data"], "raw_output": result["raw_output"]}
+        if "has_more" in result:
+            response_data.update(offset=result["offset"], limit=result["limit"], has_more=result["has_more"])
         if formatted and result["data"]:
-            response_data["formatted"] = format_json(result["data"])
-        return response_data
+            response_data["formatted"] = await run_blocking("format", format_json, result["data"])
+        return await json_response(request, response_data)
     except HTTPException:
         raise
     except Exception as e:
@@ -50,16 +95,17 @@ async def parse_avro(
 
 @router.get("/json")
 async def get_json(
+    request: Request,
     file_path: str = Query(..., description="JSON 文件路径"),
-    formatted: bool = Query(True, description="是否格式化输出"),
+    formatted: bool = Query(False, description="是否额外返回格式化后的字符串"),
 ):
     try:
         safe_path = normalize_local_path(file_path)
-        data = parse_json_file(safe_path)
+        data = await run_blocking("json", cached_parse_json_file, safe_path)
         response_data = {"success": True, "data": data}
         if formatted:
-            response_data["formatted"] = format_json(data)
-        return response_data
+            response_data["formatted"] = await run_blocking("format", format_json, data)
+        return await json_response(request, response_data)
     except FileNotFoundError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except ValueError as e:
@@ -72,6 +118,7 @@ async def get_json(
 
 @router.get("/metadata-info")
 async def get_metadata_info_compat(
+    request: Request,
     file_path: str = Query(..., description="Metadata 文件路径"),
     file_type: str = Query("json", description="文件类型: json 或 avro"),
 ):
@@ -82,15 +129,19 @@ async def get_metadata_info_compat(
     try:
         safe_path = normalize_local_path(file_path)
         if file_type == "avro":
-            result = parse_avro_file(safe_path)
+            result = await run_blocking("avro", cached_parse_avro_file, safe_path)
             if not result["success"]:
                 raise HTTPException(status_code=400, detail=result["error"])
-            metadata_data = result["data"]
+            info = await run_blocking("avro", extract_table_metadata_info, result["data"])
         else:
-            metadata_data = parse_json_file(safe_path)
+            # 概览只需要表头与 snapshot 数量，不整体解析（可能很大的）snapshots 数组
+            header = await run_blocking("json", read_metadata_header, safe_path, True)
+            info = extract_table_metadata_info(header["header"])
+            info["snapshots"] = None
+            info["snapshots_count"] = header["counts"].get("snapshots", 0)
 
-        info = extract_table_metadata_info(metadata_data)
-        return {"success": True, "info": info, "formatted": format_json(info)}
+        formatted = await run_blocking("format", format_json, info)
+        return await json_response(request, {"success": True, "info": info, "formatted": formatted})
     except FileNotFoundError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except ValueError as e:
@@ -99,3 +150,15 @@ async def get_metadata_info_compat(
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"解析元数据失败: {str(e)}")
+
+
+@router.get("/cache-stats")
+async def get_cache_stats():
+    """解析结果缓存的命中/未命中/淘汰统计"""
+    return {"success": True, "stats": PARSE_CACHE.stats()}
+
+
+@router.get("/executor-stats")
+async def get_executor_stats():
+    """阻塞任务执行器各操作的并发、排队与拒绝统计"""
+    return {"success": True, "stats": BLOCKING_EXECUTOR.stats()}
@@ -0,0 +1,116 @@
+import json
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query, Request
+
+from app.api.responses import json_response
+from app.security.path_safety import normalize_local_path
+from app.services.executor import run_blocking
+from app.services.metadata_index import (
+    query_file_history,
+    query_index_summary,
+    query_partition_files,
+    query_partitions,
+    query_snapshots,
+    update_index,
+)
+
+router = APIRouter()
+
+
+async def _run(error_prefix: str, func, *args, **kwargs):
+    try:
+        return await run_blocking("index", func, *args, **kwargs)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"{error_prefix}: {str(e)}")
+
+
+async def _query(request: Request, error_prefix: str, func, *args, **kwargs):
+    result = await _run(error_prefix, func, *args, **kwargs)
+    return await json_response(request, {"success": True, **result})
+
+
+@router.post("/build")
+async def build_index(request: Request, path: str = Query(..., description="Metadata 目录路径")):
+    """增量更新索引：只处理新增/变化的 metadata.json 与尚未索引的 manifest"""
+    safe_path = normalize_local_path(path)
+    try:
+        result = await run_blocking("index", update_index, safe_path)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"更新索引失败: {str(e)}")
+    if not result["success"]:
+        raise HTTPException(status_code=400, detail=result["error"])
+    return await json_response(request, result)
+
+
+@router.get("/summary")
+async def get_index_summary(request: Request, path: str = Query(..., description="Metadata 目录路径")):
+    return await _query(request, "查询索引失败", query_index_summary, normalize_local_path(path))
+
+
+@router.get("/snapshots")
+async def get_indexed_snapshots(
+    request: Request,
+    path: str = Query(..., description="Metadata 目录路径"),
+    limit: int = Query(100, ge=1, le=10000),
+    offset: int = Query(0, ge=0),
+):
+    snapshots = await _run("查询 Snapshot 失败", query_snapshots, normalize_local_path(path), limit, offset)
+    return await json_response(
+        request, {"success": True, "snapshots": snapshots, "limit": limit, "offset": offset}
+    )
+
+
+@router.get("/files")
+async def get_indexed_files(
+    request: Request,
+    path: str = Query(..., description="Metadata 目录路径"),
+    partition: Optional[str] = Query(None, description='分区值 JSON，例如 {"dt": "2024-01-01"}'),
+    snapshot_id: Optional[int] = Query(None, description="Snapshot ID（默认当前 snapshot）"),
+    limit: int = Query(100, ge=1, le=10000),
+    offset: int = Query(0, ge=0),
+):
+    """某个 snapshot 中仍然有效的文件，可按分区过滤"""
+    safe_path = normalize_local_path(path)
+    partition_value = None
+    if partition is not None:
+        try:
+            partition_value = json.loads(partition)
+        except json.JSONDecodeError as e:
+            raise HTTPException(status_code=400, detail=f"partition 不是合法的 JSON: {e}")
+        if not isinstance(partition_value, dict):
+            raise HTTPException(status_code=400, detail="partition 必须是 JSON 对象")
+    return await _query(
+        request, "查询文件失败", query_partition_files, safe_path, partition_value, snapshot_id, limit, offset
+    )
+
+
+@router.get("/partitions")
+async def get_indexed_partitions(
+    request: Request,
+    path: str = Query(..., description="Metadata 目录路径"),
+    snapshot_id: Optional[int] = Query(None, description="Snapshot ID（默认当前 snapshot）"),
+    limit: int = Query(100, ge=1, le=10000),
+    offset: int = Query(0, ge=0),
+):
+    return await _query(
+        request, "查询分区失败", query_partitions, normalize_local_path(path), snapshot_id, limit, offset
+    )
+
+
+@router.get("/file")
+async def get_indexed_file(
+    request: Request,
+    path: str = Query(..., description="Metadata 目录路径"),
+    file_path: str = Query(..., description="数据文件路径"),
+):
+    """数据文件由哪个 snapshot 添加 / 删除，当前出现在哪些 snapshot 中"""
+    return await _query(request, "查询文件历史失败", query_file_history, normalize_local_path(path), file_path)
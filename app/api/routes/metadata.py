@@ -1,36 +1,48 @@
 from typing import Optional
 
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Request
 
+from app.api.responses import json_response, ndjson_response
 from app.security.path_safety import normalize_local_path
 from app.services.iceberg_parser import (
+    MANIFEST_LIST_SUMMARY_FIELDS,
     extract_current_snapshot_manifests,
     extract_manifest_info,
     extract_table_metadata_info,
-    parse_avro_file,
 )
-from app.services.json_utils import format_json, parse_json_file
+from app.services.column_metrics import read_manifest_metrics, table_schema
+from app.services.executor import run_blocking
+from app.services.filesystem import metadata_dir_of, table_root_of
+from app.services.json_utils import format_json
+from app.services.metadata_timeline import build_metadata_timeline
+from app.services.metadata_stream import ARRAY_KEYS, read_metadata_array, read_metadata_header
+from app.services.orphan_files import find_orphan_files, iter_orphan_files
+from app.services.parse_cache import cached_parse_avro_file, cached_parse_json_file
+from app.services.snapshot_diff import diff_snapshots, iter_snapshot_diff
+from app.services.snapshot_stats import aggregate_snapshot_stats, iter_snapshot_stats
 
 router = APIRouter()
 
 
 @router.get("/info")
 async def get_metadata_info(
+    request: Request,
     file_path: str = Query(..., description="Metadata 文件路径"),
     file_type: str = Query("json", description="文件类型: json 或 avro"),
 ):
     try:
         safe_path = normalize_local_path(file_path)
         if file_type == "avro":
-            result = parse_avro_file(safe_path)
+            result = await run_blocking("avro", cached_parse_avro_file, safe_path)
             if not result["success"]:
                 raise HTTPException(status_code=400, detail=result["error"])
             metadata_data = result["data"]
         else:
-            metadata_data = parse_json_file(safe_path)
+            metadata_data = await run_blocking("json", cached_parse_json_file, safe_path)
 
-        info = extract_table_metadata_info(metadata_data)
-        return {"success": True, "info": info, "formatted": format_json(info)}
+        info = await run_blocking("json", extract_table_metadata_info, metadata_data)
+        formatted = await run_blocking("format", format_json, info)
+        return await json_response(request, {"success": True, "info": info, "formatted": formatted})
     except FileNotFoundError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except ValueError as e:
@@ -41,13 +53,68 @@ async def get_metadata_info(
         raise HTTPException(status_code=500, detail=f"解析元数据失败: {str(e)}")
 
 
+@router.get("/header")
+async def get_metadata_header(
+    request: Request,
+    file_path: str = Query(..., description="Metadata JSON 文件路径"),
+    with_counts: bool = Query(False, description="是否返回 snapshots 等数组的长度（需要完整扫描一次文件）"),
+):
+    """只读取 metadata.json 的表头字段，不解析 snapshots / snapshot-log / metadata-log"""
+    try:
+        safe_path = normalize_local_path(file_path)
+        result = await run_blocking("json", read_metadata_header, safe_path, with_counts)
+        info = extract_table_metadata_info(result["header"])
+        info["snapshots"] = None
+        info["snapshots_count"] = (result["counts"] or {}).get("snapshots") if result["counts"] is not None else None
+        return await json_response(request, {"success": True, **result, "info": info})
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"读取 Metadata 表头失败: {str(e)}")
+
+
+@router.get("/entries")
+async def get_metadata_entries(
+    request: Request,
+    file_path: str = Query(..., description="Metadata JSON 文件路径"),
+    key: str = Query("snapshots", description=f"数组字段: {' / '.join(ARRAY_KEYS)}"),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=10000),
+    reverse: bool = Query(False, description="从最新的条目开始分页"),
+):
+    """分页读取 metadata.json 中的 snapshots / snapshot-log / metadata-log 等大数组"""
+    try:
+        safe_path = normalize_local_path(file_path)
+        result = await run_blocking("json", read_metadata_array, safe_path, key, offset, limit, reverse)
+        return await json_response(request, {"success": True, **result})
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"分页读取 Metadata 失败: {str(e)}")
+
+
 @router.get("/view")
-async def view_metadata(file_path: str = Query(..., description="Metadata JSON 文件路径")):
+async def view_metadata(
+    request: Request,
+    file_path: str = Query(..., description="Metadata JSON 文件路径"),
+    formatted: bool = Query(False, description="是否额外返回格式化后的字符串"),
+):
     try:
         safe_path = normalize_local_path(file_path)
-        metadata_data = parse_json_file(safe_path)
-        info = extract_table_metadata_info(metadata_data)
-        return {"success": True, "metadata": metadata_data, "info": info, "formatted": format_json(metadata_data)}
+        metadata_data = await run_blocking("json", cached_parse_json_file, safe_path)
+        info = await run_blocking("json", extract_table_metadata_info, metadata_data)
+        response_data = {"success": True, "metadata": metadata_data, "info": info}
+        if formatted:
+            response_data["formatted"] = await run_blocking("format", format_json, metadata_data)
+        return await json_response(request, response_data)
     except FileNotFoundError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except ValueError as e:
@@ -59,12 +126,16 @@ async def view_metadata(file_path: str = Query(..., description="Metadata JSON 
 
 
 @router.get("/current-manifests")
-async def get_current_manifests(file_path: str = Query(..., description="Metadata JSON 文件路径")):
+async def get_current_manifests(
+    request: Request,
+    file_path: str = Query(..., description="Metadata JSON 文件路径"),
+):
     try:
         safe_path = normalize_local_path(file_path)
-        metadata_data = parse_json_file(safe_path)
-        result = extract_current_snapshot_manifests(metadata_data)
-        return {"success": True, **result, "formatted": format_json(result)}
+        metadata_data = await run_blocking("json", cached_parse_json_file, safe_path)
+        result = await run_blocking("avro", extract_current_snapshot_manifests, metadata_data)
+        formatted = await run_blocking("format", format_json, result)
+        return await json_response(request, {"success": True, **result, "formatted": formatted})
     except FileNotFoundError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except ValueError as e:
@@ -76,10 +147,17 @@ async def get_current_manifests(file_path: str = Query(..., description="Metadat
 
 
 @router.get("/snapshot")
-async def view_snapshot(file_path: str = Query(..., description="Snapshot Avro 文件路径")):
+async def view_snapshot(
+    request: Request,
+    file_path: str = Query(..., description="Snapshot Avro 文件路径"),
+    formatted: bool = Query(False, description="是否额外返回格式化后的字符串"),
+    full: bool = Query(False, description="是否读取完整记录（包含 partitions 字段摘要）"),
+):
     try:
         safe_path = normalize_local_path(file_path)
-        result = parse_avro_file(safe_path)
+        # 默认只投影读取概览需要的字段，跳过 partitions field_summary 的解码
+        fields = None if full else MANIFEST_LIST_SUMMARY_FIELDS
+        result = await run_blocking("avro", cached_parse_avro_file, safe_path, fields=fields)
         if not result["success"]:
             raise HTTPException(status_code=400, detail=result["error"])
 
@@ -87,55 +165,25 @@ async def view_snapshot(file_path: str = Query(..., description="Snapshot Avro 
         snapshot_info = {}
         manifest_paths = []
 
-        if isinstance(snapshot_data, list):
-            for item in snapshot_data:
-                if isinstance(item, dict):
-                    manifest_path = item.get("manifest_path")
-                    if manifest_path:
-                        manifest_paths.append(manifest_path)
-                    if not snapshot_info:
-                        snapshot_info = {
-                            "manifest_path": manifest_path,
-                            "manifest_length": item.get("manifest_length"),
-                            "partition_spec_id": item.get("partition_spec_id"),
-                            "content": item.get("content"),
-                            "sequence_number": item.get("sequence_number"),
-                            "min_sequence_number": item.get("min_sequence_number"),
-                            "added_snapshot_id": item.get("added_snapshot_id"),
-                            "added_data_files_count": item.get("added_data_files_count"),
-                            "existing_data_files_count": item.get("existing_data_files_count"),
-                            "deleted_data_files_count": item.get("deleted_data_files_count"),
-                            "added_rows_count": item.get("added_rows_count"),
-                            "existing_rows_count": item.get("existing_rows_count"),
-                            "deleted_rows_count": item.get("deleted_rows_count"),
-                        }
-        elif isinstance(snapshot_data, dict):
-            manifest_path = snapshot_data.get("manifest_path")
+        items = snapshot_data if isinstance(snapshot_data, list) else [snapshot_data]
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            manifest_path = item.get("manifest_path")
             if manifest_path:
                 manifest_paths.append(manifest_path)
-            snapshot_info = {
-                "manifest_path": manifest_path,
-                "manifest_length": snapshot_data.get("manifest_length"),
-                "partition_spec_id": snapshot_data.get("partition_spec_id"),
-                "content": snapshot_data.get("content"),
-                "sequence_number": snapshot_data.get("sequence_number"),
-                "min_sequence_number": snapshot_data.get("min_sequence_number"),
-                "added_snapshot_id": snapshot_data.get("added_snapshot_id"),
-                "added_data_files_count": snapshot_data.get("added_data_files_count"),
-                "existing_data_files_count": snapshot_data.get("existing_data_files_count"),
-                "deleted_data_files_count": snapshot_data.get("deleted_data_files_count"),
-                "added_rows_count": snapshot_data.get("added_rows_count"),
-                "existing_rows_count": snapshot_data.get("existing_rows_count"),
-                "deleted_rows_count": snapshot_data.get("deleted_rows_count"),
-            }
-
-        return {
+            if not snapshot_info:
+                snapshot_info = {k: item.get(k) for k in MANIFEST_LIST_SUMMARY_FIELDS}
+
+        response_data = {
             "success": True,
             "snapshot": snapshot_data,
             "info": snapshot_info,
             "manifest_paths": manifest_paths,
-            "formatted": format_json(snapshot_data),
         }
+        if formatted:
+            response_data["formatted"] = await run_blocking("format", format_json, snapshot_data)
+        return await json_response(request, response_data)
     except FileNotFoundError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except HTTPException:
@@ -145,18 +193,174 @@ async def view_snapshot(file_path: str = Query(..., description="Snapshot Avro 
 
 
 @router.get("/manifest")
-async def view_manifest(file_path: str = Query(..., description="Manifest Avro 文件路径")):
+async def view_manifest(
+    request: Request,
+    file_path: str = Query(..., description="Manifest Avro 文件路径"),
+    formatted: bool = Query(False, description="是否额外返回格式化后的字符串"),
+):
     try:
         safe_path = normalize_local_path(file_path)
-        result = parse_avro_file(safe_path)
+        result = await run_blocking("avro", cached_parse_avro_file, safe_path)
         if not result["success"]:
             raise HTTPException(status_code=400, detail=result["error"])
         manifest_data = result["data"]
-        info = extract_manifest_info(manifest_data)
-        return {"success": True, "manifest": manifest_data, "info": info, "formatted": format_json(manifest_data)}
+        info = await run_blocking("manifest", extract_manifest_info, manifest_data)
+        response_data = {"success": True, "manifest": manifest_data, "info": info}
+        if formatted:
+            response_data["formatted"] = await run_blocking("format", format_json, manifest_data)
+        return await json_response(request, response_data)
     except FileNotFoundError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"查看 Manifest 文件失败: {str(e)}")
+
+
+@router.get("/manifest-metrics")
+async def get_manifest_metrics(
+    request: Request,
+    file_path: str = Query(..., description="Manifest Avro 文件路径"),
+    metadata_path: Optional[str] = Query(None, description="Metadata JSON 文件路径（使用其中的表 schema，默认使用 manifest 头中的 schema）"),
+    schema_id: Optional[int] = Query(None, description="Schema ID（默认当前 schema）"),
+    columns: Optional[str] = Query(None, description="只返回这些列（逗号分隔）"),
+    limit: int = Query(100, ge=1, le=10000, description="最多返回多少个文件的列统计"),
+    offset: int = Query(0, ge=0),
+):
+    """按表 schema 解码 manifest 中每个文件的 value / null / nan 计数与 lower / upper bounds"""
+    try:
+        safe_path = normalize_local_path(file_path)
+        schema = None
+        if metadata_path:
+            metadata_data = await run_blocking("json", cached_parse_json_file, normalize_local_path(metadata_path))
+            schema = table_schema(metadata_data, schema_id)
+            if schema is None:
+                raise HTTPException(status_code=400, detail=f"schema 不存在: {schema_id}")
+        column_list = [c.strip() for c in columns.split(",") if c.strip()] if columns else None
+        result = await run_blocking("manifest", read_manifest_metrics, safe_path, schema, column_list)
+        if not result["success"]:
+            raise HTTPException(status_code=400, detail=result["error"])
+        files = result["files"]
+        result["files_total"] = len(files)
+        result["files"] = files[offset:offset + limit]
+        result["has_more"] = offset + limit < len(files)
+        return await json_response(request, result)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"解码列统计失败: {str(e)}")
+
+
+@router.get("/snapshot-stats")
+async def get_snapshot_stats(
+    request: Request,
+    file_path: str = Query(..., description="Metadata JSON 文件路径"),
+    snapshot_id: Optional[int] = Query(None, description="Snapshot ID（默认当前 snapshot）"),
+    max_partitions: Optional[int] = Query(None, ge=1, description="最多返回多少个分区的统计（按字节数排序）"),
+    stream: bool = Query(False, description="以 NDJSON 流式返回进度与部分汇总"),
+):
+    """并发读取 snapshot 的全部 manifest，汇总数据/删除文件数、记录数、字节数及分区统计"""
+    try:
+        safe_path = normalize_local_path(file_path)
+        metadata_data = await run_blocking("json", cached_parse_json_file, safe_path)
+        if stream:
+            return await ndjson_response(
+                "fanout",
+                iter_snapshot_stats(metadata_data, snapshot_id, max_partitions=max_partitions),
+                "汇总 Snapshot 统计失败",
+            )
+        result = await run_blocking(
+            "fanout", aggregate_snapshot_stats, metadata_data, snapshot_id, max_partitions=max_partitions
+        )
+        if not result["success"]:
+            raise HTTPException(status_code=400, detail=result["error"])
+        return await json_response(request, result)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"汇总 Snapshot 统计失败: {str(e)}")
+
+
+@router.get("/snapshot-diff")
+async def get_snapshot_diff(
+    request: Request,
+    file_path: str = Query(..., description="Metadata JSON 文件路径"),
+    from_snapshot_id: Optional[int] = Query(None, description="起始 Snapshot ID（默认 to 的父 snapshot）"),
+    to_snapshot_id: Optional[int] = Query(None, description="目标 Snapshot ID（默认当前 snapshot）"),
+    offset: int = Query(0, ge=0, description="文件变化列表的起始位置"),
+    limit: int = Query(100, ge=1, le=10000, description="最多返回多少条文件变化"),
+    max_partitions: Optional[int] = Query(None, ge=1, description="最多返回多少个分区的变化（按字节数变化排序）"),
+    stream: bool = Query(False, description="以 NDJSON 流式返回进度、文件变化与汇总"),
+):
+    """比较两个 snapshot：跳过共享的 manifest，只解析差异部分，返回新增/删除的文件及分区级变化"""
+    try:
+        safe_path = normalize_local_path(file_path)
+        metadata_data = await run_blocking("json", cached_parse_json_file, safe_path)
+        args = (metadata_data, from_snapshot_id, to_snapshot_id, offset, limit)
+        if stream:
+            return await ndjson_response(
+                "fanout", iter_snapshot_diff(*args, max_partitions=max_partitions), "比较 Snapshot 失败"
+            )
+        result = await run_blocking("fanout", diff_snapshots, *args, max_partitions=max_partitions)
+        if not result["success"]:
+            raise HTTPException(status_code=400, detail=result["error"])
+        return await json_response(request, result)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"比较 Snapshot 失败: {str(e)}")
+
+
+@router.get("/timeline")
+async def get_metadata_timeline(
+    request: Request,
+    path: str = Query(..., description="表根目录或 metadata 目录路径"),
+):
+    """所有 metadata.json 版本的时间线：schema / 分区 spec / 属性变化以及 snapshot 的新增与过期"""
+    try:
+        metadata_dir = metadata_dir_of(normalize_local_path(path))
+        result = await run_blocking("scan", build_metadata_timeline, metadata_dir)
+        if not result["success"]:
+            raise HTTPException(status_code=400, detail=result["error"])
+        return await json_response(request, result)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"生成版本时间线失败: {str(e)}")
+
+
+@router.get("/orphan-files")
+async def get_orphan_files(
+    request: Request,
+    path: str = Query(..., description="表根目录或 metadata 目录路径"),
+    older_than_ms: Optional[int] = Query(None, description="只把修改时间早于该时间戳（毫秒）的文件作为候选"),
+    limit: int = Query(1000, ge=1, le=100000, description="最多返回多少个孤儿文件（汇总不受影响）"),
+    stream: bool = Query(False, description="以 NDJSON 流式返回进度、孤儿文件与汇总"),
+):
+    """合并所有 snapshot 引用的数据/删除文件，与 data 目录比较，列出未被引用的孤儿文件及其总字节数"""
+    try:
+        table_root = table_root_of(normalize_local_path(path))
+        if stream:
+            return await ndjson_response("fanout", iter_orphan_files(table_root, older_than_ms), "检测孤儿文件失败")
+        result = await run_blocking("fanout", find_orphan_files, table_root, older_than_ms, limit)
+        if not result["success"]:
+            raise HTTPException(status_code=400, detail=result["error"])
+        return await json_response(request, result)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"检测孤儿文件失败: {str(e)}")
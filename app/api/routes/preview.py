@@ -1,19 +1,86 @@
 from typing import Optional
 
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Request
 
+from app.api.responses import json_response
 from app.security.path_safety import normalize_local_path
-from app.services.iceberg_parser import read_orc_rows, read_parquet_rows
+from app.config import PREVIEW_MAX_LIMIT
+from app.services.iceberg_parser import (
+    read_orc_metadata,
+    read_orc_rows,
+    read_parquet_metadata,
+    read_parquet_rows,
+)
+from app.services.executor import run_blocking
 from app.services.json_utils import format_json
+from app.services.merge_on_read import read_merged_rows
+from app.services.parse_cache import PARSE_CACHE, cached_parse_json_file
+from app.services.row_filter import filter_orc_rows, filter_parquet_rows
 
 router = APIRouter()
 
 
+def _estimate_preview_cost(result) -> int:
+    return sum(len(repr(r)) for r in result["rows"]) + len(repr(result["file_metadata"]))
+
+
+def _read_preview(fmt: str, path: str, limit: int, offset: int, columns, include_metadata: bool,
+                  row_filter: Optional[str] = None):
+    if row_filter:
+        reader = filter_parquet_rows if fmt == "parquet" else filter_orc_rows
+        result = reader(path, row_filter, limit, offset, columns)
+        read_metadata = read_parquet_metadata if fmt == "parquet" else read_orc_metadata
+        result["file_metadata"] = read_metadata(path) if include_metadata else None
+        return result
+    if fmt == "parquet":
+        rows, fields = read_parquet_rows(path, limit, offset, columns)
+        file_metadata = read_parquet_metadata(path) if include_metadata else None
+    else:
+        rows, fields = read_orc_rows(path, limit, offset, columns)
+        file_metadata = read_orc_metadata(path) if include_metadata else None
+    return {"rows": rows, "fields": fields, "file_metadata": file_metadata}
+
+
+def _read_merged_preview(metadata_data, fmt: str, path: str, snapshot_id, limit: int, offset: int, columns,
+                         include_metadata: bool, row_filter: Optional[str]):
+    # 结果取决于 snapshot 中的 delete 文件，不进入按数据文件失效的解析缓存
+    if fmt != "parquet":
+        raise ValueError("apply_deletes 目前只支持 Parquet 数据文件")
+    result = read_merged_rows(metadata_data, path, snapshot_id, limit, offset, columns, row_filter=row_filter)
+    result["file_metadata"] = read_parquet_metadata(path) if include_metadata else None
+    return result
+
+
+def _load_preview(fmt: str, path: str, limit: int, offset: int, columns, include_metadata: bool,
+                  row_filter: Optional[str] = None):
+    if row_filter:
+        # 过滤结果带有本次读取的耗时与行组裁剪统计，不缓存，避免命中时返回过期的计时
+        return _read_preview(fmt, path, limit, offset, columns, include_metadata, row_filter)
+    # 预览结果很小，按行内容估算缓存占用，而不是按数据文件大小
+    return PARSE_CACHE.get_or_load(
+        f"preview:{fmt}:{offset}:{limit}:{','.join(columns or [])}:{int(include_metadata)}",
+        path,
+        lambda: _read_preview(fmt, path, limit, offset, columns, include_metadata),
+        cost=_estimate_preview_cost,
+    )
+
+
 @router.get("/preview/datafile")
 async def preview_datafile(
+    request: Request,
     file_path: str = Query(..., description="数据文件路径（parquet 或 orc）"),
     file_format: Optional[str] = Query(None, description="文件格式: parquet 或 orc（可选，自动识别）"),
-    limit: int = Query(100, description="预览行数", ge=1, le=100),
+    limit: int = Query(100, description="预览行数", ge=1, le=PREVIEW_MAX_LIMIT),
+    offset: int = Query(0, description="起始行", ge=0),
+    columns: Optional[str] = Query(None, description="只读取这些列（逗号分隔）"),
+    include_metadata: bool = Query(True, description="是否返回文件级元数据（只读取 footer）"),
+    formatted: bool = Query(False, description="是否额外返回格式化后的字符串"),
+    row_filter: Optional[str] = Query(
+        None, alias="filter", description="过滤表达式，例如 id = 5 AND ts > '2024-01-01T00:00:00'"
+    ),
+    apply_deletes: bool = Query(False, description="应用 snapshot 中的 position / equality delete 文件（merge-on-read）"),
+    metadata_file: Optional[str] = Query(None, description="apply_deletes 时使用的 Metadata JSON 文件路径"),
+    snapshot_id: Optional[int] = Query(None, description="apply_deletes 时使用的 Snapshot ID（默认当前 snapshot）"),
 ):
     try:
         safe_path = normalize_local_path(file_path)
@@ -26,23 +93,44 @@ async def preview_datafile(
             else:
                 raise HTTPException(status_code=400, detail="无法识别文件格式，请提供 file_format 参数")
 
-        if fmt == "parquet":
-            rows, fields = read_parquet_rows(safe_path, limit)
-        elif fmt == "orc":
-            rows, fields = read_orc_rows(safe_path, limit)
-        else:
+        if fmt not in {"parquet", "orc"}:
             raise HTTPException(status_code=400, detail=f"不支持的文件格式: {file_format}")
 
+        selected = [c.strip() for c in columns.split(",") if c.strip()] if columns else None
+
+        if apply_deletes:
+            if not metadata_file:
+                raise HTTPException(status_code=400, detail="apply_deletes 需要提供 metadata_file 参数")
+            metadata_data = await run_blocking("json", cached_parse_json_file, normalize_local_path(metadata_file))
+            preview = await run_blocking(
+                "preview", _read_merged_preview, metadata_data, fmt, safe_path, snapshot_id,
+                limit, offset, selected, include_metadata, row_filter,
+            )
+        else:
+            preview = await run_blocking(
+                "preview", _load_preview, fmt, safe_path, limit, offset, selected, include_metadata, row_filter
+            )
+        rows = preview["rows"]
+
         data = {
             "path": safe_path,
             "format": fmt,
+            "offset": offset,
             "limit": limit,
-            "fields": fields,
+            "fields": preview["fields"],
             "rows_count": len(rows),
             "rows": rows,
         }
-        return {"success": True, "data": data, "formatted": format_json(data)}
-    except RuntimeError as e:
+        if preview["file_metadata"] is not None:
+            data["file_metadata"] = preview["file_metadata"]
+        for key in ("filter", "merge_on_read"):
+            if key in preview:
+                data[key] = preview[key]
+        response_data = {"success": True, "data": data}
+        if formatted:
+            response_data["formatted"] = await run_blocking("format", format_json, data)
+        return await json_response(request, response_data)
+    except (RuntimeError, ValueError) as e:
         raise HTTPException(status_code=400, detail=str(e))
     except FileNotFoundError:
         raise HTTPException(status_code=404, detail=f"文件不存在: {file_path}")
@@ -0,0 +1,46 @@
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import Response
+
+from app.api.responses import json_response
+from app.services.executor import run_blocking
+from app.services.json_utils import dumps_bytes
+from app.services.profiler import list_profiles, load_profile, to_collapsed, to_speedscope
+
+router = APIRouter()
+
+
+@router.get("")
+async def get_profiles(request: Request, limit: int = Query(50, ge=1, le=1000)):
+    """最近保存的 profile（请求路径、耗时、采样数）"""
+    items = await run_blocking("json", list_profiles, limit)
+    return await json_response(request, {"success": True, "profiles": items})
+
+
+@router.get("/{profile_id}")
+async def get_profile(
+    request: Request,
+    profile_id: str,
+    format: str = Query("summary", description="summary（热点函数汇总）/ collapsed / speedscope"),
+):
+    """查看或导出一次 profiling 的结果"""
+    if format not in {"summary", "collapsed", "speedscope"}:
+        raise HTTPException(status_code=400, detail=f"不支持的格式: {format}（可选: summary / collapsed / speedscope）")
+    try:
+        summary, stacks = await run_blocking("json", load_profile, profile_id)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if format == "collapsed":
+        return Response(
+            content=to_collapsed(stacks), media_type="text/plain; charset=utf-8",
+            headers={"Content-Disposition": f'attachment; filename="{profile_id}.collapsed.txt"'},
+        )
+    if format == "speedscope":
+        return Response(
+            content=dumps_bytes(to_speedscope(stacks, summary["name"], summary["interval_ms"])),
+            media_type="application/json",
+            headers={"Content-Disposition": f'attachment; filename="{profile_id}.speedscope.json"'},
+        )
+    return await json_response(request, {"success": True, **summary})
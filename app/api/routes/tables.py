@@ -0,0 +1,41 @@
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query, Request
+
+from app.api.responses import json_response
+from app.config import WAREHOUSE_ROOT
+from app.security.path_safety import normalize_local_path
+from app.services.executor import run_blocking
+from app.services.warehouse_catalog import SORT_KEYS, list_tables
+
+router = APIRouter()
+
+
+@router.get("/tables")
+async def get_tables(
+    request: Request,
+    root: Optional[str] = Query(None, description="仓库根目录（默认 WAREHOUSE_ROOT）"),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=10000),
+    q: Optional[str] = Query(None, description="按表名（相对仓库根目录的路径）过滤"),
+    sort: str = Query("name", description=f"排序字段: {' / '.join(SORT_KEYS)}"),
+    desc: bool = Query(False, description="是否倒序"),
+    refresh: bool = Query(False, description="忽略缓存，重新遍历仓库目录"),
+):
+    """分页列出仓库目录下发现的 Iceberg 表（只读取每张表最新 metadata.json 的表头，结果缓存）"""
+    if not (root or WAREHOUSE_ROOT):
+        raise HTTPException(status_code=400, detail="未指定仓库根目录（root 参数或 WAREHOUSE_ROOT）")
+    safe_root = normalize_local_path(root or WAREHOUSE_ROOT)
+    try:
+        result = await run_blocking(
+            "scan", list_tables, safe_root, offset, limit, q, sort, desc, refresh
+        )
+        return await json_response(request, {"success": True, **result})
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"列出仓库表失败: {str(e)}")
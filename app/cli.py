@@ -0,0 +1,143 @@
+"""命令行批量报告（不启动 Web 服务）
+
+用法:
+    python -m app.cli report /warehouse/db/t1 /warehouse/db/t2 --output-dir reports/
+    python -m app.cli report --roots-file tables.txt --workers 8 > reports.ndjson
+    python -m app.cli report --warehouse /warehouse --output-dir reports/
+
+- 每个表根目录生成一份报告（见 app.services.table_report），用进程池分散到多个 CPU 核心
+- 指定 --output-dir 时每个表写一个 JSON 文件，另外写 summary.json（所有表的报告与失败数）；
+  否则按完成顺序向标准输出逐行写 NDJSON
+- 进度写到标准错误；有表生成失败时退出码为 1
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from app.config import SMALL_FILE_BYTES
+from app.services.parse_cache import PARSE_CACHE
+from app.services.table_report import build_table_report
+from app.services.warehouse_catalog import find_tables
+
+
+def _safe_report(table_root: str, small_file_bytes: int, threads: int) -> Dict[str, Any]:
+    """在子进程中执行；意外异常也转换成失败的报告，不影响其他表"""
+    try:
+        return build_table_report(table_root, small_file_bytes, threads)
+    except Exception as e:
+        return {"success": False, "error": f"生成报告失败: {e}", "table_root": table_root}
+    finally:
+        # 每个表的元数据只读一次，缓存没有复用价值，及时释放避免子进程内存持续增长
+        PARSE_CACHE.clear()
+
+
+def _read_roots(args: argparse.Namespace) -> List[str]:
+    roots = list(args.roots)
+    if args.roots_file:
+        with open(args.roots_file, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith("#"):
+                    roots.append(line)
+    if args.warehouse:
+        # 仓库目录下自动发现的所有表
+        tables, _ = find_tables(args.warehouse)
+        roots.extend(table_root for table_root, _ in tables)
+    # 去重并保持顺序
+    return list(dict.fromkeys(os.path.abspath(r) for r in roots))
+
+
+def _report_file_name(table_root: str, used: Dict[str, int]) -> str:
+    """由表路径生成文件名，例如 /warehouse/db/t1 → warehouse__db__t1.json"""
+    name = re.sub(r"[^0-9A-Za-z_.-]+", "__", table_root.strip("/\\")) or "table"
+    count = used.get(name, 0)
+    used[name] = count + 1
+    return f"{name}.json" if count == 0 else f"{name}-{count}.json"
+
+
+def run_report(args: argparse.Namespace) -> int:
+    roots = _read_roots(args)
+    if not roots:
+        print("没有要处理的表根目录", file=sys.stderr)
+        return 2
+
+    output_dir: Optional[Path] = args.output_dir
+    if output_dir is not None:
+        output_dir.mkdir(parents=True, exist_ok=True)
+
+    started = time.perf_counter()
+    small_file_bytes = int(args.small_file_mb * 1024 * 1024) if args.small_file_mb is not None else SMALL_FILE_BYTES
+    workers = max(1, min(args.workers or os.cpu_count() or 1, len(roots)))
+    reports: Dict[str, Dict[str, Any]] = {}
+    used_names: Dict[str, int] = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(_safe_report, root, small_file_bytes, args.threads): root for root in roots
+        }
+        for done, future in enumerate(as_completed(futures), 1):
+            root = futures[future]
+            try:
+                report = future.result()
+            except Exception as e:
+                # 子进程异常退出等
+                report = {"success": False, "error": f"生成报告失败: {e}", "table_root": root}
+            reports[root] = report
+            if output_dir is not None:
+                report["report_file"] = _report_file_name(root, used_names)
+                with open(output_dir / report["report_file"], "w", encoding="utf-8") as f:
+                    json.dump(report, f, ensure_ascii=False, indent=2, default=str)
+            else:
+                sys.stdout.write(json.dumps(report, ensure_ascii=False, default=str) + "\n")
+                sys.stdout.flush()
+            if not args.quiet:
+                status = "ok" if report["success"] else f"失败: {report['error']}"
+                print(f"[{done}/{len(roots)}] {root} {status}", file=sys.stderr)
+
+    failed = [r for r in roots if not reports[r]["success"]]
+    if output_dir is not None:
+        summary = {
+            "tables": len(roots),
+            "failed": len(failed),
+            "small_file_bytes": small_file_bytes,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 3),
+            "reports": [reports[r] for r in roots],
+        }
+        with open(output_dir / "summary.json", "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2, default=str)
+    if not args.quiet:
+        print(f"完成 {len(roots)} 个表，失败 {len(failed)} 个，耗时 {time.perf_counter() - started:.1f}s",
+              file=sys.stderr)
+    return 1 if failed else 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="Iceberg Metadata Viewer 命令行工具")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    report = sub.add_parser("report", help="批量生成表健康报告")
+    report.add_argument("roots", nargs="*", help="表根目录（包含 metadata/ 子目录）")
+    report.add_argument("--roots-file", default=None, help="每行一个表根目录的文件（# 开头为注释）")
+    report.add_argument("--warehouse", default=None, help="仓库根目录：处理其下发现的所有表")
+    report.add_argument("--output-dir", type=Path, default=None,
+                        help="报告输出目录（每个表一个 JSON + summary.json）；不指定时向标准输出写 NDJSON")
+    report.add_argument("--workers", type=int, default=None, help="进程数（默认 CPU 核数）")
+    report.add_argument("--threads", type=int, default=4, help="每个进程内解析 manifest 的线程数")
+    report.add_argument("--small-file-mb", type=float, default=None,
+                        help=f"小文件阈值（MB，默认 {SMALL_FILE_BYTES / 1024 / 1024:g}）")
+    report.add_argument("--quiet", action="store_true", help="不输出进度")
+    report.set_defaults(func=run_report)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -22,3 +22,103 @@ DEFAULT_TABLE_ROOT = os.getenv("DEFAULT_TABLE_ROOT", "")
 
 # 默认 Metadata 目录（从环境变量读取）
 DEFAULT_METADATA_DIR = os.getenv("DEFAULT_METADATA_DIR", "")
+
+# 解析结果缓存的字节预算（按文件大小估算，0 表示关闭缓存）
+PARSE_CACHE_MAX_BYTES = int(os.getenv("PARSE_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+
+# list-dir 时 snapshot 文件的解析模式: eager / parallel / lazy
+SCAN_MODE = os.getenv("SCAN_MODE", "parallel")
+
+# parallel 模式的并发数
+SCAN_MAX_WORKERS = int(os.getenv("SCAN_MAX_WORKERS", str(min(8, os.cpu_count() or 1))))
+
+# parallel 模式使用的执行器: thread / process
+SCAN_EXECUTOR = os.getenv("SCAN_EXECUTOR", "thread")
+
+# 保留增量扫描状态的目录数量上限
+SCAN_STATE_MAX_DIRS = int(os.getenv("SCAN_STATE_MAX_DIRS", "64"))
+
+# 每个目录保留的变更版本数，超过后旧 token 会退化为完整列表
+SCAN_STATE_MAX_VERSIONS = int(os.getenv("SCAN_STATE_MAX_VERSIONS", "1000"))
+
+# 数据文件预览单次最多返回的行数
+PREVIEW_MAX_LIMIT = int(os.getenv("PREVIEW_MAX_LIMIT", "1000"))
+
+# 阻塞解析任务的执行器: thread / process
+EXECUTOR_MODE = os.getenv("EXECUTOR_MODE", "thread")
+
+# 执行器的工作线程（进程）数
+EXECUTOR_MAX_WORKERS = int(os.getenv("EXECUTOR_MAX_WORKERS", str(max(4, os.cpu_count() or 1))))
+
+# 每种操作的并发上限，例如 "avro=4,preview=2"；未配置的操作使用默认值
+EXECUTOR_OP_LIMITS = os.getenv("EXECUTOR_OP_LIMITS", "")
+EXECUTOR_DEFAULT_OP_LIMIT = int(os.getenv("EXECUTOR_DEFAULT_OP_LIMIT", str(max(1, EXECUTOR_MAX_WORKERS // 2))))
+
+# 每种操作最多排队等待的请求数，超出时返回 503
+EXECUTOR_MAX_QUEUE = int(os.getenv("EXECUTOR_MAX_QUEUE", "32"))
+
+# 503 响应中的 Retry-After（秒）
+EXECUTOR_RETRY_AFTER = int(os.getenv("EXECUTOR_RETRY_AFTER", "2"))
+
+# JSON 响应超过该字节数时按 Accept-Encoding 压缩（gzip / zstd）
+RESPONSE_COMPRESS_MIN_BYTES = int(os.getenv("RESPONSE_COMPRESS_MIN_BYTES", "4096"))
+
+# 响应压缩级别（gzip 取值 1-9，zstd 取值 1-22）
+RESPONSE_COMPRESS_LEVEL = int(os.getenv("RESPONSE_COMPRESS_LEVEL", "3"))
+
+# 并发解析 manifest（snapshot 统计等）时的线程数
+FANOUT_MAX_WORKERS = int(os.getenv("FANOUT_MAX_WORKERS", str(min(16, (os.cpu_count() or 1) * 2))))
+
+# 统计小文件时的阈值（字节），小于该大小的数据文件计为小文件
+SMALL_FILE_BYTES = int(os.getenv("SMALL_FILE_BYTES", str(32 * 1024 * 1024)))
+
+# 仓库根目录：/api/tables 未指定 root 时使用
+WAREHOUSE_ROOT = os.getenv("WAREHOUSE_ROOT", "")
+
+# 仓库表目录缓存的有效期（秒）、遍历的最大目录深度、缓存的仓库数量上限
+CATALOG_TTL_SECONDS = int(os.getenv("CATALOG_TTL_SECONDS", "300"))
+CATALOG_MAX_DEPTH = int(os.getenv("CATALOG_MAX_DEPTH", "6"))
+CATALOG_MAX_ROOTS = int(os.getenv("CATALOG_MAX_ROOTS", "8"))
+
+# 允许访问的远程路径前缀（逗号分隔）；s3:// 总是访问 S3_ENDPOINT_URL，
+# http(s):// 需要显式列出前缀，例如 "s3://,https://data.example.com/"
+FS_REMOTE_PREFIXES = os.getenv("FS_REMOTE_PREFIXES", "s3://,s3a://")
+
+# S3 兼容对象存储的地址（path-style 访问），不配置时使用 AWS 的区域地址
+S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL", "")
+S3_REGION = os.getenv("S3_REGION", os.getenv("AWS_REGION", "us-east-1"))
+
+# S3 访问凭证（不配置时匿名访问）
+S3_ACCESS_KEY_ID = os.getenv("S3_ACCESS_KEY_ID", os.getenv("AWS_ACCESS_KEY_ID", ""))
+S3_SECRET_ACCESS_KEY = os.getenv("S3_SECRET_ACCESS_KEY", os.getenv("AWS_SECRET_ACCESS_KEY", ""))
+S3_SESSION_TOKEN = os.getenv("S3_SESSION_TOKEN", os.getenv("AWS_SESSION_TOKEN", ""))
+
+# 远程读取的预读大小（字节）：每次范围请求至少读取这么多；读到文件末尾时向前扩展，一次取回 footer
+FS_READAHEAD_BYTES = int(os.getenv("FS_READAHEAD_BYTES", str(1024 * 1024)))
+
+# 每个远程主机的最大连接数、请求超时（秒）、失败重试次数
+FS_POOL_MAXSIZE = int(os.getenv("FS_POOL_MAXSIZE", "16"))
+FS_TIMEOUT_SECONDS = float(os.getenv("FS_TIMEOUT_SECONDS", "30"))
+FS_RETRIES = int(os.getenv("FS_RETRIES", "2"))
+
+# 远程文件 stat（大小、修改时间）结果的缓存时间（秒）
+FS_STAT_TTL_SECONDS = float(os.getenv("FS_STAT_TTL_SECONDS", "10"))
+
+# 表元数据 SQLite 索引的存放目录（每个 metadata 目录一个 .sqlite 文件）
+METADATA_INDEX_DIR = os.getenv("METADATA_INDEX_DIR", str(Path.home() / ".cache" / "iceberg_helper" / "index"))
+
+# 是否记录运行指标并开放 /metrics（Prometheus 文本格式）
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1").lower() not in {"0", "false", "no", "off"}
+
+# 是否允许通过 profile=1 参数对单个 /api 请求做采样 profiling（默认关闭）
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "0").lower() in {"1", "true", "yes", "on"}
+
+# profiling 的采样间隔（毫秒）
+PROFILE_SAMPLE_INTERVAL_MS = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "2"))
+
+# profiling 结果的存放目录与保留数量
+PROFILE_DIR = os.getenv("PROFILE_DIR", str(Path.home() / ".cache" / "iceberg_helper" / "profiles"))
+PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", "50"))
+
+# 孤儿文件检测时在内存中比较的引用路径数上限，超过后按路径哈希分桶写入临时文件比较
+ORPHAN_MAX_PATHS_IN_MEMORY = int(os.getenv("ORPHAN_MAX_PATHS_IN_MEMORY", "2000000"))
@@ -1,5 +1,6 @@
 """FastAPI 应用主入口"""
 import os
+from contextlib import asynccontextmanager
 from pathlib import Path
 
 from fastapi import FastAPI, Request
@@ -7,14 +8,32 @@ from fastapi.responses import HTMLResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 
-from app.config import DEFAULT_TABLE_ROOT, STATIC_DIR, TEMPLATES_DIR
+from app.config import DEFAULT_TABLE_ROOT, METRICS_ENABLED, PROFILING_ENABLED, STATIC_DIR, TEMPLATES_DIR
+from app.api.middleware import MetricsMiddleware, ProfilingMiddleware
+from app.services.executor import BLOCKING_EXECUTOR
 
 # NEW: routers
 from app.api.routes.files import router as files_router
+from app.api.routes.index import router as index_router
 from app.api.routes.metadata import router as metadata_router
+from app.api.routes.metrics import router as metrics_router
 from app.api.routes.preview import router as preview_router
+from app.api.routes.profiles import router as profiles_router
+from app.api.routes.tables import router as tables_router
 
-app = FastAPI(title="Iceberg Metadata Viewer", description="Iceberg 表元数据浏览工具")
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    yield
+    # 关闭阻塞任务执行器（线程池/进程池）
+    BLOCKING_EXECUTOR.shutdown()
+
+
+app = FastAPI(title="Iceberg Metadata Viewer", description="Iceberg 表元数据浏览工具", lifespan=lifespan)
+
+if PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
 
 templates = Jinja2Templates(directory=str(TEMPLATES_DIR))
 
@@ -34,6 +53,12 @@ async def index(request: Request):
 app.include_router(files_router, prefix="/api", tags=["files"])
 app.include_router(metadata_router, prefix="/api/metadata", tags=["metadata"])
 app.include_router(preview_router, prefix="/api", tags=["preview"])
+app.include_router(index_router, prefix="/api/index", tags=["index"])
+app.include_router(tables_router, prefix="/api", tags=["tables"])
+if PROFILING_ENABLED:
+    app.include_router(profiles_router, prefix="/api/profiles", tags=["profiles"])
+if METRICS_ENABLED:
+    app.include_router(metrics_router, tags=["metrics"])
 
 
 if __name__ == "__main__":
@@ -2,16 +2,31 @@ from __future__ import annotations
 
 from pathlib import Path
 from typing import Optional
+from urllib.parse import urlsplit
 
 from fastapi import HTTPException
 
+from app.services.filesystem import check_remote_path, is_remote
+
 # 允许的根目录（可选）。不配置则只做“绝对路径 + 禁止 ..”
 ALLOWED_ROOT: Optional[Path] = None
 
 
+def _normalize_remote_path(p: str) -> str:
+    """远程路径：与实际读取时相同，由 filesystem.check_remote_path 检查前缀、主机与 .."""
+    try:
+        check_remote_path(p)
+    except PermissionError as e:
+        raise HTTPException(status_code=403, detail=str(e))
+    # 末尾的 / 去掉，与本地路径的写法保持一致（bucket 根目录除外）
+    stripped = p.rstrip("/")
+    return stripped if urlsplit(stripped).path else p
+
+
 def normalize_local_path(raw: str) -> str:
     """
     - 接受 "/abs/path" 或 "file:/abs/path"
+    - 接受 FS_REMOTE_PREFIXES 允许的远程路径（s3://bucket/key、https://host/path）
     - 拒绝相对路径/目录穿越
     - 可选：限制在 ALLOWED_ROOT 下
     """
@@ -19,6 +34,8 @@ def normalize_local_path(raw: str) -> str:
         raise HTTPException(status_code=400, detail="路径不能为空")
 
     p = raw.strip()
+    if is_remote(p):
+        return _normalize_remote_path(p)
     if p.startswith("file:"):
         p = p.replace("file:", "", 1)
 
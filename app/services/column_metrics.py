@@ -0,0 +1,365 @@
+"""Manifest 列级统计（column metrics）解码
+
+manifest entry 的 data_file 中按 field id 记录了每列的统计：
+column_sizes / value_counts / null_value_counts / nan_value_counts / lower_bounds / upper_bounds。
+其中 bounds 是 Iceberg 单值二进制序列化（single-value serialization），需要结合表 schema
+中的字段类型才能还原成 int / long / date / timestamp / decimal / string 等值。
+
+解码以整个 manifest 为单位批量进行：先收集所有文件中同一字段的 bounds，
+再按字段类型一次性解码（定长类型用 struct.iter_unpack 一次解出整列）。
+"""
+from __future__ import annotations
+
+import datetime as _dt
+import json
+import struct
+import uuid
+from decimal import Decimal
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from app.services.filesystem import open_input, path_exists, strip_file_prefix
+from app.services.iceberg_parser import _projected_reader_schema
+
+# 读取列统计只需要的字段
+MANIFEST_METRICS_FIELDS: Tuple[str, ...] = (
+    "status",
+    "data_file.file_path",
+    "data_file.record_count",
+    "data_file.column_sizes",
+    "data_file.value_counts",
+    "data_file.null_value_counts",
+    "data_file.nan_value_counts",
+    "data_file.lower_bounds",
+    "data_file.upper_bounds",
+)
+
+_COUNT_METRICS = ("column_sizes", "value_counts", "null_value_counts", "nan_value_counts")
+_METRIC_NAMES = {
+    "column_sizes": "column_size",
+    "value_counts": "value_count",
+    "null_value_counts": "null_value_count",
+    "nan_value_counts": "nan_value_count",
+}
+
+# 定长类型: (struct 格式, 字节数)
+_FIXED_WIDTH: Dict[str, Tuple[str, int]] = {
+    "boolean": ("<?", 1),
+    "int": ("<i", 4),
+    "date": ("<i", 4),
+    "long": ("<q", 8),
+    "time": ("<q", 8),
+    "timestamp": ("<q", 8),
+    "timestamptz": ("<q", 8),
+    "timestamp_ns": ("<q", 8),
+    "timestamptz_ns": ("<q", 8),
+    "float": ("<f", 4),
+    "double": ("<d", 8),
+}
+
+_EPOCH_DATE = _dt.date(1970, 1, 1)
+_EPOCH = _dt.datetime(1970, 1, 1)
+_EPOCH_TZ = _dt.datetime(1970, 1, 1, tzinfo=_dt.timezone.utc)
+
+
+def schema_field_types(schema: Dict[str, Any]) -> Dict[int, Dict[str, Any]]:
+    """
+    把 Iceberg schema（JSON）展开成 field id → {"name", "type", "required"}
+
+    嵌套 struct 中的字段用 "." 连接名称；list / map 的元素记为 "<列名>.element" / ".key" / ".value"
+    """
+    result: Dict[int, Dict[str, Any]] = {}
+
+    def visit(field_id: Any, name: str, field_type: Any, required: bool) -> None:
+        if field_id is not None:
+            result[int(field_id)] = {"name": name, "type": field_type, "required": required}
+        if not isinstance(field_type, dict):
+            return
+        kind = field_type.get("type")
+        if kind == "struct":
+            for f in field_type.get("fields") or []:
+                visit(f.get("id"), f"{name}.{f.get('name')}" if name else f.get("name"), f.get("type"),
+                      bool(f.get("required")))
+        elif kind == "list":
+            visit(field_type.get("element-id"), f"{name}.element", field_type.get("element"),
+                  bool(field_type.get("element-required")))
+        elif kind == "map":
+            visit(field_type.get("key-id"), f"{name}.key", field_type.get("key"), True)
+            visit(field_type.get("value-id"), f"{name}.value", field_type.get("value"),
+                  bool(field_type.get("value-required")))
+
+    if isinstance(schema, dict):
+        visit(None, "", {"type": "struct", "fields": schema.get("fields") or []}, True)
+    return result
+
+
+def table_schema(metadata_data: Dict[str, Any], schema_id: Optional[int] = None) -> Optional[Dict[str, Any]]:
+    """从 metadata.json 中取指定（默认当前）schema"""
+    if not isinstance(metadata_data, dict):
+        return None
+    schemas = metadata_data.get("schemas") or []
+    if schema_id is None:
+        schema_id = metadata_data.get("current-schema-id", metadata_data.get("current_schema_id"))
+    for s in schemas:
+        if isinstance(s, dict) and (s.get("schema-id", s.get("schema_id")) == schema_id):
+            return s
+    if metadata_data.get("schema"):
+        return metadata_data["schema"]
+    return schemas[-1] if schemas else None
+
+
+def _decimal_scale(type_name: str) -> Optional[int]:
+    # decimal(P, S)
+    if not type_name.startswith("decimal("):
+        return None
+    try:
+        return int(type_name[len("decimal("):-1].split(",")[1])
+    except (IndexError, ValueError):
+        return None
+
+
+def _unpack_fixed(values: List[bytes], fmt: str, width: int) -> List[Any]:
+    if all(len(v) == width for v in values):
+        return [x[0] for x in struct.iter_unpack(fmt, b"".join(values))]
+    # 类型提升（int → long、float → double）后旧文件里的 bounds 仍是原来的宽度
+    result: List[Any] = []
+    for v in values:
+        if fmt in ("<f", "<d"):
+            result.append(struct.unpack("<f" if len(v) == 4 else "<d", v)[0])
+        elif fmt == "<?":
+            result.append(bool(v[0]) if v else None)
+        else:
+            result.append(int.from_bytes(v, "little", signed=True))
+    return result
+
+
+def _convert(values: List[Any], func: Callable[[Any], Any]) -> List[Any]:
+    result = []
+    for v in values:
+        try:
+            result.append(func(v))
+        except (OverflowError, ValueError):
+            # 超出 datetime 表示范围等情况保留原始整数
+            result.append(v)
+    return result
+
+
+def decode_bounds(type_name: Any, values: List[bytes]) -> List[Any]:
+    """
+    按字段类型批量解码一组 bounds（单值二进制序列化）
+
+    返回的值可以直接比较大小（date / datetime / Decimal 等），输出前再用 format_bound 转成 JSON 友好的形式
+    """
+    if not values:
+        return []
+    if not isinstance(type_name, str):
+        # struct / list / map 不会有 bounds，保留十六进制
+        return [v.hex() for v in values]
+    if type_name in _FIXED_WIDTH:
+        fmt, width = _FIXED_WIDTH[type_name]
+        decoded = _unpack_fixed(values, fmt, width)
+        if type_name == "date":
+            return _convert(decoded, lambda d: _EPOCH_DATE + _dt.timedelta(days=d))
+        if type_name == "time":
+            return _convert(decoded, lambda us: (_EPOCH + _dt.timedelta(microseconds=us)).time())
+        if type_name == "timestamp":
+            return _convert(decoded, lambda us: _EPOCH + _dt.timedelta(microseconds=us))
+        if type_name == "timestamptz":
+            return _convert(decoded, lambda us: _EPOCH_TZ + _dt.timedelta(microseconds=us))
+        # timestamp_ns / timestamptz_ns 保留纳秒整数，输出时再格式化，避免丢失精度
+        return decoded
+    if type_name == "string":
+        return [v.decode("utf-8", errors="replace") for v in values]
+    if type_name == "uuid":
+        return [uuid.UUID(bytes=v) if len(v) == 16 else v.hex() for v in values]
+    scale = _decimal_scale(type_name)
+    if scale is not None:
+        return [Decimal(int.from_bytes(v, "big", signed=True)).scaleb(-scale) for v in values]
+    # binary / fixed[L] / 未知类型
+    return [v.hex() for v in values]
+
+
+def format_bound(type_name: Any, value: Any) -> Any:
+    """把解码后的值转换成 JSON 可序列化的形式"""
+    if value is None:
+        return None
+    if type_name in ("timestamp_ns", "timestamptz_ns") and isinstance(value, int):
+        seconds, nanos = divmod(value, 1_000_000_000)
+        try:
+            base = (_EPOCH_TZ if type_name == "timestamptz_ns" else _EPOCH) + _dt.timedelta(seconds=seconds)
+        except OverflowError:
+            return value
+        text = base.strftime("%Y-%m-%dT%H:%M:%S") + f".{nanos:09d}"
+        return text + "+00:00" if type_name == "timestamptz_ns" else text
+    if isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, (_dt.date, _dt.time)):
+        return value.isoformat()
+    return str(value)
+
+
+def _metric_pairs(value: Any) -> List[Tuple[int, Any]]:
+    """Iceberg 用 array<record{key, value}> 表示 int → X 的 map，也兼容普通 map"""
+    if not value:
+        return []
+    if isinstance(value, dict):
+        return [(int(k), v) for k, v in value.items()]
+    pairs = []
+    for kv in value:
+        if isinstance(kv, dict) and kv.get("key") is not None:
+            pairs.append((int(kv["key"]), kv.get("value")))
+    return pairs
+
+
+def _read_metrics_records(manifest_path: str) -> Tuple[List[Dict[str, Any]], Optional[Dict[str, Any]]]:
+    """投影读取列统计字段，保留原始 bytes，同时返回 manifest 头中记录的表 schema"""
+    from fastavro import reader
+
+    if not path_exists(manifest_path or ""):
+        raise FileNotFoundError(f"文件不存在: {manifest_path} (resolved: {strip_file_prefix(manifest_path or '')})")
+    with open_input(manifest_path) as fo:
+        avro_reader = reader(fo)
+        header_schema = avro_reader.metadata.get("schema")
+        reader_schema = _projected_reader_schema(avro_reader.writer_schema, MANIFEST_METRICS_FIELDS)
+        if reader_schema is not None:
+            try:
+                fo.seek(0)
+                avro_reader = reader(fo, reader_schema=reader_schema)
+            except Exception:
+                fo.seek(0)
+                avro_reader = reader(fo)
+        records = [r for r in avro_reader if isinstance(r, dict)]
+    schema = None
+    if header_schema:
+        try:
+            schema = json.loads(header_schema)
+        except (TypeError, ValueError):
+            schema = None
+    return records, schema
+
+
+def decode_manifest_metrics(records: Sequence[Dict[str, Any]], schema: Optional[Dict[str, Any]],
+                            columns: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+    """
+    批量解码一个 manifest 中所有文件的列统计
+
+    Returns:
+        dict: columns（字段 id / 名称 / 类型）、files（每个文件的列统计）、
+              column_summary（跨文件汇总的 min / max 与计数，可用于裁剪分析）
+    """
+    field_types = schema_field_types(schema) if schema else {}
+    wanted = set(columns) if columns else None
+
+    files: List[Dict[str, Any]] = []
+    # field id → [(文件序号, "lower_bound"/"upper_bound", bytes)]
+    pending: Dict[int, List[Tuple[int, str, bytes]]] = {}
+    for rec in records:
+        df = rec.get("data_file") or {}
+        if not isinstance(df, dict):
+            continue
+        per_column: Dict[int, Dict[str, Any]] = {}
+        for metric in _COUNT_METRICS:
+            for field_id, value in _metric_pairs(df.get(metric)):
+                per_column.setdefault(field_id, {})[_METRIC_NAMES[metric]] = value
+        index = len(files)
+        for metric, key in (("lower_bounds", "lower_bound"), ("upper_bounds", "upper_bound")):
+            for field_id, value in _metric_pairs(df.get(metric)):
+                if isinstance(value, (bytes, bytearray)):
+                    pending.setdefault(field_id, []).append((index, key, bytes(value)))
+                    per_column.setdefault(field_id, {})
+        files.append({
+            "file_path": df.get("file_path"),
+            "status": rec.get("status"),
+            "record_count": df.get("record_count"),
+            "metrics": per_column,
+        })
+
+    # 每个字段只调用一次解码
+    for field_id, items in pending.items():
+        type_name = field_types.get(field_id, {}).get("type")
+        decoded = decode_bounds(type_name, [b for _, _, b in items])
+        for (index, key, _), value in zip(items, decoded):
+            files[index]["metrics"][field_id][key] = value
+
+    def column_name(field_id: int) -> str:
+        return field_types.get(field_id, {}).get("name") or str(field_id)
+
+    summary: Dict[int, Dict[str, Any]] = {}
+    output_files: List[Dict[str, Any]] = []
+    for f in files:
+        out_columns: Dict[str, Any] = {}
+        for field_id, m in f["metrics"].items():
+            name = column_name(field_id)
+            if wanted is not None and name not in wanted:
+                continue
+            type_name = field_types.get(field_id, {}).get("type")
+            s = summary.setdefault(field_id, {
+                "lower_bound": None, "upper_bound": None, "value_count": 0, "null_value_count": 0,
+                "nan_value_count": 0, "files": 0, "files_with_bounds": 0,
+            })
+            s["files"] += 1
+            for key in ("value_count", "null_value_count", "nan_value_count"):
+                s[key] += m.get(key) or 0
+            lower, upper = m.get("lower_bound"), m.get("upper_bound")
+            if lower is not None or upper is not None:
+                s["files_with_bounds"] += 1
+            try:
+                if lower is not None and (s["lower_bound"] is None or lower < s["lower_bound"]):
+                    s["lower_bound"] = lower
+                if upper is not None and (s["upper_bound"] is None or upper > s["upper_bound"]):
+                    s["upper_bound"] = upper
+            except TypeError:
+                pass
+            out_columns[name] = {
+                "field_id": field_id,
+                **{k: v for k, v in m.items() if k not in ("lower_bound", "upper_bound")},
+                "lower_bound": format_bound(type_name, lower),
+                "upper_bound": format_bound(type_name, upper),
+            }
+        output_files.append({
+            "file_path": f["file_path"],
+            "status": f["status"],
+            "record_count": f["record_count"],
+            "columns": out_columns,
+        })
+
+    column_summary = {}
+    for field_id in sorted(summary):
+        type_name = field_types.get(field_id, {}).get("type")
+        s = summary[field_id]
+        column_summary[column_name(field_id)] = {
+            "field_id": field_id,
+            "type": type_name,
+            **s,
+            "lower_bound": format_bound(type_name, s["lower_bound"]),
+            "upper_bound": format_bound(type_name, s["upper_bound"]),
+        }
+    return {
+        "columns": [
+            {"field_id": fid, "name": info["name"], "type": info["type"]}
+            for fid, info in sorted(field_types.items())
+            if not isinstance(info["type"], dict)
+        ],
+        "files": output_files,
+        "column_summary": column_summary,
+    }
+
+
+def read_manifest_metrics(manifest_path: str, schema: Optional[Dict[str, Any]] = None,
+                          columns: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+    """
+    读取 manifest 并解码列统计
+
+    Args:
+        manifest_path: manifest Avro 文件路径
+        schema: 表 schema；不传时使用 manifest 文件头中记录的 schema
+        columns: 只返回这些列（按列名）
+    """
+    try:
+        records, header_schema = _read_metrics_records(manifest_path)
+    except FileNotFoundError:
+        raise
+    except Exception as e:
+        return {"success": False, "error": f"解析 Manifest 失败: {str(e)}"}
+    schema_source = "table" if schema else ("manifest" if header_schema else None)
+    result = decode_manifest_metrics(records, schema or header_schema, columns)
+    return {"success": True, "error": None, "schema_source": schema_source, **result}
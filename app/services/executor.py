@@ -0,0 +1,252 @@
+"""阻塞任务执行层
+
+路由都是 async def，但 fastavro / pyarrow / pyorc 的解析以及文件 I/O 都是阻塞调用，
+直接在事件循环里执行会让一个慢请求卡住同一 worker 上的所有请求。这里统一把阻塞调用
+提交到有界的线程池（或进程池）执行：
+
+- 每种操作有独立的并发上限，重的操作不会占满整个池子
+- 每种操作排队等待的请求数有上限，超出时返回 503 + Retry-After
+- 进程池模式下可以利用多核做 CPU 密集的解码，但解析缓存只在各个进程内有效，
+  并且提交的函数/参数/返回值都必须可以 pickle
+"""
+from __future__ import annotations
+
+import asyncio
+import functools
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from fastapi import HTTPException
+
+from app.config import (
+    EXECUTOR_DEFAULT_OP_LIMIT,
+    EXECUTOR_MAX_QUEUE,
+    EXECUTOR_MAX_WORKERS,
+    EXECUTOR_MODE,
+    EXECUTOR_OP_LIMITS,
+    EXECUTOR_RETRY_AFTER,
+    METRICS_ENABLED,
+)
+from app.services.metrics import EXECUTOR_WAIT
+from app.services.profiler import CURRENT_PROFILE, in_session
+
+
+def _parse_op_limits(raw: str) -> Dict[str, int]:
+    """解析 "avro=4,preview=2" 形式的配置"""
+    limits: Dict[str, int] = {}
+    for part in (raw or "").split(","):
+        if "=" not in part:
+            continue
+        name, value = part.split("=", 1)
+        try:
+            limits[name.strip()] = max(1, int(value))
+        except ValueError:
+            continue
+    return limits
+
+
+class _OpState:
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.semaphore: Optional[asyncio.Semaphore] = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.running = 0
+        self.waiting = 0
+        self.completed = 0
+        self.rejected = 0
+
+
+class BlockingExecutor:
+    """按操作类型限流的阻塞任务执行器"""
+
+    def __init__(self, mode: str, max_workers: int, op_limits: Dict[str, int],
+                 default_op_limit: int, max_queue: int, retry_after: int):
+        self.mode = mode if mode in {"thread", "process"} else "thread"
+        self.max_workers = max(1, max_workers)
+        self.op_limits = op_limits
+        self.default_op_limit = max(1, default_op_limit)
+        self.max_queue = max(0, max_queue)
+        self.retry_after = max(1, retry_after)
+        self._pool: Optional[Executor] = None
+        self._ops: Dict[str, _OpState] = {}
+        self._lock = threading.Lock()
+
+    def _get_pool(self) -> Executor:
+        with self._lock:
+            if self._pool is None:
+                pool_cls = ProcessPoolExecutor if self.mode == "process" else ThreadPoolExecutor
+                self._pool = pool_cls(max_workers=self.max_workers)
+            return self._pool
+
+    def _get_op(self, op: str) -> _OpState:
+        state = self._ops.get(op)
+        if state is None:
+            limit = min(self.op_limits.get(op, self.default_op_limit), self.max_workers)
+            state = self._ops.setdefault(op, _OpState(limit))
+        # asyncio.Semaphore 绑定在事件循环上，循环变化（例如测试客户端重建循环）时重新创建
+        loop = asyncio.get_running_loop()
+        if state.semaphore is None or state.loop is not loop:
+            state.semaphore = asyncio.Semaphore(state.limit)
+            state.loop = loop
+        return state
+
+    async def acquire(self, op: str) -> _OpState:
+        """
+        占用 op 的一个并发名额（需要配对调用 release）
+
+        Raises:
+            HTTPException: 该操作排队请求数已满时抛出 503（带 Retry-After）
+        """
+        state = self._get_op(op)
+        if state.semaphore.locked() and state.waiting >= self.max_queue:
+            state.rejected += 1
+            raise HTTPException(
+                status_code=503,
+                detail=f"服务繁忙（{op} 任务排队已满），请稍后重试",
+                headers={"Retry-After": str(self.retry_after)},
+            )
+
+        state.waiting += 1
+        queued = time.perf_counter()
+        try:
+            await state.semaphore.acquire()
+        finally:
+            state.waiting -= 1
+        if METRICS_ENABLED:
+            EXECUTOR_WAIT.observe(time.perf_counter() - queued, op)
+        state.running += 1
+        return state
+
+    def release(self, state: _OpState) -> None:
+        state.running -= 1
+        state.completed += 1
+        state.semaphore.release()
+
+    def _call(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Callable[[], Any]:
+        call = functools.partial(func, *args, **kwargs)
+        if self.mode == "thread":
+            # 请求开启了 profiling 时，执行任务的工作线程登记到该请求的采样 session
+            call = in_session(CURRENT_PROFILE.get(), call)
+        return call
+
+    async def run(self, op: str, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """
+        在池中执行 func(*args, **kwargs) 并等待结果
+
+        Raises:
+            HTTPException: 该操作排队请求数已满时抛出 503（带 Retry-After）
+        """
+        state = await self.acquire(op)
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_pool(), self._call(func, *args, **kwargs))
+        finally:
+            self.release(state)
+
+    async def stream(self, op: str, items: Iterable[Any]) -> "_SlotStream":
+        """
+        占用 op 的一个并发名额后返回分批迭代 items 的异步迭代器
+
+        名额在整个流的生命周期内保持占用，流结束、出错或客户端断开后归还；
+        排队已满时在返回之前就抛出 503，此时响应头还没有发出。
+        生成器无法 pickle，进程池模式下迭代放在事件循环的默认线程池中进行。
+
+        Raises:
+            HTTPException: 该操作排队请求数已满时抛出 503（带 Retry-After）
+        """
+        state = await self.acquire(op)
+        return _SlotStream(self, state, iter(items))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "ops": {
+                name: {
+                    "limit": s.limit,
+                    "running": s.running,
+                    "waiting": s.waiting,
+                    "completed": s.completed,
+                    "rejected": s.rejected,
+                }
+                for name, s in sorted(self._ops.items())
+            },
+        }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+
+# 流式迭代每次提交到池中最多取的条数 / 时长，兼顾吞吐和进度事件的实时性
+_STREAM_BATCH_ITEMS = 256
+_STREAM_BATCH_SECONDS = 0.05
+
+
+def _take_batch(iterator: Iterator[Any]) -> List[Any]:
+    """从迭代器取一批元素，返回空列表表示迭代结束"""
+    batch: List[Any] = []
+    deadline = time.perf_counter() + _STREAM_BATCH_SECONDS
+    for item in iterator:
+        batch.append(item)
+        if len(batch) >= _STREAM_BATCH_ITEMS or time.perf_counter() >= deadline:
+            break
+    return batch
+
+
+class _SlotStream:
+    """持有执行器名额的异步迭代器，每次产出一批元素"""
+
+    def __init__(self, executor: BlockingExecutor, state: _OpState, iterator: Iterator[Any]):
+        self._executor = executor
+        self._state: Optional[_OpState] = state
+        self._iterator = iterator
+        self._loop = asyncio.get_running_loop()
+
+    def __aiter__(self) -> "_SlotStream":
+        return self
+
+    async def __anext__(self) -> List[Any]:
+        if self._state is None:
+            raise StopAsyncIteration
+        try:
+            pool = self._executor._get_pool() if self._executor.mode == "thread" else None
+            batch = await self._loop.run_in_executor(pool, self._executor._call(_take_batch, self._iterator))
+        except BaseException:
+            # 包括客户端断开导致的取消
+            self.close()
+            raise
+        if not batch:
+            self.close()
+            raise StopAsyncIteration
+        return batch
+
+    def close(self) -> None:
+        if self._state is not None:
+            state, self._state = self._state, None
+            self._executor.release(state)
+
+    def __del__(self) -> None:
+        # 响应未开始迭代就被丢弃（例如客户端在响应开始前断开）时兜底归还名额
+        if self._state is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self.close)
+
+
+BLOCKING_EXECUTOR = BlockingExecutor(
+    mode=EXECUTOR_MODE,
+    max_workers=EXECUTOR_MAX_WORKERS,
+    op_limits=_parse_op_limits(EXECUTOR_OP_LIMITS),
+    default_op_limit=EXECUTOR_DEFAULT_OP_LIMIT,
+    max_queue=EXECUTOR_MAX_QUEUE,
+    retry_after=EXECUTOR_RETRY_AFTER,
+)
+
+
+async def run_blocking(op: str, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """把阻塞调用提交到全局执行器，op 为操作类型（用于独立限流）"""
+    return await BLOCKING_EXECUTOR.run(op, func, *args, **kwargs)
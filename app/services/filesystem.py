@@ -0,0 +1,716 @@
+"""文件系统抽象：本地文件与 HTTP / S3 兼容对象存储
+
+解析器只通过这里的函数访问文件，路径可以是：
+
+- 本地路径："/abs/path" 或 "file:/abs/path"
+- S3 兼容对象存储："s3://bucket/key"（s3a:// 相同），按 path-style 访问 S3_ENDPOINT_URL，
+  配置了凭证时使用 SigV4 签名；支持列目录（ListObjectsV2）
+- 普通 HTTP(S)："https://host/path"，只能读取单个文件，不能列目录
+
+远程文件的读取：
+
+- open_input 返回可 seek 的文件对象，按需发起 Range 请求，不下载整个文件；
+  每次请求至少读取 FS_READAHEAD_BYTES，读到文件末尾时向前扩展同样大小，
+  Parquet / ORC 的 footer、Avro 文件头一般一次请求即可取回
+- 连接按主机放在连接池中复用（keep-alive），每个主机最多 FS_POOL_MAXSIZE 个并发连接
+- stat 结果（大小、修改时间）缓存 FS_STAT_TTL_SECONDS 秒，列目录的结果同样写入该缓存
+
+远程路径只允许 FS_REMOTE_PREFIXES 中的前缀（get_filesystem 中检查）。这同样适用于从 metadata.json、
+manifest 中读出的路径，避免构造的元数据文件让服务访问任意地址。
+"""
+from __future__ import annotations
+
+import hashlib
+import hmac
+import http.client
+import io
+import os
+import posixpath
+import threading
+import time
+import xml.etree.ElementTree as ET
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, BinaryIO, Dict, Iterator, List, NamedTuple, Optional, Tuple, Union
+from urllib.parse import parse_qsl, quote, urlencode, urlsplit
+
+from app.config import (
+    FS_POOL_MAXSIZE,
+    FS_READAHEAD_BYTES,
+    FS_REMOTE_PREFIXES,
+    FS_RETRIES,
+    FS_STAT_TTL_SECONDS,
+    FS_TIMEOUT_SECONDS,
+    S3_ACCESS_KEY_ID,
+    S3_ENDPOINT_URL,
+    S3_REGION,
+    S3_SECRET_ACCESS_KEY,
+    S3_SESSION_TOKEN,
+)
+from app.services.metrics import record_bytes, record_remote_request, stage
+
+REMOTE_SCHEMES = ("s3", "s3a", "http", "https")
+
+# 允许访问的远程路径前缀（见 FS_REMOTE_PREFIXES）
+REMOTE_PREFIXES = tuple(p.strip() for p in FS_REMOTE_PREFIXES.split(",") if p.strip())
+
+_EMPTY_SHA256 = hashlib.sha256(b"").hexdigest()
+_S3_NS = "{http://s3.amazonaws.com/doc/2006-03-01/}"
+
+
+class FileInfo(NamedTuple):
+    path: str
+    name: str
+    size: int
+    mtime_ns: int
+    is_dir: bool
+
+
+def is_remote(path: str) -> bool:
+    """是否为远程路径（s3:// / s3a:// / http:// / https://）"""
+    if not isinstance(path, str):
+        return False
+    scheme, sep, _ = path.partition("://")
+    return bool(sep) and scheme.lower() in REMOTE_SCHEMES
+
+
+def is_allowed_remote(path: str) -> bool:
+    """
+    远程路径是否匹配 REMOTE_PREFIXES
+
+    前缀只有 scheme（"s3://"）时比较 scheme；带主机时主机必须完全相同（不允许 user@host），
+    路径按前缀比较，避免 "https://data.example.com" 匹配到 "https://data.example.com.evil/"
+    """
+    parts = urlsplit(path)
+    if "@" in parts.netloc:
+        return False
+    for prefix in REMOTE_PREFIXES:
+        allowed = urlsplit(prefix)
+        if allowed.scheme.lower() != parts.scheme.lower():
+            continue
+        if not allowed.netloc:
+            return True
+        if allowed.netloc.lower() == parts.netloc.lower() and parts.path.startswith(allowed.path):
+            return True
+    return False
+
+
+def check_remote_path(path: str) -> None:
+    """远程路径必须有主机（bucket）、不含 ..，且匹配 REMOTE_PREFIXES，否则抛出 PermissionError"""
+    parts = urlsplit(path)
+    if not parts.netloc:
+        raise PermissionError(f"无效的远程路径: {path}")
+    if ".." in parts.path.split("/"):
+        raise PermissionError(f"非法路径(包含..): {path}")
+    if not is_allowed_remote(path):
+        raise PermissionError(f"远程路径不在允许范围内: {path}")
+
+
+def strip_file_prefix(path: str) -> str:
+    if isinstance(path, str) and path.startswith("file:"):
+        return path.replace("file:", "", 1)
+    return path
+
+
+# ---------------------------------------------------------------------------
+# 本地文件
+# ---------------------------------------------------------------------------
+
+class LocalFileSystem:
+    """本地文件系统"""
+
+    def open(self, path: str) -> BinaryIO:
+        return open(strip_file_prefix(path), "rb")
+
+    def stat(self, path: str) -> FileInfo:
+        actual = strip_file_prefix(path)
+        st = os.stat(actual)
+        return FileInfo(actual, os.path.basename(actual), st.st_size, st.st_mtime_ns,
+                        os.path.isdir(actual))
+
+    def exists(self, path: str) -> bool:
+        return os.path.exists(strip_file_prefix(path))
+
+    def is_dir(self, path: str) -> bool:
+        return os.path.isdir(strip_file_prefix(path))
+
+    def list_names(self, path: str) -> List[str]:
+        return os.listdir(strip_file_prefix(path))
+
+    def list_dir(self, path: str) -> List[FileInfo]:
+        actual = strip_file_prefix(path)
+        items: List[FileInfo] = []
+        with os.scandir(actual) as it:
+            for entry in it:
+                try:
+                    if entry.is_dir():
+                        items.append(FileInfo(entry.path, entry.name, 0, 0, True))
+                    else:
+                        st = entry.stat()
+                        items.append(FileInfo(entry.path, entry.name, st.st_size, st.st_mtime_ns, False))
+                except OSError:
+                    continue
+        return items
+
+    def read_range(self, path: str, start: int, end: int) -> bytes:
+        with open(strip_file_prefix(path), "rb") as f:
+            f.seek(start)
+            return f.read(end - start)
+
+    def identity(self, path: str) -> Optional[Tuple[str, int, int]]:
+        try:
+            resolved = os.path.realpath(strip_file_prefix(path))
+            st = os.stat(resolved)
+        except OSError:
+            return None
+        return resolved, st.st_size, st.st_mtime_ns
+
+
+# ---------------------------------------------------------------------------
+# 连接池
+# ---------------------------------------------------------------------------
+
+class ConnectionPool:
+    """按 (scheme, host, port) 复用 HTTP keep-alive 连接，并限制每个主机的并发连接数"""
+
+    def __init__(self, maxsize: int = FS_POOL_MAXSIZE, timeout: float = FS_TIMEOUT_SECONDS):
+        self.maxsize = max(1, maxsize)
+        self.timeout = timeout
+        self._idle: Dict[Tuple[str, str, int], List[http.client.HTTPConnection]] = {}
+        self._slots: Dict[Tuple[str, str, int], threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+        self.created = 0
+        self.reused = 0
+
+    def _slot(self, key: Tuple[str, str, int]) -> threading.BoundedSemaphore:
+        with self._lock:
+            slot = self._slots.get(key)
+            if slot is None:
+                slot = self._slots[key] = threading.BoundedSemaphore(self.maxsize)
+            return slot
+
+    def _acquire(self, key: Tuple[str, str, int]) -> Tuple[http.client.HTTPConnection, bool]:
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                self.reused += 1
+                return idle.pop(), True
+            self.created += 1
+        scheme, host, port = key
+        conn_cls = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+        return conn_cls(host, port, timeout=self.timeout), False
+
+    def _release(self, key: Tuple[str, str, int], conn: http.client.HTTPConnection) -> None:
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.maxsize:
+                idle.append(conn)
+                return
+        conn.close()
+
+    def request(self, method: str, url: str,
+                headers: Optional[Dict[str, str]] = None) -> Tuple[int, Dict[str, str], bytes]:
+        """发送请求并读取完整响应体，返回 (状态码, 小写的响应头, 响应体)"""
+        parts = urlsplit(url)
+        scheme = parts.scheme.lower()
+        port = parts.port or (443 if scheme == "https" else 80)
+        key = (scheme, parts.hostname or "", port)
+        target = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        with self._slot(key):
+            while True:
+                conn, reused = self._acquire(key)
+                try:
+                    conn.request(method, target, headers=headers or {})
+                    resp = conn.getresponse()
+                    body = resp.read()
+                except (http.client.HTTPException, OSError):
+                    conn.close()
+                    if reused:
+                        # 复用的 keep-alive 连接可能已被服务端关闭，换一个新连接重试
+                        continue
+                    raise
+                break
+            if resp.will_close:
+                conn.close()
+            else:
+                self._release(key, conn)
+        return resp.status, {k.lower(): v for k, v in resp.getheaders()}, body
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "created": self.created,
+                "reused": self.reused,
+                "idle": sum(len(v) for v in self._idle.values()),
+                "hosts": len(self._slots),
+                "maxsize": self.maxsize,
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            for conns in self._idle.values():
+                for conn in conns:
+                    conn.close()
+            self._idle.clear()
+
+
+CONNECTION_POOL = ConnectionPool()
+
+
+# ---------------------------------------------------------------------------
+# HTTP / S3
+# ---------------------------------------------------------------------------
+
+def _http_error(status: int, path: str, body: bytes) -> OSError:
+    detail = body[:200].decode("utf-8", "replace").strip()
+    if status == 404:
+        return FileNotFoundError(f"文件不存在: {path}")
+    if status in (401, 403):
+        return PermissionError(f"无权访问: {path}（HTTP {status}）")
+    return OSError(f"请求失败: {path}（HTTP {status}）{detail}")
+
+
+def _http_mtime_ns(value: Optional[str]) -> int:
+    if not value:
+        return 0
+    try:
+        return int(parsedate_to_datetime(value).timestamp() * 1_000_000_000)
+    except (TypeError, ValueError):
+        return 0
+
+
+class HttpFileSystem:
+    """只读的 HTTP(S) 文件：HEAD 获取大小，Range 请求读取片段"""
+
+    def __init__(self, pool: ConnectionPool = CONNECTION_POOL, readahead: int = FS_READAHEAD_BYTES,
+                 retries: int = FS_RETRIES, stat_ttl: float = FS_STAT_TTL_SECONDS):
+        self.pool = pool
+        self.readahead = max(0, readahead)
+        self.retries = max(0, retries)
+        self.stat_ttl = stat_ttl
+        self._stats: "OrderedDict[str, Tuple[float, FileInfo]]" = OrderedDict()
+        self._stats_lock = threading.Lock()
+
+    # ---- 请求 ----
+
+    def url_of(self, path: str) -> str:
+        return path
+
+    def _headers(self, method: str, url: str, headers: Dict[str, str]) -> Dict[str, str]:
+        return headers
+
+    def _request(self, method: str, path: str, query: Optional[Dict[str, str]] = None,
+                 headers: Optional[Dict[str, str]] = None) -> Tuple[int, Dict[str, str], bytes]:
+        url = self.url_of(path)
+        if query:
+            url += "?" + urlencode(sorted(query.items()), quote_via=quote)
+        attempt = 0
+        while True:
+            try:
+                with stage(f"remote_{method.lower()}"):
+                    status, resp_headers, body = self.pool.request(
+                        method, url, self._headers(method, url, dict(headers or {}))
+                    )
+            except (http.client.HTTPException, OSError):
+                record_remote_request(method, "error")
+                if attempt >= self.retries:
+                    raise
+            else:
+                record_remote_request(method, str(status))
+                record_bytes("remote", len(body))
+                if status < 500 or attempt >= self.retries:
+                    return status, resp_headers, body
+            attempt += 1
+            time.sleep(min(1.0, 0.05 * (2 ** attempt)))
+
+    # ---- stat 缓存 ----
+
+    def _cached_stat(self, path: str) -> Optional[FileInfo]:
+        with self._stats_lock:
+            item = self._stats.get(path)
+            if item is None:
+                return None
+            if item[0] < time.monotonic():
+                del self._stats[path]
+                return None
+            return item[1]
+
+    def _remember(self, info: FileInfo) -> None:
+        if self.stat_ttl <= 0:
+            return
+        with self._stats_lock:
+            self._stats[info.path] = (time.monotonic() + self.stat_ttl, info)
+            self._stats.move_to_end(info.path)
+            while len(self._stats) > 100_000:
+                self._stats.popitem(last=False)
+
+    # ---- 文件操作 ----
+
+    def stat(self, path: str) -> FileInfo:
+        info = self._cached_stat(path)
+        if info is not None:
+            return info
+        status, headers, body = self._request("HEAD", path)
+        if status >= 400:
+            raise _http_error(status, path, body)
+        info = FileInfo(path, posixpath.basename(path.rstrip("/")), int(headers.get("content-length") or 0),
+                        _http_mtime_ns(headers.get("last-modified")), False)
+        self._remember(info)
+        return info
+
+    def exists(self, path: str) -> bool:
+        try:
+            self.stat(path)
+            return True
+        except FileNotFoundError:
+            return self.is_dir(path)
+
+    def is_dir(self, path: str) -> bool:
+        return False
+
+    def list_names(self, path: str) -> List[str]:
+        return [info.name for info in self.list_dir(path)]
+
+    def list_dir(self, path: str) -> List[FileInfo]:
+        raise NotADirectoryError(f"HTTP 路径不支持列目录: {path}")
+
+    def read_range(self, path: str, start: int, end: int) -> bytes:
+        """读取 [start, end) 范围的字节"""
+        if end <= start:
+            return b""
+        status, _, body = self._request("GET", path, headers={"Range": f"bytes={start}-{end - 1}"})
+        if status == 206:
+            return body
+        if status == 200:
+            # 服务端忽略了 Range，返回了整个文件
+            return body[start:end]
+        if status == 416:
+            return b""
+        raise _http_error(status, path, body)
+
+    def open(self, path: str) -> BinaryIO:
+        size = self.stat(path).size
+        return io.BufferedReader(RangeReader(self, path, size, self.readahead), buffer_size=64 * 1024)
+
+    def identity(self, path: str) -> Optional[Tuple[str, int, int]]:
+        try:
+            info = self.stat(path)
+        except OSError:
+            return None
+        return path, info.size, info.mtime_ns
+
+
+def _hmac(key: bytes, msg: str) -> bytes:
+    return hmac.new(key, msg.encode("utf-8"), hashlib.sha256).digest()
+
+
+def _sigv4_headers(method: str, url: str, headers: Dict[str, str], region: str, access_key: str,
+                   secret_key: str, session_token: str = "") -> Dict[str, str]:
+    """AWS Signature Version 4（请求体为空）"""
+    parts = urlsplit(url)
+    amz_date = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    date = amz_date[:8]
+    signed_headers = {
+        "host": parts.netloc,
+        "x-amz-date": amz_date,
+        "x-amz-content-sha256": _EMPTY_SHA256,
+    }
+    if session_token:
+        signed_headers["x-amz-security-token"] = session_token
+    query = "&".join(
+        f"{quote(k, safe='-_.~')}={quote(v, safe='-_.~')}"
+        for k, v in sorted(parse_qsl(parts.query, keep_blank_values=True))
+    )
+    names = sorted(signed_headers)
+    canonical_request = "\n".join([
+        method,
+        parts.path or "/",
+        query,
+        "".join(f"{n}:{signed_headers[n].strip()}\n" for n in names),
+        ";".join(names),
+        _EMPTY_SHA256,
+    ])
+    scope = f"{date}/{region}/s3/aws4_request"
+    string_to_sign = "\n".join([
+        "AWS4-HMAC-SHA256", amz_date, scope, hashlib.sha256(canonical_request.encode("utf-8")).hexdigest(),
+    ])
+    key = _hmac(_hmac(_hmac(_hmac(("AWS4" + secret_key).encode("utf-8"), date), region), "s3"), "aws4_request")
+    signature = hmac.new(key, string_to_sign.encode("utf-8"), hashlib.sha256).hexdigest()
+    result = dict(headers)
+    result.update(signed_headers)
+    result["Authorization"] = (
+        f"AWS4-HMAC-SHA256 Credential={access_key}/{scope}, "
+        f"SignedHeaders={';'.join(names)}, Signature={signature}"
+    )
+    return result
+
+
+class S3FileSystem(HttpFileSystem):
+    """S3 兼容对象存储（path-style），目录即 key 前缀"""
+
+    def __init__(self, endpoint: str = S3_ENDPOINT_URL, region: str = S3_REGION,
+                 access_key: str = S3_ACCESS_KEY_ID, secret_key: str = S3_SECRET_ACCESS_KEY,
+                 session_token: str = S3_SESSION_TOKEN, **kwargs: Any):
+        super().__init__(**kwargs)
+        self.endpoint = (endpoint or f"https://s3.{region}.amazonaws.com").rstrip("/")
+        self.region = region
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.session_token = session_token
+
+    @staticmethod
+    def split(path: str) -> Tuple[str, str]:
+        """s3://bucket/a/b → ("bucket", "a/b")"""
+        rest = path.split("://", 1)[1]
+        bucket, _, key = rest.partition("/")
+        if not bucket:
+            raise ValueError(f"无效的 S3 路径: {path}")
+        return bucket, key
+
+    def _bucket_url(self, bucket: str) -> str:
+        return f"{self.endpoint}/{quote(bucket, safe='')}"
+
+    def url_of(self, path: str) -> str:
+        bucket, key = self.split(path)
+        return f"{self._bucket_url(bucket)}/{quote(key, safe='/-_.~')}"
+
+    def _headers(self, method: str, url: str, headers: Dict[str, str]) -> Dict[str, str]:
+        if not (self.access_key and self.secret_key):
+            return headers
+        return _sigv4_headers(method, url, headers, self.region, self.access_key, self.secret_key,
+                              self.session_token)
+
+    def _list(self, path: str, max_keys: Optional[int] = None) -> Iterator[FileInfo]:
+        """ListObjectsV2（delimiter="/"）列出前缀下一层的对象与子目录"""
+        bucket, key = self.split(path)
+        prefix = key.rstrip("/") + "/" if key.strip("/") else ""
+        scheme = path.split("://", 1)[0]
+        base = f"{scheme}://{bucket}/"
+        token: Optional[str] = None
+        while True:
+            query = {"list-type": "2", "prefix": prefix, "delimiter": "/"}
+            if max_keys:
+                query["max-keys"] = str(max_keys)
+            if token:
+                query["continuation-token"] = token
+            status, _, body = self._request("GET", f"{scheme}://{bucket}", query=query)
+            if status >= 400:
+                raise _http_error(status, path, body)
+            root = ET.fromstring(body)
+            for item in root.iter(f"{_S3_NS}Contents"):
+                obj_key = item.findtext(f"{_S3_NS}Key") or ""
+                name = obj_key[len(prefix):]
+                if not name or "/" in name:
+                    continue
+                modified = item.findtext(f"{_S3_NS}LastModified") or ""
+                try:
+                    mtime_ns = int(datetime.fromisoformat(modified.replace("Z", "+00:00")).timestamp() * 1e9)
+                except ValueError:
+                    mtime_ns = 0
+                yield FileInfo(base + obj_key, name, int(item.findtext(f"{_S3_NS}Size") or 0), mtime_ns, False)
+            for item in root.iter(f"{_S3_NS}CommonPrefixes"):
+                sub = (item.findtext(f"{_S3_NS}Prefix") or "").rstrip("/")
+                name = sub[len(prefix):]
+                if name:
+                    yield FileInfo(base + sub, name, 0, 0, True)
+            if max_keys or (root.findtext(f"{_S3_NS}IsTruncated") or "").lower() != "true":
+                return
+            token = root.findtext(f"{_S3_NS}NextContinuationToken")
+            if not token:
+                return
+
+    def list_dir(self, path: str) -> List[FileInfo]:
+        items = list(self._list(path))
+        if not items and not self.is_dir(path):
+            raise FileNotFoundError(f"目录不存在: {path}")
+        for info in items:
+            if not info.is_dir:
+                self._remember(info)
+        return items
+
+    def is_dir(self, path: str) -> bool:
+        bucket, key = self.split(path)
+        if not key.strip("/"):
+            return True
+        return next(self._list(path, max_keys=1), None) is not None
+
+
+class RangeReader(io.RawIOBase):
+    """
+    远程文件的可 seek 只读视图，读取时按需发起 Range 请求
+
+    最近读取的几个块保留在内存中：顺序读取（Avro）每次前进一个预读块，
+    Parquet / ORC 先读文件末尾（footer，向前扩展的块通常已包含完整 footer）再读列数据。
+    """
+
+    _MAX_BLOCKS = 4
+
+    def __init__(self, fs: HttpFileSystem, path: str, size: int, readahead: int):
+        super().__init__()
+        self.fs = fs
+        self.path = path
+        self.size = size
+        self.readahead = readahead
+        self._pos = 0
+        self._blocks: "OrderedDict[int, bytes]" = OrderedDict()
+        self.requests = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            pos = offset
+        elif whence == io.SEEK_CUR:
+            pos = self._pos + offset
+        elif whence == io.SEEK_END:
+            pos = self.size + offset
+        else:
+            raise ValueError(f"不支持的 whence: {whence}")
+        if pos < 0:
+            raise ValueError("seek 位置不能为负数")
+        self._pos = pos
+        return pos
+
+    def readinto(self, buffer: Any) -> int:
+        want = min(len(buffer), self.size - self._pos)
+        if want <= 0:
+            return 0
+        data = self._read_at(self._pos, want)
+        buffer[:len(data)] = data
+        self._pos += len(data)
+        return len(data)
+
+    def _read_at(self, pos: int, want: int) -> bytes:
+        for start, block in self._blocks.items():
+            if start <= pos < start + len(block):
+                self._blocks.move_to_end(start)
+                return block[pos - start:pos - start + want]
+        start = pos
+        end = min(self.size, pos + max(want, self.readahead))
+        if end == self.size:
+            # 读到文件末尾：向前扩展，footer 及其前面的元数据一次取回
+            start = max(0, min(pos, self.size - max(want, self.readahead)))
+        block = self.fs.read_range(self.path, start, end)
+        self.requests += 1
+        if not block:
+            return b""
+        self._blocks[start] = block
+        while len(self._blocks) > self._MAX_BLOCKS:
+            self._blocks.popitem(last=False)
+        return block[pos - start:pos - start + want]
+
+
+# ---------------------------------------------------------------------------
+# 对外接口
+# ---------------------------------------------------------------------------
+
+FileSystem = Union[LocalFileSystem, HttpFileSystem]
+
+LOCAL_FS = LocalFileSystem()
+_REMOTE_FS: Dict[str, HttpFileSystem] = {}
+_REMOTE_FS_LOCK = threading.Lock()
+
+
+def get_filesystem(path: str) -> FileSystem:
+    if not is_remote(path):
+        return LOCAL_FS
+    check_remote_path(path)
+    scheme = path.split("://", 1)[0].lower()
+    kind = "s3" if scheme in ("s3", "s3a") else "http"
+    with _REMOTE_FS_LOCK:
+        fs = _REMOTE_FS.get(kind)
+        if fs is None:
+            fs = _REMOTE_FS[kind] = S3FileSystem() if kind == "s3" else HttpFileSystem()
+        return fs
+
+
+def open_input(path: str) -> BinaryIO:
+    """以二进制只读方式打开文件（远程文件按需 Range 读取）"""
+    return get_filesystem(path).open(path)
+
+
+@contextmanager
+def input_source(path: str) -> Iterator[Union[str, BinaryIO]]:
+    """
+    供 pyarrow 等自己打开文件的库使用：本地文件给出路径（保留库自身的本地读取优化），
+    远程文件给出 open_input 的文件对象，离开时关闭
+    """
+    if not is_remote(path):
+        yield strip_file_prefix(path)
+        return
+    with open_input(path) as f:
+        yield f
+
+
+def stat_file(path: str) -> FileInfo:
+    return get_filesystem(path).stat(path)
+
+
+def path_exists(path: str) -> bool:
+    return get_filesystem(path).exists(path)
+
+
+def is_dir(path: str) -> bool:
+    return get_filesystem(path).is_dir(path)
+
+
+def list_names(path: str) -> List[str]:
+    """目录下的名称列表（本地与 os.listdir 相同）"""
+    return get_filesystem(path).list_names(path)
+
+
+def list_dir(path: str) -> List[FileInfo]:
+    """目录下的文件与子目录，带大小与修改时间"""
+    return get_filesystem(path).list_dir(path)
+
+
+def read_range(path: str, start: int, end: int) -> bytes:
+    return get_filesystem(path).read_range(path, start, end)
+
+
+def file_identity(path: str) -> Optional[Tuple[str, int, int]]:
+    """(规范化路径, 大小, 修改时间 ns)，用作缓存 key；文件不存在或不允许访问时返回 None"""
+    try:
+        fs = get_filesystem(path)
+    except PermissionError:
+        return None
+    return fs.identity(path)
+
+
+def join_path(base: str, *names: str) -> str:
+    if is_remote(base):
+        return "/".join([base.rstrip("/")] + [n.strip("/") for n in names])
+    return os.path.join(strip_file_prefix(base), *names)
+
+
+def base_name(path: str) -> str:
+    if is_remote(path):
+        return path.rstrip("/").rsplit("/", 1)[-1]
+    return os.path.basename(strip_file_prefix(path).rstrip("/\\"))
+
+
+def parent_path(path: str) -> str:
+    if is_remote(path):
+        return path.rstrip("/").rsplit("/", 1)[0]
+    return os.path.dirname(strip_file_prefix(path).rstrip("/\\"))
+
+
+def metadata_dir_of(path: str) -> str:
+    """传入表根目录或其 metadata 目录，返回 metadata 目录"""
+    path = path.rstrip("/\\") or path
+    return path if base_name(path) == "metadata" else join_path(path, "metadata")
+
+
+def table_root_of(path: str) -> str:
+    """传入表根目录或其 metadata 目录，返回表根目录"""
+    path = path.rstrip("/\\") or path
+    return parent_path(path) if base_name(path) == "metadata" else path
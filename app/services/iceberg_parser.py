@@ -1,9 +1,26 @@
 """Iceberg 元数据解析服务"""
+import functools
 import json
-from pathlib import Path
-from typing import Any, Dict, List, Optional
+import re
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
 from typing import Tuple
+
+from app.config import SCAN_EXECUTOR, SCAN_MAX_WORKERS, SCAN_MODE
+from app.services.filesystem import (
+    input_source,
+    is_dir,
+    join_path,
+    list_dir,
+    list_names,
+    open_input,
+    path_exists,
+    strip_file_prefix,
+)
 from app.services.json_utils import format_json, parse_json_file
+from app.services.metrics import record_bytes, record_records, stage
+from app.services.parse_cache import cached_parse_avro_file
+from app.services.profiler import bind
 
 
 def _bytes_to_text(b: bytes) -> str:
@@ -36,32 +53,292 @@ def make_json_safe(obj: Any) -> Any:
     return obj
 
 
-def parse_avro_file(file_path: str) -> Dict[str, Any]:
+# ---- 按 Avro schema 编译的 JSON 安全转换 ----
+#
+# make_json_safe 对每条记录做通用的递归遍历，每一层都要 isinstance 判断并新建 dict / list。
+# 这里根据 schema 预先编译出转换函数：只处理可能包含 bytes / fixed 的字段（原地替换），
+# 其余字段不做任何处理；schema 中完全没有 bytes 时不需要转换。
+
+_AVRO_PLAIN_TYPES = {"null", "boolean", "int", "long", "float", "double", "string"}
+_PENDING = object()
+
+AvroConverter = Optional[Callable[[Any], Any]]
+
+
+def _convert_bytes(value: Any) -> Any:
+    # decimal 等逻辑类型已被 fastavro 转换成对应的 Python 对象，不是 bytes 时原样返回
+    return _bytes_to_text(value) if type(value) is bytes else value
+
+
+def _record_converter(fields: List[Tuple[str, Callable[[Any], Any]]]) -> Callable[[Any], Any]:
+    def convert(record: Any) -> Any:
+        if type(record) is not dict:
+            return record
+        for name, conv in fields:
+            value = record.get(name)
+            if value is not None:
+                record[name] = conv(value)
+        return record
+    return convert
+
+
+def _array_converter(conv: Callable[[Any], Any]) -> Callable[[Any], Any]:
+    def convert(items: Any) -> Any:
+        if type(items) is not list:
+            return items
+        return [conv(x) for x in items]
+    return convert
+
+
+def _map_converter(conv: Callable[[Any], Any]) -> Callable[[Any], Any]:
+    def convert(mapping: Any) -> Any:
+        if type(mapping) is not dict:
+            return mapping
+        return {k: conv(v) for k, v in mapping.items()}
+    return convert
+
+
+def _compile_avro_type(avro_type: Any, named: Dict[str, Any], namespace: Optional[str]) -> AvroConverter:
+    """
+    为 Avro 类型编译转换函数；不需要转换时返回 None
+
+    所有转换函数在值类型不符时都原样返回，因此 union 中的多个分支可以共用
+    """
+    if isinstance(avro_type, str):
+        if avro_type == "bytes":
+            return _convert_bytes
+        if avro_type in _AVRO_PLAIN_TYPES:
+            return None
+        # 命名类型引用
+        candidates = [avro_type] if "." in avro_type or not namespace else [f"{namespace}.{avro_type}", avro_type]
+        for key in candidates:
+            if key in named:
+                conv = named[key]
+                # 递归引用自身的 record 退回通用转换
+                return make_json_safe if conv is _PENDING else conv
+        return make_json_safe
+
+    if isinstance(avro_type, list):
+        active = [c for c in (_compile_avro_type(t, named, namespace) for t in avro_type) if c is not None]
+        if not active:
+            return None
+        if len(active) == 1:
+            return active[0]
+        return make_json_safe
+
+    if isinstance(avro_type, dict):
+        kind = avro_type.get("type")
+        if kind in ("record", "error", "enum", "fixed"):
+            name = avro_type.get("name") or ""
+            ns = avro_type.get("namespace") or (name.rpartition(".")[0] if "." in name else namespace)
+            fullname = name if "." in name or not ns else f"{ns}.{name}"
+            keys = {fullname, name.rpartition(".")[2]}
+            if kind == "enum":
+                conv: AvroConverter = None
+            elif kind == "fixed":
+                conv = _convert_bytes
+            else:
+                for key in keys:
+                    named[key] = _PENDING
+                fields = []
+                for f in avro_type.get("fields") or []:
+                    field_conv = _compile_avro_type(f.get("type"), named, ns)
+                    if field_conv is not None:
+                        fields.append((f.get("name"), field_conv))
+                conv = _record_converter(fields) if fields else None
+            for key in keys:
+                named[key] = conv
+            return conv
+        if kind == "array":
+            item_conv = _compile_avro_type(avro_type.get("items"), named, namespace)
+            return _array_converter(item_conv) if item_conv is not None else None
+        if kind == "map":
+            value_conv = _compile_avro_type(avro_type.get("values"), named, namespace)
+            return _map_converter(value_conv) if value_conv is not None else None
+        # {"type": "bytes", "logicalType": ...} 之类的带属性基础类型
+        return _compile_avro_type(kind, named, namespace)
+
+    return make_json_safe
+
+
+@functools.lru_cache(maxsize=256)
+def compile_avro_converter(schema_json: str) -> AvroConverter:
+    """按 schema（JSON 字符串）编译并缓存转换函数，同一 writer schema 只编译一次"""
+    return _compile_avro_type(json.loads(schema_json), {}, None)
+
+
+def _avro_reader_converter(avro_reader: Any) -> AvroConverter:
+    """取 fastavro reader / block_reader 对应的转换函数"""
+    if avro_reader.reader_schema is None:
+        # 直接用文件头中的原始 schema 字符串作为缓存 key，不需要重新序列化
+        raw = avro_reader.metadata.get("avro.schema")
+        if isinstance(raw, bytes):
+            raw = raw.decode("utf-8")
+        if raw:
+            return compile_avro_converter(raw)
+        schema = avro_reader.writer_schema
+    else:
+        schema = avro_reader.reader_schema
+    return compile_avro_converter(json.dumps(schema, sort_keys=True))
+
+
+def _avro_error_result(e: Exception) -> Dict[str, Any]:
+    msg = str(e)
+    hints: List[str] = []
+
+    # 针对常见编解码器缺失给出明确提示（不要声称“已添加到 requirements.txt”）
+    low = msg.lower()
+    if "snappy" in low:
+        hints.append("可能缺少 python-snappy（pip install python-snappy）或系统 snappy 库")
+    if "zstandard" in low or "zstd" in low:
+        hints.append("可能缺少 zstandard（pip install zstandard）")
+
+    hint_text = f"；{'；'.join(hints)}" if hints else ""
+    return {
+        "success": False,
+        "data": None,
+        "error": f"解析 Avro 失败: {msg}{hint_text}",
+        "raw_output": {
+            "exception": repr(e),
+        },
+    }
+
+
+def _missing_avro_result(file_path: str) -> Dict[str, Any]:
+    return {
+        "success": False,
+        "data": None,
+        "error": f"文件不存在: {file_path} (resolved: {strip_file_prefix(file_path or '')})",
+        "raw_output": None
+    }
+
+
+# manifest list 概览只需要的字段（不包含体积较大的 partitions field_summary）
+# 文件数字段 v1 为 *_data_files_count，v2 改名为 *_files_count，两种都要保留
+MANIFEST_LIST_SUMMARY_FIELDS: Tuple[str, ...] = (
+    "manifest_path",
+    "manifest_length",
+    "partition_spec_id",
+    "content",
+    "sequence_number",
+    "min_sequence_number",
+    "added_snapshot_id",
+    "added_data_files_count",
+    "existing_data_files_count",
+    "deleted_data_files_count",
+    "added_files_count",
+    "existing_files_count",
+    "deleted_files_count",
+    "added_rows_count",
+    "existing_rows_count",
+    "deleted_rows_count",
+)
+
+
+# manifest entry 统计只需要的字段（跳过列级 bounds / counts 等体积较大的字段）
+MANIFEST_ENTRY_SUMMARY_FIELDS: Tuple[str, ...] = (
+    "status",
+    "snapshot_id",
+    "sequence_number",
+    "file_sequence_number",
+    "data_file.content",
+    "data_file.file_path",
+    "data_file.file_format",
+    "data_file.partition",
+    "data_file.record_count",
+    "data_file.file_size_in_bytes",
+)
+
+
+def _project_type(avro_type: Any, fields: Sequence[str]) -> Optional[Any]:
+    # 只有 record（或包含 record 的 union，例如 ["null", record]）可以继续向下投影
+    if isinstance(avro_type, list):
+        projected_union = [_project_type(t, fields) for t in avro_type]
+        if all(p is None for p in projected_union):
+            return None
+        return [p if p is not None else t for p, t in zip(projected_union, avro_type)]
+    if isinstance(avro_type, dict) and avro_type.get("type") == "record":
+        return _projected_reader_schema(avro_type, fields)
+    return None
+
+
+def _projected_reader_schema(writer_schema: Dict[str, Any], fields: Sequence[str]) -> Optional[Dict[str, Any]]:
+    """
+    基于 writer schema 构造只包含指定字段的 reader schema，
+    fastavro 会跳过其余字段而不解码。无法投影时返回 None。
+
+    字段支持用 "." 指定嵌套 record 中的字段，例如 "data_file.record_count"
+    """
+    if not isinstance(writer_schema, dict) or writer_schema.get("type") != "record":
+        return None
+    nested: Dict[str, List[str]] = {}
+    whole: set = set()
+    for field in fields:
+        head, _, rest = field.partition(".")
+        if rest:
+            nested.setdefault(head, []).append(rest)
+        else:
+            whole.add(head)
+
+    writer_fields = writer_schema.get("fields", [])
+    kept: List[Dict[str, Any]] = []
+    changed = False
+    for f in writer_fields:
+        name = f.get("name")
+        if name in whole:
+            kept.append(f)
+        elif name in nested:
+            sub_type = _project_type(f.get("type"), nested[name])
+            if sub_type is None:
+                kept.append(f)
+            else:
+                kept.append({**f, "type": sub_type})
+                changed = True
+    if not changed and len(kept) == len(writer_fields):
+        return None
+    projected = {k: v for k, v in writer_schema.items() if k != "fields"}
+    projected["fields"] = kept
+    return projected
+
+
+def parse_avro_file(file_path: str, fields: Optional[Sequence[str]] = None) -> Dict[str, Any]:
     """
     使用 fastavro 解析 Avro 容器文件，返回 Python 数据结构
+
+    Args:
+        file_path: Avro 文件路径
+        fields: 只读取这些字段（投影读取，嵌套字段用 "." 分隔）；不传则读取完整记录
     """
     try:
-        # 统一处理 file: 前缀，避免各处重复处理/漏处理
-        raw = file_path or ""
-        actual_path = raw.replace("file:", "", 1) if raw.startswith("file:") else raw
-        p = Path(actual_path)
-
-        if not p.exists():
-            return {
-                "success": False,
-                "data": None,
-                "error": f"文件不存在: {file_path} (resolved: {actual_path})",
-                "raw_output": None
-            }
+        if not path_exists(file_path or ""):
+            return _missing_avro_result(file_path)
 
         from fastavro import reader
-        records: List[Any] = []
-        with p.open("rb") as fo:
-            for rec in reader(fo):
-                records.append(rec)
+        with open_input(file_path) as fo:
+            with stage("avro_open"):
+                avro_reader = reader(fo)
+                if fields:
+                    reader_schema = _projected_reader_schema(avro_reader.writer_schema, fields)
+                    if reader_schema is not None:
+                        try:
+                            fo.seek(0)
+                            avro_reader = reader(fo, reader_schema=reader_schema)
+                        except Exception:
+                            # 投影 schema 引用了被裁掉字段里定义的命名类型等情况，退回完整读取
+                            fo.seek(0)
+                            avro_reader = reader(fo)
+                # 按 schema 编译的转换，避免 bytes 导致 JSON 序列化失败
+                convert = _avro_reader_converter(avro_reader)
+            # 先解码再转换（转换是原地修改），两个阶段分开计时
+            with stage("avro_decode"):
+                records: List[Any] = list(avro_reader)
+            record_bytes("avro", fo.tell())
+        record_records("avro", len(records))
+        if convert is not None:
+            with stage("avro_convert"):
+                records = [convert(rec) for rec in records]
 
         data: Any = records[0] if len(records) == 1 else records
-        data = make_json_safe(data)  # <-- 关键：避免 bytes 导致 JSON 序列化失败
 
         return {
             "success": True,
@@ -70,50 +347,183 @@ def parse_avro_file(file_path: str) -> Dict[str, Any]:
             "raw_output": None
         }
     except Exception as e:
-        msg = str(e)
-        hints: List[str] = []
+        return _avro_error_result(e)
 
-        # 针对常见编解码器缺失给出明确提示（不要声称“已添加到 requirements.txt”）
-        low = msg.lower()
-        if "snappy" in low:
-            hints.append("可能缺少 python-snappy（pip install python-snappy）或系统 snappy 库")
-        if "zstandard" in low or "zstd" in low:
-            hints.append("可能缺少 zstandard（pip install zstandard）")
 
-        hint_text = f"；{'；'.join(hints)}" if hints else ""
+def iter_avro_records(file_path: str, offset: int = 0, limit: Optional[int] = None) -> Iterator[Any]:
+    """
+    逐条解码 Avro 记录（已转换为 JSON 安全结构），只保留当前记录，内存占用与文件大小无关
+
+    - offset 之前完整落在某个 block 内的记录整块跳过，不做解码
+    - limit 为 None 时读到文件末尾
+    """
+    if limit is not None and limit <= 0:
+        return
+    if not path_exists(file_path or ""):
+        raise FileNotFoundError(f"文件不存在: {file_path} (resolved: {strip_file_prefix(file_path or '')})")
+
+    from fastavro import block_reader
+    skip = max(0, offset)
+    remaining = limit
+    decoded = 0
+    with open_input(file_path) as fo:
+        try:
+            blocks = block_reader(fo)
+            convert = _avro_reader_converter(blocks)
+            for block in blocks:
+                if skip >= block.num_records:
+                    skip -= block.num_records
+                    continue
+                for rec in block:
+                    decoded += 1
+                    if skip:
+                        skip -= 1
+                        continue
+                    yield convert(rec) if convert is not None else rec
+                    if remaining is not None:
+                        remaining -= 1
+                        if remaining <= 0:
+                            return
+        finally:
+            record_bytes("avro", fo.tell())
+            record_records("avro", decoded)
+
+
+def read_avro_page(file_path: str, offset: int = 0, limit: int = 100) -> Dict[str, Any]:
+    """
+    分页读取 Avro 记录，返回结构与 parse_avro_file 一致，额外带分页信息
+
+    Returns:
+        dict: data 为当前页记录列表；has_more 表示 offset + limit 之后是否还有记录
+    """
+    try:
+        if not path_exists(file_path or ""):
+            return _missing_avro_result(file_path)
+
+        # 多读一条用来判断是否还有下一页
+        records = list(iter_avro_records(file_path, offset, limit + 1))
+        has_more = len(records) > limit
         return {
-            "success": False,
-            "data": None,
-            "error": f"解析 Avro 失败: {msg}{hint_text}",
-            "raw_output": {
-                "exception": repr(e),
-            },
+            "success": True,
+            "data": records[:limit],
+            "error": None,
+            "raw_output": None,
+            "offset": offset,
+            "limit": limit,
+            "has_more": has_more,
         }
+    except Exception as e:
+        return _avro_error_result(e)
+
+
+_METADATA_VERSION_RE = re.compile(r"^v?(\d+)[-.]")
+
+
+def metadata_version_number(file_name: str) -> int:
+    """
+    metadata.json 文件名中的版本序号，无法解析时返回 999999（排在最后）
+
+    支持 00001-<uuid>.metadata.json 与 Hadoop 表的 v1.metadata.json
+    """
+    match = _METADATA_VERSION_RE.match(file_name)
+    return int(match.group(1)) if match else 999999
+
+
+def latest_metadata_file(metadata_dir: str) -> Optional[str]:
+    """metadata 目录中版本号最大的 *.metadata.json 的完整路径；没有时返回 None"""
+    try:
+        names = [n for n in list_names(metadata_dir) if _classify_metadata_file(n) == "metadata_files"]
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+    if not names:
+        return None
+    # 无法解析版本号的文件（999999）只在没有其他版本时使用
+    parsed = [n for n in names if metadata_version_number(n) != 999999] or names
+    return join_path(metadata_dir, max(parsed, key=lambda n: (metadata_version_number(n), n)))
+
+
+def _classify_metadata_file(file_name: str) -> Optional[str]:
+    """按文件名判断 metadata 目录下文件的分类；需要忽略的文件返回 None"""
+    # 过滤掉 .crc 文件
+    if file_name.endswith(".crc"):
+        return None
+    # Metadata 文件：*.metadata.json
+    if file_name.endswith(".metadata.json"):
+        return "metadata_files"
+    # Snapshot 文件：snap-*.avro
+    if file_name.startswith("snap-") and file_name.endswith(".avro"):
+        return "snapshots"
+    # Data Avro 文件：*-m*.avro 或其他 .avro 数据文件
+    if file_name.endswith(".avro"):
+        return "data_avro"
+    # Data Parquet 文件：partition-stats-*.parquet 或其他 .parquet 文件
+    if file_name.endswith(".parquet"):
+        return "data_parquet"
+    return "other_files"
+
 
+def _fill_snapshot_manifest_paths(snapshots: List[Dict[str, Any]], mode: str, max_workers: int) -> None:
+    """按扫描模式为 snapshot 文件补充 manifest_paths（解析失败时为空列表，不影响其他文件）"""
+    if mode == "lazy":
+        # 只返回文件列表，manifest_paths 由 /api/snapshot-manifests 按需获取
+        for file_info in snapshots:
+            file_info["manifest_paths"] = None
+        return
 
-def scan_metadata_directory(metadata_dir: str) -> Dict[str, Any]:
+    if mode == "parallel" and len(snapshots) > 1:
+        from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+        if SCAN_EXECUTOR == "process":
+            pool_cls, extract = ProcessPoolExecutor, _extract_manifest_paths_from_snapshot
+        else:
+            pool_cls, extract = ThreadPoolExecutor, bind(_extract_manifest_paths_from_snapshot)
+        with pool_cls(max_workers=max_workers) as pool:
+            paths = pool.map(extract, [f["path"] for f in snapshots])
+            for file_info, manifest_paths in zip(snapshots, paths):
+                file_info["manifest_paths"] = manifest_paths
+        return
+
+    for file_info in snapshots:
+        file_info["manifest_paths"] = _extract_manifest_paths_from_snapshot(file_info["path"])
+
+
+def scan_metadata_directory(metadata_dir: str, mode: Optional[str] = None,
+                            max_workers: Optional[int] = None) -> Dict[str, Any]:
     """
     扫描 Iceberg metadata 目录，分类列出文件
-    
+
+    Args:
+        metadata_dir: metadata 目录路径
+        mode: snapshot 解析模式
+            - eager: 逐个解析 snap-*.avro，填充 manifest_paths
+            - parallel: 使用有界线程池（或进程池）并发解析
+            - lazy: 不解析，manifest_paths 为 None，按需获取
+        max_workers: parallel 模式的并发数
+
     Returns:
-        dict: 包含文件分类的字典
+        dict: 包含文件分类的字典，timing 中是各阶段耗时（毫秒）
     """
-    metadata_path = Path(metadata_dir)
-    
-    if not metadata_path.exists():
+    mode = (mode or SCAN_MODE).lower()
+    if mode not in {"eager", "parallel", "lazy"}:
+        return {
+            "success": False,
+            "error": f"不支持的扫描模式: {mode}",
+            "files": {}
+        }
+    if not path_exists(metadata_dir):
         return {
             "success": False,
             "error": f"目录不存在: {metadata_dir}",
             "files": {}
         }
-    
-    if not metadata_path.is_dir():
+
+    if not is_dir(metadata_dir):
         return {
             "success": False,
             "error": f"路径不是目录: {metadata_dir}",
             "files": {}
         }
-    
+
     files = {
         "metadata_files": [],     # *.metadata.json 表元数据文件
         "snapshots": [],          # snap-*.avro 快照文件（包含 manifest_paths）
@@ -121,51 +531,38 @@ def scan_metadata_directory(metadata_dir: str) -> Dict[str, Any]:
         "data_parquet": [],       # partition-stats-*.parquet 或其他 parquet 文件
         "other_files": []         # 其他文件
     }
-    
+
     try:
-        for file_path in sorted(metadata_path.iterdir()):
-            if file_path.is_dir():
+        started = time.perf_counter()
+        for entry in sorted(list_dir(metadata_dir), key=lambda e: e.name):
+            if entry.is_dir:
                 continue
-            
-            file_name = file_path.name
-            
-            # 过滤掉 .crc 文件
-            if file_name.endswith(".crc"):
+
+            category = _classify_metadata_file(entry.name)
+            if category is None:
                 continue
-            
-            file_info = {
-                "name": file_name,
-                "path": str(file_path),
-                "size": file_path.stat().st_size
-            }
-            
-            # Metadata 文件：*.metadata.json
-            if file_name.endswith(".metadata.json"):
-                files["metadata_files"].append(file_info)
-            # Snapshot 文件：snap-*.avro
-            elif file_name.startswith("snap-") and file_name.endswith(".avro"):
-                # 尝试解析 snapshot 文件，提取 manifest_path（失败时返回空列表）
-                try:
-                    manifest_paths = _extract_manifest_paths_from_snapshot(str(file_path))
-                    file_info["manifest_paths"] = manifest_paths
-                except Exception:
-                    # 解析失败时，设置为空列表，不影响其他文件
-                    file_info["manifest_paths"] = []
-                files["snapshots"].append(file_info)
-            # Data Avro 文件：*-m*.avro 或其他 .avro 数据文件
-            elif file_name.endswith(".avro") and ("-m" in file_name or not file_name.startswith("snap-")):
-                files["data_avro"].append(file_info)
-            # Data Parquet 文件：partition-stats-*.parquet 或其他 .parquet 文件
-            elif file_name.endswith(".parquet"):
-                files["data_parquet"].append(file_info)
-            else:
-                files["other_files"].append(file_info)
-        
+
+            files[category].append({
+                "name": entry.name,
+                "path": entry.path,
+                "size": entry.size
+            })
+        listed = time.perf_counter()
+
+        _fill_snapshot_manifest_paths(files["snapshots"], mode, max_workers or SCAN_MAX_WORKERS)
+        finished = time.perf_counter()
+
         return {
             "success": True,
             "error": None,
             "files": files,
-            "latest_version": _get_latest_version(files["metadata_files"])
+            "latest_version": _get_latest_version(files["metadata_files"]),
+            "timing": {
+                "mode": mode,
+                "list_ms": round((listed - started) * 1000, 3),
+                "manifest_paths_ms": round((finished - listed) * 1000, 3),
+                "total_ms": round((finished - started) * 1000, 3),
+            },
         }
     except Exception as e:
         return {
@@ -186,7 +583,7 @@ def _extract_manifest_paths_from_snapshot(snapshot_path: str) -> List[str]:
         list: manifest_path 列表
     """
     try:
-        result = parse_avro_file(snapshot_path)
+        result = cached_parse_avro_file(snapshot_path, fields=("manifest_path",))
         if not result["success"] or not result["data"]:
             return []
         
@@ -211,6 +608,11 @@ def _extract_manifest_paths_from_snapshot(snapshot_path: str) -> List[str]:
         return []
 
 
+def get_snapshot_manifest_paths(snapshot_path: str) -> List[str]:
+    """按需获取单个 snapshot 文件的 manifest_path 列表（配合 lazy 扫描模式使用）"""
+    return _extract_manifest_paths_from_snapshot(snapshot_path)
+
+
 def _get_latest_version(metadata_files: List[Dict]) -> Optional[str]:
     """获取最新的 metadata 版本文件名"""
     if not metadata_files:
@@ -304,6 +706,85 @@ def extract_table_metadata_info(metadata_data: Dict[str, Any]) -> Dict[str, Any]
     return info
 
 
+def as_records(data: Any) -> List[Dict[str, Any]]:
+    """parse_avro_file 对单条记录的文件返回 dict，这里统一成记录列表"""
+    if isinstance(data, list):
+        return [x for x in data if isinstance(x, dict)]
+    if isinstance(data, dict):
+        return [data]
+    return []
+
+
+def find_snapshot(metadata_data: Dict[str, Any], snapshot_id: Any) -> Optional[Dict[str, Any]]:
+    """在 table metadata 的 snapshots 中查找指定 snapshot（兼容字符串形式的 id）"""
+    if not isinstance(metadata_data, dict) or snapshot_id is None:
+        return None
+    snapshots = metadata_data.get("snapshots") or []
+    if not isinstance(snapshots, list):
+        return None
+    for s in snapshots:
+        if isinstance(s, dict):
+            sid = s.get("snapshot-id") or s.get("snapshot_id")
+            if sid == snapshot_id or (sid is not None and str(sid) == str(snapshot_id)):
+                return s
+    return None
+
+
+def read_manifest_list(manifest_list: str,
+                       fields: Sequence[str] = MANIFEST_LIST_SUMMARY_FIELDS) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    投影读取 manifest list
+
+    Returns:
+        tuple: (manifest_file 记录列表, 解析失败时的错误信息)
+    """
+    result = cached_parse_avro_file(str(manifest_list), fields=fields)
+    if not result.get("success"):
+        return [], result.get("error")
+    return as_records(result.get("data")), None
+
+
+def read_manifest_entries(manifest_path: str,
+                          fields: Optional[Sequence[str]] = MANIFEST_ENTRY_SUMMARY_FIELDS) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    投影读取 manifest 文件中的 manifest_entry
+
+    Returns:
+        tuple: (manifest_entry 记录列表, 解析失败时的错误信息)
+    """
+    result = cached_parse_avro_file(str(manifest_path), fields=fields)
+    if not result.get("success"):
+        return [], result.get("error")
+    return as_records(result.get("data")), None
+
+
+def extract_snapshot_manifests(metadata_data: Dict[str, Any], snapshot_id: Any = None) -> Dict[str, Any]:
+    """
+    解析指定 snapshot（默认当前 snapshot）的 manifest list
+
+    Returns:
+        dict: snapshot_id / snapshot / manifest_list / manifests（概览字段）/ manifest_list_error
+    """
+    if snapshot_id is None and isinstance(metadata_data, dict):
+        snapshot_id = metadata_data.get("current-snapshot-id") or metadata_data.get("current_snapshot_id")
+    snapshot_obj = find_snapshot(metadata_data, snapshot_id)
+    manifest_list = None
+    manifests: List[Dict[str, Any]] = []
+    manifest_list_error: Optional[str] = None
+    if snapshot_obj is not None:
+        manifest_list = snapshot_obj.get("manifest-list") or snapshot_obj.get("manifest_list")
+    if manifest_list:
+        # 关键：把 manifest-list 解析失败原因带回去，便于接口/前端展示
+        manifests, manifest_list_error = read_manifest_list(manifest_list)
+    return {
+        "snapshot_id": snapshot_id,
+        "snapshot": snapshot_obj,
+        "manifest_list": manifest_list,
+        "manifests": manifests,
+        "manifest_list_error": manifest_list_error,
+    }
+
+
 def extract_current_snapshot_manifests(metadata_data: Dict[str, Any]) -> Dict[str, Any]:
     current_snapshot_id = None
     manifest_list = None
@@ -313,34 +794,14 @@ def extract_current_snapshot_manifests(metadata_data: Dict[str, Any]) -> Dict[st
 
     if isinstance(metadata_data, dict):
         current_snapshot_id = metadata_data.get("current-snapshot-id") or metadata_data.get("current_snapshot_id")
-        snapshots = metadata_data.get("snapshots") or []
-        if current_snapshot_id and isinstance(snapshots, list):
-            for s in snapshots:
-                if isinstance(s, dict):
-                    sid = s.get("snapshot-id") or s.get("snapshot_id")
-                    if sid == current_snapshot_id:
-                        current_snapshot_obj = s
-                        manifest_list = s.get("manifest-list") or s.get("manifest_list")
-                        break
+        if current_snapshot_id:
+            current_snapshot_obj = find_snapshot(metadata_data, current_snapshot_id)
+        if current_snapshot_obj is not None:
+            manifest_list = current_snapshot_obj.get("manifest-list") or current_snapshot_obj.get("manifest_list")
 
         if manifest_list:
-            actual_path = str(manifest_list)
-            result = parse_avro_file(actual_path)
-            if result.get("success") and result.get("data"):
-                data = result["data"]
-                if isinstance(data, list):
-                    for item in data:
-                        if isinstance(item, dict):
-                            mp = item.get("manifest_path")
-                            if mp:
-                                manifest_paths.append(mp)
-                elif isinstance(data, dict):
-                    mp = data.get("manifest_path")
-                    if mp:
-                        manifest_paths.append(mp)
-            else:
-                # 关键：把 manifest-list 解析失败原因带回去，便于接口/前端展示
-                manifest_list_error = result.get("error")
+            manifests, manifest_list_error = read_manifest_list(manifest_list, fields=("manifest_path",))
+            manifest_paths = [m["manifest_path"] for m in manifests if m.get("manifest_path")]
 
     return {
         "current_snapshot_id": current_snapshot_id,
@@ -402,6 +863,10 @@ def extract_manifest_info(manifest_data: Any) -> Dict[str, Any]:
                         "column_file_ids": cf.get("column_file_ids") or []
                     })
         data_files.append({
+            "status": _unwrap_union(entry.get("status")),
+            "snapshot_id": _unwrap_union(entry.get("snapshot_id")),
+            "sequence_number": _unwrap_union(entry.get("sequence_number")),
+            "content": df.get("content") or 0,
             "file_path": file_path,
             "file_format": file_format,
             "partition": partition,
@@ -415,107 +880,338 @@ def extract_manifest_info(manifest_data: Any) -> Dict[str, Any]:
     }
 
 
-def _strip_file_prefix(path: str) -> str:
-    if isinstance(path, str) and path.startswith("file:"):
-        return path.replace("file:", "", 1)
-    return path
+def _stat_value(value: Any) -> Any:
+    # 统计值可能是 bytes / datetime / Decimal 等，统一转成可 JSON 序列化的形式
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, bytes):
+        return _bytes_to_text(value)
+    return str(value)
+
+
+def _check_columns(available: List[str], columns: Optional[Sequence[str]]) -> Optional[List[str]]:
+    if not columns:
+        return None
+    missing = [c for c in columns if c not in available]
+    if missing:
+        raise ValueError(f"列不存在: {', '.join(missing)}（可用列: {', '.join(available)}）")
+    return list(columns)
 
 
-def read_parquet_rows(file_path: str, limit: int = 100) -> Tuple[List[Dict[str, Any]], List[str]]:
-    actual = _strip_file_prefix(file_path)
+def read_parquet_metadata(file_path: str, max_row_groups: int = 100) -> Dict[str, Any]:
+    """
+    只读取 Parquet footer，返回文件级元数据（row group、列统计、压缩方式），不读取数据页
 
+    Args:
+        max_row_groups: 最多返回多少个 row group 的明细，超出部分只计入汇总
+    """
     import pyarrow.parquet as pq  # type: ignore
 
-    table = pq.read_table(actual)
-    rows = table.to_pylist()[:limit]
-    fields = [f.name for f in table.schema]
-    return rows, fields
+    with input_source(file_path) as source:
+        md = pq.ParquetFile(source).metadata
+    row_groups: List[Dict[str, Any]] = []
+    for i in range(min(md.num_row_groups, max_row_groups)):
+        rg = md.row_group(i)
+        columns: List[Dict[str, Any]] = []
+        for j in range(rg.num_columns):
+            col = rg.column(j)
+            stats = col.statistics if col.is_stats_set else None
+            columns.append({
+                "path": col.path_in_schema,
+                "physical_type": col.physical_type,
+                "compression": col.compression,
+                "encodings": list(col.encodings),
+                "total_compressed_size": col.total_compressed_size,
+                "total_uncompressed_size": col.total_uncompressed_size,
+                "statistics": {
+                    "min": _stat_value(stats.min) if stats.has_min_max else None,
+                    "max": _stat_value(stats.max) if stats.has_min_max else None,
+                    "null_count": stats.null_count if stats.has_null_count else None,
+                    "distinct_count": stats.distinct_count if stats.has_distinct_count else None,
+                } if stats is not None else None,
+            })
+        row_groups.append({
+            "index": i,
+            "num_rows": rg.num_rows,
+            "total_byte_size": rg.total_byte_size,
+            "columns": columns,
+        })
+    return {
+        "num_rows": md.num_rows,
+        "num_columns": md.num_columns,
+        "num_row_groups": md.num_row_groups,
+        "created_by": md.created_by,
+        "format_version": md.format_version,
+        "serialized_size": md.serialized_size,
+        "row_groups": row_groups,
+        "row_groups_truncated": md.num_row_groups > len(row_groups),
+    }
+
+
+def _parquet_chunk_bytes(md: Any, row_groups: Sequence[int], rows_decoded: int,
+                         columns: Optional[Sequence[str]]) -> int:
+    """按解码的行数推算读到的 row group，累加其中被读取列块的压缩大小（用于统计读取字节数）"""
+    wanted = set(columns) if columns else None
+    total = 0
+    for i in row_groups:
+        if rows_decoded <= 0:
+            break
+        rg = md.row_group(i)
+        rows_decoded -= rg.num_rows
+        for j in range(rg.num_columns):
+            col = rg.column(j)
+            if wanted is None or col.path_in_schema.split(".")[0] in wanted:
+                total += col.total_compressed_size
+    return total
 
 
-def read_orc_rows(file_path: str, limit: int = 100) -> Tuple[List[Dict[str, Any]], List[str]]:
+def read_parquet_rows(file_path: str, limit: int = 100, offset: int = 0,
+                      columns: Optional[Sequence[str]] = None) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """
+    按 row group 读取 Parquet 预览行
+
+    - offset 之前的整个 row group 直接跳过，不读取数据页
+    - 只读取 columns 指定的列
+    - 凑够 limit 行后立即停止
+    """
+    with input_source(file_path) as source:
+        return _read_parquet_rows(source, limit, offset, columns)
+
+
+def _read_parquet_rows(source: Any, limit: int, offset: int,
+                       columns: Optional[Sequence[str]]) -> Tuple[List[Dict[str, Any]], List[str]]:
+    import pyarrow.parquet as pq  # type: ignore
+
+    with stage("parquet_footer"):
+        pf = pq.ParquetFile(source)
+        columns = _check_columns(pf.schema_arrow.names, columns)
+        fields = columns or list(pf.schema_arrow.names)
+        md = pf.metadata
+    record_bytes("parquet", md.serialized_size)
+
+    skip = max(0, offset)
+    row_groups: List[int] = []
+    for i in range(md.num_row_groups):
+        num_rows = md.row_group(i).num_rows
+        if not row_groups and skip >= num_rows:
+            skip -= num_rows
+            continue
+        row_groups.append(i)
+
     rows: List[Dict[str, Any]] = []
-    fields: List[str] = []
-    actual = _strip_file_prefix(file_path)
+    if not row_groups or limit <= 0:
+        return rows, fields
+    decoded = 0
+    batches = pf.iter_batches(batch_size=max(1, min(limit + skip, 65536)), row_groups=row_groups, columns=columns)
+    while True:
+        with stage("parquet_read"):
+            batch = next(batches, None)
+        if batch is None:
+            break
+        decoded += batch.num_rows
+        if skip >= batch.num_rows:
+            skip -= batch.num_rows
+            continue
+        batch = batch.slice(skip, limit - len(rows))
+        skip = 0
+        with stage("parquet_to_pylist"):
+            rows.extend(batch.to_pylist())
+        if len(rows) >= limit:
+            break
+    record_bytes("parquet", _parquet_chunk_bytes(md, row_groups, decoded, columns))
+    record_records("parquet", decoded)
+    return rows, fields
 
-    # Prefer pyarrow if available, fallback to pyorc if installed.
+
+def _orc_statistics(stats: Dict[str, Any]) -> Dict[str, Any]:
+    # kind 是 TypeKind 枚举，展示名字比数字更直观
+    return {
+        str(k): getattr(v, "name", v) if k == "kind" else _stat_value(v)
+        for k, v in (stats or {}).items()
+    }
+
+
+def _orc_stripe_row_counts(file_path: str) -> Optional[List[int]]:
+    """通过 pyorc 读取各 stripe 的行数（只读 stripe footer）；pyorc 不可用时返回 None"""
+    try:
+        import pyorc  # type: ignore
+        with open_input(file_path) as f:
+            reader = pyorc.Reader(f)
+            return [len(reader.read_stripe(i)) for i in range(reader.num_of_stripes)]
+    except Exception:
+        return None
+
+
+def read_orc_metadata(file_path: str, max_stripes: int = 100) -> Dict[str, Any]:
+    """
+    读取 ORC 文件的 footer 信息以及 stripe / 列统计，不读取数据
+
+    pyarrow 只提供 footer 信息，stripe 明细和列统计需要安装 pyorc
+    """
+    info: Dict[str, Any] = {}
     try:
         import pyarrow.orc as o  # type: ignore
-        of = o.ORCFile(actual)
-        table = of.read()
-        rows = table.to_pylist()[:limit]
-        fields = [f.name for f in table.schema]
-        return rows, fields
+        with input_source(file_path) as source:
+            of = o.ORCFile(source)
+            info.update({
+                "num_rows": of.nrows,
+                "num_stripes": of.nstripes,
+                "compression": str(of.compression),
+                "compression_size": of.compression_size,
+                "row_index_stride": of.row_index_stride,
+                "file_version": str(of.file_version),
+                "software_version": of.software_version,
+                "file_length": of.file_length,
+                "content_length": of.content_length,
+                "file_footer_length": of.file_footer_length,
+                "file_postscript_length": of.file_postscript_length,
+                "schema": [f.name for f in of.schema],
+            })
     except Exception:
-        try:
-            import pyorc  # type: ignore
-        except Exception as e:
+        pass
+
+    try:
+        import pyorc  # type: ignore
+    except Exception:
+        if not info:
             raise RuntimeError(
                 "缺少 ORC 读取依赖（pyarrow 或 pyorc）。请安装其一：pip install pyarrow 或 pip install pyorc"
-            ) from e
+            )
+        return info
 
-        with open(actual, "rb") as f:
-            reader = pyorc.Reader(f)
+    with open_input(file_path) as f:
+        reader = pyorc.Reader(f)
+        column_ids = {str(name): td.column_id for name, td in reader.schema.fields.items()}
+        info.setdefault("num_rows", len(reader))
+        info.setdefault("num_stripes", reader.num_of_stripes)
+        info.setdefault("compression", str(reader.compression))
+        info.setdefault("row_index_stride", reader.row_index_stride)
+        info.setdefault("software_version", reader.software_version)
+        info.setdefault("schema", list(column_ids))
+        info["column_statistics"] = {
+            name: _orc_statistics(reader[cid].statistics) for name, cid in column_ids.items()
+        }
+        stripes: List[Dict[str, Any]] = []
+        for i in range(min(reader.num_of_stripes, max_stripes)):
+            stripe = reader.read_stripe(i)
+            stripes.append({
+                "index": i,
+                "num_rows": len(stripe),
+                "row_offset": stripe.row_offset,
+                "bytes_offset": stripe.bytes_offset,
+                "bytes_length": stripe.bytes_length,
+                "column_statistics": {
+                    name: _orc_statistics(stripe[cid].statistics) for name, cid in column_ids.items()
+                },
+            })
+        info["stripes"] = stripes
+        info["stripes_truncated"] = reader.num_of_stripes > len(stripes)
+    return info
 
-            # CHANGED: do not assume reader.schema.fields is (name, type) tuples
-            it = iter(reader)
-            first = None
-            try:
-                first = next(it)
-            except StopIteration:
-                return [], []
 
-            def _schema_field_names_or_empty() -> List[str]:
-                try:
-                    sch = getattr(reader, "schema", None)
-                    flds = getattr(sch, "fields", None) if sch is not None else None
-                    if not flds:
-                        return []
-                    names: List[str] = []
-                    for fld in flds:
-                        # fld may be tuple, string, or Field object depending on pyorc version
-                        if isinstance(fld, tuple) and len(fld) >= 1:
-                            names.append(str(fld[0]))
-                        elif isinstance(fld, str):
-                            names.append(fld)
-                        else:
-                            n = getattr(fld, "name", None)
-                            if n is not None:
-                                names.append(str(n))
-                            else:
-                                names.append(str(fld))
-                    return names
-                except Exception:
-                    return []
-
-            def _cols_from_value(v: Any) -> List[str]:
-                if isinstance(v, dict):
-                    return [str(k) for k in v.keys()]
-                if isinstance(v, tuple):
-                    names = _schema_field_names_or_empty()
-                    if names and len(names) == len(v):
-                        return names
-                    return [f"col_{i}" for i in range(len(v))]
-                return ["value"]
-
-            fields = _cols_from_value(first)
-
-            def _row_to_dict(v: Any) -> Dict[str, Any]:
-                if isinstance(v, dict):
-                    return {str(k): _unwrap_union(val) for k, val in v.items()}
-                if isinstance(v, tuple):
-                    out: Dict[str, Any] = {}
-                    for i in range(len(fields)):
-                        out[fields[i]] = _unwrap_union(v[i]) if i < len(v) else None
-                    return out
-                return {"value": _unwrap_union(v)}
-
-            # include first row
-            rows.append(_row_to_dict(first))
-
-            # continue remaining rows up to limit
-            for i, r in enumerate(it, start=1):
-                if i >= limit:
-                    break
-                rows.append(_row_to_dict(r))
+def _read_orc_rows_pyarrow(source: Any, file_path: str, limit: int, offset: int,
+                           columns: Optional[Sequence[str]]) -> Optional[Tuple[List[Dict[str, Any]], List[str]]]:
+    """
+    使用 pyarrow 按 stripe 读取，凑够 offset + limit 即停止；pyarrow 不可用或无法读取该文件时返回 None
 
-        return rows, fields
+    安装了 pyorc 时先从 stripe footer 得到每个 stripe 的行数，offset 之前的 stripe 不读取
+    """
+    try:
+        import pyarrow.orc as o  # type: ignore
+        of = o.ORCFile(source)
+        available = list(of.schema.names)
+    except Exception:
+        return None
+
+    columns = _check_columns(available, columns)
+    fields = columns or available
+    rows: List[Dict[str, Any]] = []
+    skip = max(0, offset)
+    stripe_rows = _orc_stripe_row_counts(file_path) if skip else None
+    try:
+        for i in range(of.nstripes):
+            if len(rows) >= limit:
+                break
+            if stripe_rows is not None and i < len(stripe_rows) and skip >= stripe_rows[i]:
+                skip -= stripe_rows[i]
+                continue
+            batch = of.read_stripe(i, columns=columns)
+            if skip >= batch.num_rows:
+                skip -= batch.num_rows
+                continue
+            rows.extend(batch.slice(skip, limit - len(rows)).to_pylist())
+            skip = 0
+    except Exception:
+        return None
+    return rows, fields
+
+
+def _read_orc_rows_pyorc(file_path: str, limit: int, offset: int,
+                         columns: Optional[Sequence[str]]) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """使用 pyorc 读取：列投影交给 reader，seek 借助行索引直接定位到 offset"""
+    try:
+        import pyorc  # type: ignore
+    except Exception as e:
+        raise RuntimeError(
+            "缺少 ORC 读取依赖（pyarrow 或 pyorc）。请安装其一：pip install pyarrow 或 pip install pyorc"
+        ) from e
+
+    with open_input(file_path) as f:
+        reader = pyorc.Reader(f)
+        available = _orc_field_names(reader.schema)
+        columns = _check_columns(available, columns)
+        if columns:
+            f.seek(0)
+            reader = pyorc.Reader(f, column_names=tuple(columns))
+        fields = _orc_field_names(reader.selected_schema) or available
+
+        if offset >= len(reader):
+            return [], fields
+        if offset:
+            reader.seek(offset)
+        values = reader.read(limit)
+
+    def _row_to_dict(v: Any) -> Dict[str, Any]:
+        if isinstance(v, dict):
+            return {str(k): _unwrap_union(val) for k, val in v.items()}
+        if isinstance(v, tuple):
+            if len(fields) != len(v):
+                return {f"col_{i}": _unwrap_union(x) for i, x in enumerate(v)}
+            return {fields[i]: _unwrap_union(v[i]) for i in range(len(v))}
+        return {"value": _unwrap_union(v)}
+
+    return [_row_to_dict(v) for v in values], fields
+
+
+def _orc_field_names(schema: Any) -> List[str]:
+    # schema.fields 在不同 pyorc 版本中可能是 dict、(name, type) 元组或 Field 对象
+    try:
+        flds = getattr(schema, "fields", None) if schema is not None else None
+        if not flds:
+            return []
+        if isinstance(flds, dict) or hasattr(flds, "keys"):
+            return [str(k) for k in flds.keys()]
+        names: List[str] = []
+        for fld in flds:
+            if isinstance(fld, tuple) and len(fld) >= 1:
+                names.append(str(fld[0]))
+            elif isinstance(fld, str):
+                names.append(fld)
+            else:
+                n = getattr(fld, "name", None)
+                names.append(str(n) if n is not None else str(fld))
+        return names
+    except Exception:
+        return []
+
+
+def read_orc_rows(file_path: str, limit: int = 100, offset: int = 0,
+                  columns: Optional[Sequence[str]] = None) -> Tuple[List[Dict[str, Any]], List[str]]:
+    # Prefer pyarrow if available, fallback to pyorc if installed.
+    with stage("orc_read"):
+        with input_source(file_path) as source:
+            result = _read_orc_rows_pyarrow(source, file_path, limit, offset, columns)
+        if result is None:
+            result = _read_orc_rows_pyorc(file_path, limit, offset, columns)
+    record_records("orc", len(result[0]))
+    return result
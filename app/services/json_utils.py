@@ -2,9 +2,56 @@
 import json
 from typing import Any
 
+from app.services.filesystem import open_input
+from app.services.metrics import record_bytes, stage
+
+try:  # orjson 为可选依赖，缺失时退回标准库 json
+    import orjson  # type: ignore
+except Exception:  # pragma: no cover
+    orjson = None
+
+
+def _orjson_default(obj: Any) -> Any:
+    # orjson 不认识的类型（Decimal、超过 64 位的整数之外的对象等）统一转成字符串
+    if isinstance(obj, (set, tuple)):
+        return list(obj)
+    if isinstance(obj, bytes):
+        return obj.decode("utf-8", errors="replace")
+    return str(obj)
+
+
+def dumps_bytes(data: Any, indent: bool = False) -> bytes:
+    """
+    序列化为 UTF-8 JSON 字节串，优先使用 orjson
+
+    Args:
+        indent: 是否使用 2 空格缩进
+    """
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if indent else 0)
+        try:
+            return orjson.dumps(data, default=_orjson_default, option=option)
+        except TypeError:
+            # 例如超过 64 位的整数，交给标准库处理
+            pass
+    return json.dumps(
+        data, indent=2 if indent else None, ensure_ascii=False, default=str,
+        separators=None if indent else (",", ":"),
+    ).encode("utf-8")
+
 
 def format_json(data: Any, indent: int = 2, ensure_ascii: bool = False) -> str:
     """格式化 JSON 数据为字符串"""
+    with stage("format_json"):
+        return _format_json(data, indent, ensure_ascii)
+
+
+def _format_json(data: Any, indent: int, ensure_ascii: bool) -> str:
+    if orjson is not None and indent == 2 and not ensure_ascii:
+        try:
+            return dumps_bytes(data, indent=True).decode("utf-8")
+        except (TypeError, ValueError):
+            pass
     try:
         return json.dumps(data, indent=indent, ensure_ascii=ensure_ascii, sort_keys=False)
     except (TypeError, ValueError) as e:
@@ -14,10 +61,12 @@ def format_json(data: Any, indent: int = 2, ensure_ascii: bool = False) -> str:
 def parse_json_file(file_path: str) -> dict | list:
     """读取并解析 JSON 文件"""
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read().strip()
-            if not content:
-                return {}
+        with open_input(file_path) as f:
+            content = f.read().decode("utf-8").strip()
+        record_bytes("json", len(content))
+        if not content:
+            return {}
+        with stage("json_parse"):
             return json.loads(content)
     except json.JSONDecodeError as e:
         raise ValueError(f"JSON 解析错误: {e}")
@@ -25,4 +74,3 @@ def parse_json_file(file_path: str) -> dict | list:
         raise FileNotFoundError(f"文件不存在: {file_path}")
     except Exception as e:
         raise RuntimeError(f"读取文件失败: {e}")
-
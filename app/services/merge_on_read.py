@@ -0,0 +1,552 @@
+"""Merge-on-read 数据预览：应用 position / equality delete 后的数据文件行
+
+v2 表的删除以 delete 文件的形式记录，数据文件本身不变，直接预览数据文件会看到已经删除的行。
+这里按 Iceberg 的规则找出某个 snapshot 中作用于指定数据文件的 delete 文件，再读取数据文件：
+
+1. 读取 snapshot 的 manifest list，在数据 manifest 中找到该数据文件的 entry
+   （data sequence number、partition spec 与分区值）
+2. 只读取 sequence number 不早于数据文件的 delete manifest，按规则筛选 delete 文件：
+   - position delete: sequence number >= 数据文件，且分区相同；
+     file_path 列的 bounds（或 referenced_data_file）不包含该数据文件时跳过
+   - equality delete: sequence number > 数据文件，且分区相同（未分区的 delete 对全表生效）
+3. position delete 只读取 file_path 统计范围包含该数据文件的 row group，合并成有序的行号数组；
+   equality delete 按 equality 字段分组、去重
+4. 按 row group 顺序读取数据文件：被 position delete 整个删除的 row group 不读取；
+   没有 equality delete 时，offset 之前的 row group 按删除后的行数直接跳过。
+   每个 batch 用行号窗口（二分查找）与 is_in 得到 position 删除掩码，
+   equality delete 单列用 is_in、多列用 hash anti join 过滤；凑够 limit 行后立即停止
+
+equality delete 中的 null 与 null 相等（与 Iceberg 语义一致）。目前只支持 Parquet 数据文件，
+delete 文件支持 Parquet / ORC / Avro。
+"""
+from __future__ import annotations
+
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from app.config import FANOUT_MAX_WORKERS
+from app.services.column_metrics import schema_field_types, table_schema
+from app.services.filesystem import input_source, strip_file_prefix
+from app.services.iceberg_parser import (
+    _check_columns,
+    _normalize_partition,
+    _parquet_chunk_bytes,
+    as_records,
+    extract_snapshot_manifests,
+    read_manifest_entries,
+)
+from app.services.metrics import record_bytes, record_records, stage
+from app.services.parse_cache import cached_parse_avro_file
+from app.services.profiler import bind
+from app.services.row_filter import bind_filter, parquet_row_group_stats, parse_filter
+from app.services.snapshot_stats import (
+    CONTENT_DATA,
+    CONTENT_EQUALITY_DELETES,
+    CONTENT_POSITION_DELETES,
+    ENTRY_STATUS_DELETED,
+)
+
+# position delete 文件中 file_path 列的保留 field id（用于 bounds 过滤）
+POSITION_DELETE_FILE_PATH_ID = 2147483546
+
+# 查找数据文件 entry 只需要的字段
+DATA_ENTRY_FIELDS: Tuple[str, ...] = (
+    "status",
+    "sequence_number",
+    "data_file.content",
+    "data_file.file_path",
+    "data_file.file_format",
+    "data_file.partition",
+    "data_file.record_count",
+)
+
+# 筛选 delete 文件需要的字段（另外包含 equality_ids 与 bounds）
+DELETE_ENTRY_FIELDS: Tuple[str, ...] = DATA_ENTRY_FIELDS + (
+    "data_file.file_size_in_bytes",
+    "data_file.equality_ids",
+    "data_file.lower_bounds",
+    "data_file.upper_bounds",
+    "data_file.referenced_data_file",
+)
+
+# 返回行中附带的行号列
+POSITION_COLUMN = "_pos"
+
+
+def _same_path(a: Optional[str], b: Optional[str]) -> bool:
+    return a is not None and b is not None and strip_file_prefix(a) == strip_file_prefix(b)
+
+
+def _entry_sequence(entry: Dict[str, Any], manifest: Dict[str, Any]) -> int:
+    # v2 中新增 entry 的 sequence_number 为 null，继承自 manifest；v1 表没有 sequence number，记为 0
+    seq = entry.get("sequence_number")
+    if seq is None:
+        seq = manifest.get("sequence_number")
+    return seq or 0
+
+
+def _bound(df: Dict[str, Any], key: str, field_id: int) -> Optional[str]:
+    # 解析后 bounds 中的 bytes 已转成 utf-8 文本；无法解码的（"base64:..."）不能按字符串比较，视为没有 bounds
+    for item in df.get(key) or []:
+        if isinstance(item, dict) and item.get("key") == field_id:
+            value = item.get("value")
+            if isinstance(value, bytes):
+                try:
+                    value = value.decode("utf-8")
+                except UnicodeDecodeError:
+                    return None
+            if not isinstance(value, str) or value.startswith("base64:"):
+                return None
+            return value
+    return None
+
+
+def _find_data_entry(data_manifests: List[Dict[str, Any]], data_path: str,
+                     max_workers: int) -> Tuple[Optional[Dict[str, Any]], List[Dict[str, Any]]]:
+    """并发读取数据 manifest，找到数据文件的 entry；找到后取消尚未开始的 manifest"""
+    failed: List[Dict[str, Any]] = []
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {
+            pool.submit(bind(read_manifest_entries), m["manifest_path"], DATA_ENTRY_FIELDS): m
+            for m in data_manifests
+        }
+        for future in as_completed(futures):
+            manifest = futures[future]
+            entries, error = future.result()
+            if error:
+                failed.append({"manifest_path": manifest["manifest_path"], "error": error})
+                continue
+            for entry in entries:
+                df = entry.get("data_file") or {}
+                if entry.get("status") == ENTRY_STATUS_DELETED or (df.get("content") or CONTENT_DATA) != CONTENT_DATA:
+                    continue
+                if _same_path(df.get("file_path"), data_path):
+                    for other in futures:
+                        other.cancel()
+                    return {
+                        "file_path": df["file_path"],
+                        "file_format": df.get("file_format"),
+                        "record_count": df.get("record_count"),
+                        "partition": _normalize_partition(df.get("partition") or {}),
+                        "spec_id": manifest.get("partition_spec_id"),
+                        "sequence_number": _entry_sequence(entry, manifest),
+                    }, failed
+    return None, failed
+
+
+def _applicable_deletes(delete_manifests: List[Dict[str, Any]], data: Dict[str, Any],
+                        max_workers: int) -> Tuple[List[Dict[str, Any]], int, List[Dict[str, Any]]]:
+    """
+    读取 delete manifest，按 sequence number / 分区 / bounds 筛选作用于数据文件的 delete 文件
+
+    Returns:
+        tuple: (delete 文件列表, 被跳过的 delete 文件数, 读取失败的 manifest)
+    """
+    data_seq = data["sequence_number"]
+    deletes: List[Dict[str, Any]] = []
+    skipped = 0
+    failed: List[Dict[str, Any]] = []
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {
+            pool.submit(bind(read_manifest_entries), m["manifest_path"], DELETE_ENTRY_FIELDS): m
+            for m in delete_manifests
+        }
+        for future in as_completed(futures):
+            manifest = futures[future]
+            entries, error = future.result()
+            if error:
+                failed.append({"manifest_path": manifest["manifest_path"], "error": error})
+                continue
+            for entry in entries:
+                df = entry.get("data_file") or {}
+                content = df.get("content") or CONTENT_DATA
+                if entry.get("status") == ENTRY_STATUS_DELETED or content == CONTENT_DATA:
+                    continue
+                seq = _entry_sequence(entry, manifest)
+                partition = _normalize_partition(df.get("partition") or {})
+                same_partition = manifest.get("partition_spec_id") == data["spec_id"] and partition == data["partition"]
+                if content == CONTENT_POSITION_DELETES:
+                    applies = seq >= data_seq and same_partition
+                    referenced = df.get("referenced_data_file")
+                    if applies and referenced:
+                        applies = _same_path(referenced, data["file_path"])
+                    lower = _bound(df, "lower_bounds", POSITION_DELETE_FILE_PATH_ID)
+                    upper = _bound(df, "upper_bounds", POSITION_DELETE_FILE_PATH_ID)
+                    if applies and lower is not None and upper is not None:
+                        # utf-8 字节序与码点序一致，按字符串比较即可
+                        applies = lower <= data["file_path"] <= upper
+                elif content == CONTENT_EQUALITY_DELETES:
+                    applies = seq > data_seq and (same_partition or not partition)
+                else:
+                    applies = False
+                if not applies:
+                    skipped += 1
+                    continue
+                deletes.append({
+                    "content": content,
+                    "file_path": df.get("file_path"),
+                    "file_format": (df.get("file_format") or "").upper(),
+                    "record_count": df.get("record_count"),
+                    "file_size_in_bytes": df.get("file_size_in_bytes"),
+                    "sequence_number": seq,
+                    "equality_ids": list(df.get("equality_ids") or []),
+                })
+    deletes.sort(key=lambda d: (d["sequence_number"], d["file_path"] or ""))
+    return deletes, skipped, failed
+
+
+def _read_delete_table(path: str, file_format: str, columns: Sequence[str]) -> Any:
+    """读取 delete 文件的指定列（Parquet / ORC / Avro）"""
+    import pyarrow as pa  # type: ignore
+
+    if file_format == "PARQUET":
+        import pyarrow.parquet as pq  # type: ignore
+
+        with input_source(path) as source:
+            return pq.ParquetFile(source).read(columns=list(columns))
+    if file_format == "ORC":
+        import pyarrow.orc as orc  # type: ignore
+
+        with input_source(path) as source:
+            return orc.ORCFile(source).read(columns=list(columns))
+    if file_format == "AVRO":
+        result = cached_parse_avro_file(path, fields=columns)
+        if not result.get("success"):
+            raise ValueError(result.get("error"))
+        records = as_records(result.get("data"))
+        return pa.Table.from_pylist([{c: r.get(c) for c in columns} for r in records])
+    raise ValueError(f"不支持的 delete 文件格式: {file_format}")
+
+
+def _read_positions(delete: Dict[str, Any], data_path: str) -> Tuple[Any, int]:
+    """
+    读取 position delete 文件中属于数据文件的行号
+
+    Parquet 文件按 file_path 列统计跳过不包含该数据文件的 row group。
+
+    Returns:
+        tuple: (行号数组, 读取的 row group 数；非 Parquet 文件为 -1)
+    """
+    import pyarrow as pa  # type: ignore
+    import pyarrow.compute as pc  # type: ignore
+
+    path = strip_file_prefix(delete["file_path"])
+    targets = sorted({data_path, strip_file_prefix(data_path)})
+    groups_read = -1
+    if delete["file_format"] == "PARQUET":
+        import pyarrow.parquet as pq  # type: ignore
+
+        with input_source(path) as source:
+            pf = pq.ParquetFile(source)
+            md = pf.metadata
+            column = next((j for j in range(md.num_columns) if md.schema.column(j).path == "file_path"), None)
+            groups = []
+            for i in range(md.num_row_groups):
+                stats = md.row_group(i).column(column).statistics if column is not None else None
+                if stats is not None and stats.has_min_max and not any(stats.min <= t <= stats.max for t in targets):
+                    continue
+                groups.append(i)
+            groups_read = len(groups)
+            if not groups:
+                return pa.array([], pa.int64()), 0
+            table = pf.read_row_groups(groups, columns=["file_path", "pos"])
+            record_bytes("parquet", _parquet_chunk_bytes(md, groups, table.num_rows, ["file_path", "pos"]))
+    else:
+        table = _read_delete_table(path, delete["file_format"], ["file_path", "pos"])
+    mask = pc.is_in(table.column("file_path"), value_set=pa.array(targets))
+    positions = table.column("pos").filter(mask).combine_chunks()
+    return positions.cast(pa.int64()), groups_read
+
+
+def _read_equality_keys(delete: Dict[str, Any], names: List[str]) -> Any:
+    table = _read_delete_table(strip_file_prefix(delete["file_path"]), delete["file_format"], names)
+    return table.select(names)
+
+
+def _bisect_left(values: Any, target: int) -> int:
+    """有序 Arrow 数组上的二分查找（第一个 >= target 的下标）"""
+    lo, hi = 0, len(values)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if values[mid].as_py() < target:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+
+class _EqualityDeletes:
+    """按 equality 字段分组的删除 key（已去重，类型与数据文件一致）"""
+
+    def __init__(self, names: List[str], keys: Any):
+        import pyarrow.compute as pc  # type: ignore
+
+        self.names = names
+        self.count = keys.num_rows
+        if len(names) == 1:
+            self.values = keys.column(0).combine_chunks()
+            return
+        # 多列：不含 null 的 key 走 hash anti join；含 null 的 key（null 与 null 相等）单独比较
+        has_null = None
+        for name in names:
+            col_null = pc.is_null(keys.column(name))
+            has_null = col_null if has_null is None else pc.or_(has_null, col_null)
+        self.keys = keys.filter(pc.invert(has_null))
+        null_keys = keys.filter(has_null)
+        self.null_keys = set(zip(*(null_keys.column(n).to_pylist() for n in names))) if null_keys.num_rows else set()
+
+    def apply(self, table: Any) -> Any:
+        import pyarrow as pa  # type: ignore
+        import pyarrow.compute as pc  # type: ignore
+
+        if len(self.names) == 1:
+            mask = pc.is_in(table.column(self.names[0]), value_set=self.values, skip_nulls=False)
+            return table.filter(pc.invert(mask))
+        has_null = None
+        for name in self.names:
+            col_null = pc.is_null(table.column(name))
+            has_null = col_null if has_null is None else pc.or_(has_null, col_null)
+        complete = table.filter(pc.invert(has_null))
+        partial = table.filter(has_null)
+        if self.keys.num_rows and complete.num_rows:
+            complete = complete.join(self.keys, self.names, join_type="left anti")
+        if self.null_keys and partial.num_rows:
+            rows = zip(*(partial.column(n).to_pylist() for n in self.names))
+            partial = partial.filter(pa.array([key not in self.null_keys for key in rows]))
+        # join 不保证顺序，按行号恢复数据文件中的顺序
+        merged = pa.concat_tables([complete.select(table.column_names), partial])
+        return merged.sort_by(POSITION_COLUMN)
+
+
+def _load_deletes(deletes: List[Dict[str, Any]], data_path: str, data_schema: Any,
+                  field_names: Dict[int, str], max_workers: int) -> Tuple[Any, List[_EqualityDeletes], Dict[str, Any]]:
+    """并发读取 delete 文件，返回 (有序去重的行号数组, equality 删除分组, 统计)"""
+    import pyarrow as pa  # type: ignore
+    import pyarrow.compute as pc  # type: ignore
+
+    position_files = [d for d in deletes if d["content"] == CONTENT_POSITION_DELETES]
+    equality_files = [d for d in deletes if d["content"] == CONTENT_EQUALITY_DELETES]
+
+    eq_names: Dict[str, List[str]] = {}
+    for d in equality_files:
+        names = []
+        for field_id in d["equality_ids"]:
+            name = field_names.get(field_id)
+            if name is None or data_schema.get_field_index(name) < 0:
+                raise ValueError(f"equality delete 字段不在数据文件中: field id {field_id} ({d['file_path']})")
+            names.append(name)
+        if not names:
+            raise ValueError(f"equality delete 文件缺少 equality_ids: {d['file_path']}")
+        d["equality_fields"] = names
+        eq_names[d["file_path"]] = names
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        position_futures = [pool.submit(bind(_read_positions), d, data_path) for d in position_files]
+        equality_futures = [pool.submit(bind(_read_equality_keys), d, eq_names[d["file_path"]]) for d in equality_files]
+        position_parts = []
+        position_groups_read = 0
+        for d, future in zip(position_files, position_futures):
+            positions, groups_read = future.result()
+            d["positions"] = len(positions)
+            position_groups_read += max(0, groups_read)
+            position_parts.append(positions)
+        grouped: Dict[Tuple[str, ...], List[Any]] = {}
+        for d, future in zip(equality_files, equality_futures):
+            keys = future.result()
+            names = d["equality_fields"]
+            keys = keys.cast(pa.schema([data_schema.field(n) for n in names]))
+            grouped.setdefault(tuple(names), []).append(keys)
+
+    if position_parts:
+        unique = pc.unique(pa.chunked_array(position_parts, pa.int64()))
+        positions = pc.take(unique, pc.array_sort_indices(unique))
+    else:
+        positions = pa.array([], pa.int64())
+    groups = []
+    for names, tables in grouped.items():
+        keys = pa.concat_tables(tables).group_by(list(names)).aggregate([])
+        groups.append(_EqualityDeletes(list(names), keys.select(list(names))))
+    stats = {
+        "position_deletes": len(positions),
+        "position_delete_row_groups_read": position_groups_read,
+        "equality_delete_keys": sum(g.count for g in groups),
+    }
+    return positions, groups, stats
+
+
+def read_merged_rows(metadata_data: Dict[str, Any], data_path: str, snapshot_id: Any = None,
+                     limit: int = 100, offset: int = 0, columns: Optional[Sequence[str]] = None,
+                     max_workers: Optional[int] = None, row_filter: Optional[str] = None) -> Dict[str, Any]:
+    """
+    读取数据文件在指定 snapshot（默认当前 snapshot）下应用 delete 文件后的行
+
+    Args:
+        data_path: 数据文件路径（本地路径或远程 URL，与 manifest 中的路径比较时忽略 file: 前缀）
+        offset / limit: 按删除后的行计算
+        columns: 只返回这些列（equality 字段会额外读取，但不返回）
+        row_filter: 过滤表达式（见 row_filter），在应用删除之后过滤；offset / limit 按匹配的行计算
+
+    Returns:
+        dict: rows（每行附带数据文件中的行号 _pos）、fields、merge_on_read（delete 文件与读取统计）
+    """
+    import pyarrow as pa  # type: ignore
+    import pyarrow.compute as pc  # type: ignore
+    import pyarrow.parquet as pq  # type: ignore
+
+    started = time.perf_counter()
+    workers = max_workers or FANOUT_MAX_WORKERS
+    predicate = parse_filter(row_filter) if row_filter else None
+
+    with stage("mor_plan"):
+        resolved = extract_snapshot_manifests(metadata_data, snapshot_id)
+        if resolved["snapshot"] is None:
+            raise ValueError(f"snapshot 不存在: {resolved['snapshot_id']}")
+        if resolved["manifest_list_error"]:
+            raise ValueError(resolved["manifest_list_error"])
+        manifests = [m for m in resolved["manifests"] if m.get("manifest_path")]
+        data_manifests = [m for m in manifests if not m.get("content")]
+        data, failed = _find_data_entry(data_manifests, data_path, workers)
+        if data is None:
+            detail = f"（{len(failed)} 个 manifest 读取失败）" if failed else ""
+            raise ValueError(f"数据文件不在 snapshot {resolved['snapshot_id']} 中: {data_path}{detail}")
+        if (data["file_format"] or "PARQUET").upper() != "PARQUET":
+            raise ValueError(f"合并删除预览目前只支持 Parquet 数据文件: {data['file_format']}")
+
+        # manifest 的 sequence_number 是其中 entry 的上限，早于数据文件的 delete manifest 不可能生效
+        delete_manifests = [
+            m for m in manifests
+            if m.get("content") and (m.get("sequence_number") or 0) >= data["sequence_number"]
+        ]
+        deletes, deletes_skipped, delete_failed = _applicable_deletes(delete_manifests, data, workers)
+        if delete_failed:
+            raise ValueError(f"delete manifest 读取失败: {delete_failed[0]['manifest_path']}: {delete_failed[0]['error']}")
+    planned = time.perf_counter()
+
+    schema = table_schema(metadata_data)
+    field_names = {fid: info["name"] for fid, info in schema_field_types(schema or {}).items()}
+
+    with input_source(data_path) as source:
+        with stage("parquet_footer"):
+            pf = pq.ParquetFile(source)
+            data_schema = pf.schema_arrow
+            columns = _check_columns(data_schema.names, columns)
+            fields = columns or list(data_schema.names)
+            md = pf.metadata
+        record_bytes("parquet", md.serialized_size)
+
+        with stage("mor_deletes"):
+            positions, equality, delete_stats = _load_deletes(deletes, data["file_path"], data_schema, field_names, workers)
+        loaded = time.perf_counter()
+
+        read_columns = list(fields)
+        for group in equality:
+            read_columns.extend(n for n in group.names if n not in read_columns)
+        filter_columns: List[str] = []
+        expression = None
+        if predicate is not None:
+            predicate = bind_filter(predicate, data_schema)
+            expression = predicate.to_expression()
+            filter_columns = list(dict.fromkeys(predicate.columns()))
+            read_columns.extend(c for c in filter_columns if c not in read_columns)
+
+        # 按 row group 规划：整个被 position delete 删除的、统计上不可能满足过滤条件的跳过；
+        # 没有 equality delete 与过滤条件时可按删除后的行数跳过 offset
+        skip = max(0, offset)
+        plan: List[Tuple[int, int]] = []
+        row_start = 0
+        rg_skipped_deleted = 0
+        rg_skipped_offset = 0
+        rg_skipped_filter = 0
+        for i in range(md.num_row_groups):
+            num_rows = md.row_group(i).num_rows
+            deleted = _bisect_left(positions, row_start + num_rows) - _bisect_left(positions, row_start)
+            live = num_rows - deleted
+            if live <= 0:
+                rg_skipped_deleted += 1
+            elif predicate is not None and not predicate.may_match(parquet_row_group_stats(md, i, filter_columns)):
+                rg_skipped_filter += 1
+            elif not equality and predicate is None and not plan and skip >= live:
+                skip -= live
+                rg_skipped_offset += 1
+            else:
+                plan.append((i, row_start))
+            row_start += num_rows
+
+        rows: List[Dict[str, Any]] = []
+        rows_scanned = 0
+        deleted_by_position = 0
+        deleted_by_equality = 0
+        row_groups_read: List[int] = []
+        batch_size = max(1, min(limit + skip, 65536))
+        index = pa.array(range(batch_size), pa.int64())
+        for rg, rg_start in plan:
+            if len(rows) >= limit:
+                break
+            row_groups_read.append(rg)
+            batch_start = rg_start
+            batches = pf.iter_batches(batch_size=batch_size, row_groups=[rg], columns=read_columns)
+            while len(rows) < limit:
+                with stage("parquet_read"):
+                    batch = next(batches, None)
+                if batch is None:
+                    break
+                n = batch.num_rows
+                rows_scanned += n
+                row_pos = pc.add(index.slice(0, n), batch_start)
+                table = pa.Table.from_batches([batch]).append_column(POSITION_COLUMN, row_pos)
+                lo = _bisect_left(positions, batch_start)
+                hi = _bisect_left(positions, batch_start + n)
+                batch_start += n
+                with stage("mor_apply"):
+                    if hi > lo:
+                        mask = pc.is_in(row_pos, value_set=positions.slice(lo, hi - lo))
+                        table = table.filter(pc.invert(mask))
+                        deleted_by_position += hi - lo
+                    before = table.num_rows
+                    for group in equality:
+                        table = group.apply(table)
+                    deleted_by_equality += before - table.num_rows
+                    if expression is not None:
+                        table = table.filter(expression)
+                if skip >= table.num_rows:
+                    skip -= table.num_rows
+                    continue
+                table = table.slice(skip, limit - len(rows))
+                skip = 0
+                with stage("parquet_to_pylist"):
+                    rows.extend(table.select(fields + [POSITION_COLUMN]).to_pylist())
+        record_bytes("parquet", _parquet_chunk_bytes(md, row_groups_read, rows_scanned, read_columns))
+        record_records("parquet", rows_scanned)
+
+    return {
+        "rows": rows,
+        "fields": fields,
+        "merge_on_read": {
+            "snapshot_id": resolved["snapshot_id"],
+            "data_file": {k: data[k] for k in ("file_path", "partition", "spec_id", "sequence_number", "record_count")},
+            "data_manifests_total": len(data_manifests),
+            "delete_manifests_read": len(delete_manifests),
+            "delete_manifests_skipped": sum(1 for m in manifests if m.get("content")) - len(delete_manifests),
+            "delete_files": [
+                {k: d.get(k) for k in ("file_path", "content", "file_format", "sequence_number", "record_count",
+                                       "equality_fields", "positions") if k in d}
+                for d in deletes
+            ],
+            "delete_files_skipped": deletes_skipped,
+            **delete_stats,
+            "row_groups_total": md.num_row_groups,
+            "row_groups_read": len(row_groups_read),
+            "row_groups_skipped_deleted": rg_skipped_deleted,
+            "row_groups_skipped_offset": rg_skipped_offset,
+            "row_groups_skipped_filter": rg_skipped_filter,
+            "rows_scanned": rows_scanned,
+            "rows_deleted_by_position": deleted_by_position,
+            "rows_deleted_by_equality": deleted_by_equality,
+            "timing": {
+                "plan_ms": round((planned - started) * 1000, 3),
+                "deletes_ms": round((loaded - planned) * 1000, 3),
+                "read_ms": round((time.perf_counter() - loaded) * 1000, 3),
+            },
+        },
+    }
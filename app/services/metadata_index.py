@@ -0,0 +1,458 @@
+"""表元数据的本地 SQLite 索引
+
+把一张表的 metadata 树（metadata.json 各版本 → snapshot → manifest list → manifest → data file）
+写入本地 SQLite，常见问题直接查索引而不用每次重新解码 Avro：
+- 某个分区下有哪些文件
+- 某个文件是哪个 snapshot 添加的、出现在哪些 manifest 中
+- 某个 snapshot 的分区统计
+
+索引是增量更新的：metadata.json 按 (size, mtime) 判断是否需要重新读取，
+manifest 文件写入后不会再修改，按路径只解析一次。
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from app.config import FANOUT_MAX_WORKERS, METADATA_INDEX_DIR
+from app.services.iceberg_parser import (
+    MANIFEST_ENTRY_SUMMARY_FIELDS,
+    _classify_metadata_file,
+    extract_manifest_info,
+    extract_table_metadata_info,
+    metadata_version_number,
+    read_manifest_entries,
+    read_manifest_list,
+)
+from app.services.filesystem import is_dir, is_remote, list_dir
+from app.services.json_utils import parse_json_file
+from app.services.profiler import bind
+from app.services.snapshot_stats import ENTRY_STATUS_DELETED, partition_key
+
+SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS metadata_versions (
+    path TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    table_uuid TEXT,
+    format_version INTEGER,
+    current_snapshot_id INTEGER,
+    indexed_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS snapshots (
+    snapshot_id INTEGER PRIMARY KEY,
+    parent_snapshot_id INTEGER,
+    sequence_number INTEGER,
+    timestamp_ms INTEGER,
+    operation TEXT,
+    manifest_list TEXT,
+    summary TEXT,
+    manifests_indexed INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS manifests (
+    manifest_path TEXT PRIMARY KEY,
+    manifest_length INTEGER,
+    partition_spec_id INTEGER,
+    content INTEGER,
+    added_snapshot_id INTEGER,
+    sequence_number INTEGER,
+    entries_count INTEGER,
+    error TEXT
+);
+CREATE TABLE IF NOT EXISTS snapshot_manifests (
+    snapshot_id INTEGER NOT NULL,
+    manifest_path TEXT NOT NULL,
+    PRIMARY KEY (snapshot_id, manifest_path)
+);
+CREATE TABLE IF NOT EXISTS partitions (
+    partition_key TEXT PRIMARY KEY,
+    partition TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS data_files (
+    manifest_path TEXT NOT NULL,
+    status INTEGER,
+    snapshot_id INTEGER,
+    sequence_number INTEGER,
+    content INTEGER,
+    file_path TEXT NOT NULL,
+    file_format TEXT,
+    partition_key TEXT,
+    record_count INTEGER,
+    file_size_in_bytes INTEGER
+);
+CREATE TABLE IF NOT EXISTS column_files (
+    manifest_path TEXT NOT NULL,
+    data_file_path TEXT NOT NULL,
+    column_file_path TEXT,
+    column_file_length INTEGER,
+    column_file_record_count INTEGER,
+    column_file_snapshot_id INTEGER,
+    column_file_ids TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_snapshot_manifests_manifest ON snapshot_manifests (manifest_path);
+CREATE INDEX IF NOT EXISTS idx_data_files_manifest ON data_files (manifest_path);
+CREATE INDEX IF NOT EXISTS idx_data_files_path ON data_files (file_path);
+CREATE INDEX IF NOT EXISTS idx_data_files_partition ON data_files (partition_key);
+CREATE INDEX IF NOT EXISTS idx_data_files_snapshot ON data_files (snapshot_id);
+CREATE INDEX IF NOT EXISTS idx_column_files_data_file ON column_files (data_file_path);
+"""
+
+# 建索引只用到 manifest_entry 的概览字段和 column_files，投影读取，跳过列统计与 bounds 的解码
+MANIFEST_INDEX_FIELDS = MANIFEST_ENTRY_SUMMARY_FIELDS + ("data_file.column_files",)
+
+_WRITE_LOCKS: Dict[str, threading.Lock] = {}
+_WRITE_LOCKS_GUARD = threading.Lock()
+
+
+def index_db_path(metadata_dir: str) -> Path:
+    """每个 metadata 目录对应一个索引文件，文件名取目录真实路径（远程目录为 URL）的哈希"""
+    key = metadata_dir.rstrip("/") if is_remote(metadata_dir) else os.path.realpath(metadata_dir)
+    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+    return Path(METADATA_INDEX_DIR) / f"{digest}.sqlite"
+
+
+def _write_lock(db_path: Path) -> threading.Lock:
+    with _WRITE_LOCKS_GUARD:
+        return _WRITE_LOCKS.setdefault(str(db_path), threading.Lock())
+
+
+def _connect(db_path: Path) -> sqlite3.Connection:
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(db_path), timeout=30)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA_SQL)
+    return conn
+
+
+def _index_metadata_versions(conn: sqlite3.Connection, metadata_dir: str) -> Dict[str, int]:
+    """读取新增或变化的 metadata.json，写入版本与 snapshot 信息"""
+    known = {
+        row["path"]: (row["size"], row["mtime_ns"])
+        for row in conn.execute("SELECT path, size, mtime_ns FROM metadata_versions")
+    }
+    entries = sorted(
+        (e for e in list_dir(metadata_dir) if not e.is_dir and _classify_metadata_file(e.name) == "metadata_files"),
+        key=lambda e: (metadata_version_number(e.name), e.name),
+    )
+    versions_added = 0
+    snapshots_added = 0
+    for entry in entries:
+        name, path = entry.name, entry.path
+        if known.get(path) == (entry.size, entry.mtime_ns):
+            continue
+        metadata_data = parse_json_file(path)
+        info = extract_table_metadata_info(metadata_data)
+        conn.execute(
+            "INSERT OR REPLACE INTO metadata_versions VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (path, name, metadata_version_number(name), entry.size, entry.mtime_ns, info["table_uuid"],
+             info["format_version"], info["current_snapshot_id"], time.time()),
+        )
+        versions_added += 1
+        for snap in info["snapshots"] or []:
+            if not isinstance(snap, dict):
+                continue
+            snapshot_id = snap.get("snapshot-id") or snap.get("snapshot_id")
+            if snapshot_id is None:
+                continue
+            summary = snap.get("summary") or {}
+            cur = conn.execute(
+                "INSERT OR IGNORE INTO snapshots (snapshot_id, parent_snapshot_id, sequence_number, timestamp_ms,"
+                " operation, manifest_list, summary) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    snapshot_id,
+                    snap.get("parent-snapshot-id") or snap.get("parent_snapshot_id"),
+                    snap.get("sequence-number") or snap.get("sequence_number"),
+                    snap.get("timestamp-ms") or snap.get("timestamp_ms"),
+                    summary.get("operation") if isinstance(summary, dict) else None,
+                    snap.get("manifest-list") or snap.get("manifest_list"),
+                    json.dumps(summary, ensure_ascii=False),
+                ),
+            )
+            snapshots_added += cur.rowcount
+    conn.commit()
+    return {"versions_indexed": versions_added, "snapshots_added": snapshots_added}
+
+
+def _index_manifest_lists(conn: sqlite3.Connection) -> Dict[str, Any]:
+    """
+    为尚未处理的 snapshot 读取 manifest list，记录 snapshot → manifest 关系
+
+    读取失败的 snapshot 保持未索引状态，下次更新时重试
+    """
+    pending = conn.execute(
+        "SELECT snapshot_id, manifest_list FROM snapshots WHERE manifests_indexed = 0"
+    ).fetchall()
+    errors: List[Dict[str, Any]] = []
+    for row in pending:
+        manifests: List[Dict[str, Any]] = []
+        if row["manifest_list"]:
+            manifests, error = read_manifest_list(row["manifest_list"])
+            if error:
+                errors.append({"snapshot_id": row["snapshot_id"], "manifest_list": row["manifest_list"],
+                               "error": error})
+                continue
+        for m in manifests:
+            path = m.get("manifest_path")
+            if not path:
+                continue
+            conn.execute(
+                "INSERT OR IGNORE INTO manifests (manifest_path, manifest_length, partition_spec_id, content,"
+                " added_snapshot_id, sequence_number) VALUES (?, ?, ?, ?, ?, ?)",
+                (path, m.get("manifest_length"), m.get("partition_spec_id"), m.get("content"),
+                 m.get("added_snapshot_id"), m.get("sequence_number")),
+            )
+            conn.execute(
+                "INSERT OR IGNORE INTO snapshot_manifests VALUES (?, ?)", (row["snapshot_id"], path)
+            )
+        conn.execute("UPDATE snapshots SET manifests_indexed = 1 WHERE snapshot_id = ?", (row["snapshot_id"],))
+    conn.commit()
+    return {
+        "manifest_lists_indexed": len(pending) - len(errors),
+        "manifest_lists_failed": len(errors),
+        "manifest_list_errors": errors,
+    }
+
+
+def _read_manifest(manifest_path: str) -> Dict[str, Any]:
+    entries, error = read_manifest_entries(manifest_path, fields=MANIFEST_INDEX_FIELDS)
+    if error:
+        return {"error": error, "info": None}
+    return {"error": None, "info": extract_manifest_info(entries)}
+
+
+def _index_manifests(conn: sqlite3.Connection, max_workers: int) -> Dict[str, int]:
+    """并发解析尚未索引的 manifest，写入 data_files / column_files / partitions"""
+    # v2 中 entry 的 snapshot_id / sequence_number 可以为 null，继承自 manifest list 中该 manifest 的
+    # added_snapshot_id / sequence_number（新增 entry 的 sequence_number 总是 null）
+    inherited = {
+        row["manifest_path"]: (row["added_snapshot_id"], row["sequence_number"])
+        for row in conn.execute(
+            "SELECT manifest_path, added_snapshot_id, sequence_number FROM manifests WHERE entries_count IS NULL"
+        )
+    }
+    pending = list(inherited)
+    files_added = 0
+    failed = 0
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for manifest_path, parsed in zip(pending, pool.map(bind(_read_manifest), pending)):
+            if parsed["error"]:
+                failed += 1
+                conn.execute(
+                    "UPDATE manifests SET entries_count = 0, error = ? WHERE manifest_path = ?",
+                    (parsed["error"], manifest_path),
+                )
+                continue
+            info = parsed["info"]
+            manifest_snapshot_id, manifest_sequence = inherited[manifest_path]
+            rows = []
+            column_rows = []
+            for df in info["data_files"]:
+                key = partition_key(df["partition"])
+                conn.execute(
+                    "INSERT OR IGNORE INTO partitions VALUES (?, ?)",
+                    (key, json.dumps(df["partition"], ensure_ascii=False, default=str)),
+                )
+                rows.append((
+                    manifest_path, df["status"],
+                    df["snapshot_id"] if df["snapshot_id"] is not None else manifest_snapshot_id,
+                    df["sequence_number"] if df["sequence_number"] is not None else manifest_sequence,
+                    df["content"],
+                    df["file_path"], df["file_format"], key, df["record_count"], df["file_size_in_bytes"],
+                ))
+                for cf in df["column_files"]:
+                    column_rows.append((
+                        manifest_path, df["file_path"], cf["column_file_path"], cf["column_file_length"],
+                        cf["column_file_record_count"], cf["column_file_snapshot_id"],
+                        json.dumps(cf["column_file_ids"]),
+                    ))
+            conn.executemany("INSERT INTO data_files VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            conn.executemany("INSERT INTO column_files VALUES (?, ?, ?, ?, ?, ?, ?)", column_rows)
+            conn.execute(
+                "UPDATE manifests SET entries_count = ?, error = NULL WHERE manifest_path = ?",
+                (info["entries_count"], manifest_path),
+            )
+            files_added += len(rows)
+            conn.commit()
+    return {"manifests_indexed": len(pending) - failed, "manifests_failed": failed, "data_files_added": files_added}
+
+
+def update_index(metadata_dir: str, max_workers: Optional[int] = None) -> Dict[str, Any]:
+    """
+    增量更新 metadata 目录的索引
+
+    Returns:
+        dict: 本次新增的版本 / snapshot / manifest / 文件数量以及耗时
+    """
+    if not is_dir(metadata_dir):
+        return {"success": False, "error": f"目录不存在: {metadata_dir}"}
+    db_path = index_db_path(metadata_dir)
+    started = time.perf_counter()
+    try:
+        with _write_lock(db_path):
+            conn = _connect(db_path)
+            try:
+                stats: Dict[str, Any] = {}
+                stats.update(_index_metadata_versions(conn, metadata_dir))
+                stats.update(_index_manifest_lists(conn))
+                stats.update(_index_manifests(conn, max_workers or FANOUT_MAX_WORKERS))
+            finally:
+                conn.close()
+    except Exception as e:
+        return {"success": False, "error": f"更新索引失败: {str(e)}"}
+    return {
+        "success": True,
+        "error": None,
+        "db_path": str(db_path),
+        **stats,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 3),
+    }
+
+
+def _open_index(metadata_dir: str) -> sqlite3.Connection:
+    db_path = index_db_path(metadata_dir)
+    if not db_path.exists():
+        raise FileNotFoundError(f"索引不存在，请先构建索引: {metadata_dir}")
+    return _connect(db_path)
+
+
+def _current_snapshot_id(conn: sqlite3.Connection) -> Optional[int]:
+    row = conn.execute(
+        "SELECT current_snapshot_id FROM metadata_versions ORDER BY version DESC, name DESC LIMIT 1"
+    ).fetchone()
+    return row["current_snapshot_id"] if row else None
+
+
+def _rows(cursor: sqlite3.Cursor) -> List[Dict[str, Any]]:
+    return [dict(r) for r in cursor.fetchall()]
+
+
+def query_index_summary(metadata_dir: str) -> Dict[str, Any]:
+    """索引概况：各表行数与当前 snapshot"""
+    conn = _open_index(metadata_dir)
+    try:
+        counts = {
+            table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            for table in ("metadata_versions", "snapshots", "manifests", "data_files", "partitions", "column_files")
+        }
+        return {
+            "db_path": str(index_db_path(metadata_dir)),
+            "current_snapshot_id": _current_snapshot_id(conn),
+            "counts": counts,
+        }
+    finally:
+        conn.close()
+
+
+def query_snapshots(metadata_dir: str, limit: int = 100, offset: int = 0) -> List[Dict[str, Any]]:
+    conn = _open_index(metadata_dir)
+    try:
+        return _rows(conn.execute(
+            "SELECT snapshot_id, parent_snapshot_id, sequence_number, timestamp_ms, operation, manifest_list,"
+            " (SELECT COUNT(*) FROM snapshot_manifests sm WHERE sm.snapshot_id = s.snapshot_id) AS manifests_count"
+            " FROM snapshots s ORDER BY sequence_number DESC, timestamp_ms DESC LIMIT ? OFFSET ?",
+            (limit, offset),
+        ))
+    finally:
+        conn.close()
+
+
+def query_partition_files(metadata_dir: str, partition: Optional[Dict[str, Any]] = None,
+                          snapshot_id: Optional[int] = None, limit: int = 100,
+                          offset: int = 0) -> Dict[str, Any]:
+    """某个 snapshot（默认当前）中仍然有效的文件，可按分区过滤"""
+    conn = _open_index(metadata_dir)
+    try:
+        snapshot_id = snapshot_id if snapshot_id is not None else _current_snapshot_id(conn)
+        where = ["sm.snapshot_id = ?", "df.status != ?"]
+        params: List[Any] = [snapshot_id, ENTRY_STATUS_DELETED]
+        if partition is not None:
+            where.append("df.partition_key = ?")
+            params.append(partition_key(partition))
+        files = _rows(conn.execute(
+            "SELECT df.file_path, df.content, df.file_format, p.partition, df.record_count,"
+            " df.file_size_in_bytes, df.snapshot_id AS added_snapshot_id, df.manifest_path"
+            " FROM snapshot_manifests sm JOIN data_files df ON df.manifest_path = sm.manifest_path"
+            " LEFT JOIN partitions p ON p.partition_key = df.partition_key"
+            f" WHERE {' AND '.join(where)} ORDER BY df.file_path LIMIT ? OFFSET ?",
+            (*params, limit, offset),
+        ))
+        for f in files:
+            f["partition"] = json.loads(f["partition"]) if f["partition"] else {}
+        return {"snapshot_id": snapshot_id, "files": files}
+    finally:
+        conn.close()
+
+
+def query_partitions(metadata_dir: str, snapshot_id: Optional[int] = None,
+                     limit: int = 100, offset: int = 0) -> Dict[str, Any]:
+    """某个 snapshot（默认当前）按分区汇总的文件数、记录数、字节数"""
+    conn = _open_index(metadata_dir)
+    try:
+        snapshot_id = snapshot_id if snapshot_id is not None else _current_snapshot_id(conn)
+        partitions = _rows(conn.execute(
+            "SELECT p.partition, COUNT(*) AS files,"
+            " SUM(CASE WHEN df.content = 0 THEN 1 ELSE 0 END) AS data_files,"
+            " SUM(CASE WHEN df.content = 0 THEN df.record_count ELSE 0 END) AS records,"
+            " SUM(df.file_size_in_bytes) AS bytes"
+            " FROM snapshot_manifests sm JOIN data_files df ON df.manifest_path = sm.manifest_path"
+            " LEFT JOIN partitions p ON p.partition_key = df.partition_key"
+            " WHERE sm.snapshot_id = ? AND df.status != ?"
+            " GROUP BY df.partition_key ORDER BY bytes DESC LIMIT ? OFFSET ?",
+            (snapshot_id, ENTRY_STATUS_DELETED, limit, offset),
+        ))
+        for p in partitions:
+            p["partition"] = json.loads(p["partition"]) if p["partition"] else {}
+        return {"snapshot_id": snapshot_id, "partitions": partitions}
+    finally:
+        conn.close()
+
+
+def query_file_history(metadata_dir: str, file_path: str) -> Dict[str, Any]:
+    """某个数据文件由哪个 snapshot 添加 / 删除，出现在哪些 manifest 与 snapshot 中"""
+    conn = _open_index(metadata_dir)
+    try:
+        candidates = {file_path}
+        if file_path.startswith("file:"):
+            candidates.add(file_path.replace("file:", "", 1))
+        else:
+            candidates.add("file:" + file_path)
+        marks = ",".join("?" * len(candidates))
+        # 旧版本索引中可能存有未继承的 null 值，查询时同样回退到 manifest 的值
+        entries = _rows(conn.execute(
+            "SELECT df.file_path, df.status, COALESCE(df.snapshot_id, m.added_snapshot_id) AS snapshot_id,"
+            " COALESCE(df.sequence_number, m.sequence_number) AS sequence_number, df.manifest_path,"
+            " df.record_count, df.file_size_in_bytes FROM data_files df"
+            " LEFT JOIN manifests m ON m.manifest_path = df.manifest_path"
+            f" WHERE df.file_path IN ({marks}) ORDER BY sequence_number",
+            tuple(candidates),
+        ))
+        added = sorted({e["snapshot_id"] for e in entries if e["status"] == 1 and e["snapshot_id"] is not None})
+        deleted = sorted({
+            e["snapshot_id"] for e in entries if e["status"] == ENTRY_STATUS_DELETED and e["snapshot_id"] is not None
+        })
+        snapshots = [r[0] for r in conn.execute(
+            "SELECT DISTINCT sm.snapshot_id FROM snapshot_manifests sm JOIN data_files df"
+            f" ON df.manifest_path = sm.manifest_path WHERE df.file_path IN ({marks}) AND df.status != ?"
+            " ORDER BY sm.snapshot_id",
+            (*candidates, ENTRY_STATUS_DELETED),
+        )]
+        return {
+            "file_path": file_path,
+            "added_in_snapshots": added,
+            "deleted_in_snapshots": deleted,
+            "live_in_snapshots": snapshots,
+            "entries": entries,
+        }
+    finally:
+        conn.close()
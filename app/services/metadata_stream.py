@@ -0,0 +1,276 @@
+"""大体积 metadata.json 的增量读取
+
+长期运行的表，metadata.json 中 snapshots / snapshot-log / metadata-log 可能有上万条，文件达到几十 MB。
+这里不再整体 json.loads：
+
+- 表头字段（uuid、location、current-snapshot-id、schemas、specs 等）通常写在这些大数组之前，
+  只读取文件开头的一小段即可得到，不构建 snapshots 数组
+- 大数组建立元素级的字节偏移索引（按文件 size / mtime 缓存），之后分页读取时只 seek + 解码当前页的元素
+"""
+from __future__ import annotations
+
+import codecs
+import json
+import re
+import time
+from array import array
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.services.filesystem import open_input
+from app.services.metrics import record_bytes, stage
+from app.services.parse_cache import PARSE_CACHE
+
+# 需要分页访问、不整体解析的顶层数组
+ARRAY_KEYS: Tuple[str, ...] = (
+    "snapshots",
+    "snapshot-log",
+    "metadata-log",
+    "statistics",
+    "partition-statistics",
+)
+
+# 表头必须包含的字段（v1 表使用 schema / partition-spec，v2 使用 schemas / partition-specs）
+_REQUIRED_HEADER_KEYS: Tuple[Tuple[str, ...], ...] = (
+    ("format-version",),
+    ("table-uuid",),
+    ("location",),
+    ("current-snapshot-id",),
+    ("schemas", "schema"),
+    ("partition-specs", "partition-spec"),
+)
+
+_HEADER_CHUNK_BYTES = 64 * 1024
+_WS = re.compile(r"[ \t\n\r]*")
+_DECODER = json.JSONDecoder()
+
+
+class _NeedMoreData(Exception):
+    """前缀不完整，需要继续读取"""
+
+
+def _scan_object(text: str, complete: bool, stop_at_arrays: bool) -> Tuple[Dict[str, Any], Dict[str, Tuple[List[int], List[int]]], bool]:
+    """
+    扫描顶层 JSON 对象
+
+    Args:
+        text: 完整文本或文件前缀
+        complete: text 是否为完整文件
+        stop_at_arrays: 遇到 ARRAY_KEYS 中的数组时停止（只取表头）
+
+    Returns:
+        (header, arrays, stopped): 非数组字段的值、各数组元素的字符偏移 (starts, ends)、是否提前停止
+    """
+    header: Dict[str, Any] = {}
+    arrays: Dict[str, Tuple[List[int], List[int]]] = {}
+    ws = _WS.match
+    raw_decode = _DECODER.raw_decode
+    try:
+        pos = ws(text, 0).end()
+        if text[pos] != "{":
+            raise ValueError("metadata.json 顶层必须是 JSON 对象")
+        pos = ws(text, pos + 1).end()
+        if text[pos] == "}":
+            return header, arrays, False
+        while True:
+            key, pos = raw_decode(text, pos)
+            pos = ws(text, pos).end()
+            if text[pos] != ":":
+                raise ValueError(f"JSON 格式错误（位置 {pos}）")
+            pos = ws(text, pos + 1).end()
+            if key in ARRAY_KEYS and text[pos] == "[":
+                if stop_at_arrays:
+                    return header, arrays, True
+                starts: List[int] = []
+                ends: List[int] = []
+                pos = ws(text, pos + 1).end()
+                if text[pos] == "]":
+                    pos += 1
+                else:
+                    while True:
+                        # 元素逐个解码后立即丢弃，只记录位置
+                        _, end = raw_decode(text, pos)
+                        starts.append(pos)
+                        ends.append(end)
+                        pos = ws(text, end).end()
+                        if text[pos] == ",":
+                            pos = ws(text, pos + 1).end()
+                        elif text[pos] == "]":
+                            pos += 1
+                            break
+                        else:
+                            raise ValueError(f"JSON 格式错误（位置 {pos}）")
+                arrays[key] = (starts, ends)
+            else:
+                header[key], pos = raw_decode(text, pos)
+            pos = ws(text, pos).end()
+            if text[pos] == ",":
+                pos = ws(text, pos + 1).end()
+            elif text[pos] == "}":
+                return header, arrays, False
+            else:
+                raise ValueError(f"JSON 格式错误（位置 {pos}）")
+    except (IndexError, json.JSONDecodeError) as e:
+        if not complete:
+            raise _NeedMoreData() from e
+        raise ValueError(f"JSON 解析错误: {e}")
+
+
+def _has_required_header(header: Dict[str, Any]) -> bool:
+    return all(any(k in header for k in keys) for keys in _REQUIRED_HEADER_KEYS)
+
+
+def _to_byte_offsets(text: str, offsets: List[int]) -> array:
+    """把字符偏移（升序）转换成 UTF-8 字节偏移"""
+    result = array("q")
+    prev_char = 0
+    prev_byte = 0
+    for off in offsets:
+        prev_byte += len(text[prev_char:off].encode("utf-8"))
+        prev_char = off
+        result.append(prev_byte)
+    return result
+
+
+def build_metadata_index(file_path: str) -> Dict[str, Any]:
+    """
+    完整扫描一次 metadata.json：解码表头字段，并记录各大数组中每个元素的字节范围
+
+    Returns:
+        dict: header（非数组字段）、arrays（key → (starts, ends) 字节偏移）、counts（各数组长度）
+    """
+    with open_input(file_path) as f:
+        raw = f.read()
+    record_bytes("json", len(raw))
+    with stage("json_index"):
+        text = raw.decode("utf-8")
+        header, char_arrays, _ = _scan_object(text, complete=True, stop_at_arrays=False)
+    ascii_only = len(text) == len(raw)
+    arrays: Dict[str, Tuple[array, array]] = {}
+    for key, (starts, ends) in char_arrays.items():
+        if ascii_only:
+            arrays[key] = (array("q", starts), array("q", ends))
+        else:
+            # 起止偏移交错后一起转换，保证升序
+            merged = _to_byte_offsets(text, [x for pair in zip(starts, ends) for x in pair])
+            arrays[key] = (merged[0::2], merged[1::2])
+    return {
+        "header": header,
+        "arrays": arrays,
+        "counts": {key: len(starts) for key, (starts, _) in arrays.items()},
+        "size": len(raw),
+    }
+
+
+def _index_cost(index: Dict[str, Any]) -> int:
+    spans = sum(len(starts) for starts, _ in index["arrays"].values())
+    # 表头按其在文件中占比的粗略估计：文件总大小减去数组部分
+    array_bytes = sum((ends[-1] - starts[0]) if len(starts) else 0 for starts, ends in index["arrays"].values())
+    return max(1, index["size"] - array_bytes) + spans * 16
+
+
+def get_metadata_index(file_path: str) -> Dict[str, Any]:
+    """带缓存的 build_metadata_index（文件 size / mtime 变化后自动失效）"""
+    return PARSE_CACHE.get_or_load(
+        "json-index", file_path, lambda: build_metadata_index(file_path), cost=_index_cost
+    )
+
+
+def _cached_index(file_path: str) -> Optional[Dict[str, Any]]:
+    key = PARSE_CACHE.make_key("json-index", file_path)
+    if key is None:
+        return None
+    found, value = PARSE_CACHE.get(key)
+    return value if found else None
+
+
+def read_metadata_header(file_path: str, with_counts: bool = False) -> Dict[str, Any]:
+    """
+    读取 metadata.json 的表头字段，不构建 snapshots 等大数组
+
+    只读取文件开头直到第一个大数组；表头字段不全（例如写在大数组之后）或需要数组长度时，
+    退回完整扫描并缓存索引。
+
+    Returns:
+        dict: header、counts（各数组长度，未知时为 None）、bytes_read、from_index、elapsed_ms
+    """
+    started = time.perf_counter()
+    index = _cached_index(file_path)
+    if index is None and not with_counts:
+        decoder = codecs.getincrementaldecoder("utf-8")()
+        text = ""
+        bytes_read = 0
+        chunk_size = _HEADER_CHUNK_BYTES
+        with open_input(file_path) as f:
+            while True:
+                chunk = f.read(chunk_size)
+                bytes_read += len(chunk)
+                complete = not chunk
+                text += decoder.decode(chunk, final=complete)
+                try:
+                    header, _, stopped = _scan_object(text, complete=complete, stop_at_arrays=True)
+                except _NeedMoreData:
+                    # 前缀长度翻倍，重扫的总开销仍与读取量成正比
+                    chunk_size = max(chunk_size, bytes_read)
+                    continue
+                if not stopped or _has_required_header(header):
+                    record_bytes("json", bytes_read)
+                    return {
+                        "header": header,
+                        "counts": None if stopped else {},
+                        "bytes_read": bytes_read,
+                        "from_index": False,
+                        "elapsed_ms": round((time.perf_counter() - started) * 1000, 3),
+                    }
+                break
+    if index is None:
+        index = get_metadata_index(file_path)
+    return {
+        "header": index["header"],
+        "counts": index["counts"],
+        "bytes_read": index["size"],
+        "from_index": True,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 3),
+    }
+
+
+def read_metadata_array(file_path: str, key: str, offset: int = 0, limit: int = 100,
+                        reverse: bool = False) -> Dict[str, Any]:
+    """
+    分页读取 metadata.json 中的大数组（snapshots / snapshot-log / metadata-log 等）
+
+    Args:
+        key: 数组字段名，见 ARRAY_KEYS
+        reverse: 从数组末尾（最新的条目）开始分页
+
+    Returns:
+        dict: items、total、offset、limit、has_more
+    """
+    if key not in ARRAY_KEYS:
+        raise ValueError(f"不支持分页读取的字段: {key}（可选: {', '.join(ARRAY_KEYS)}）")
+    index = get_metadata_index(file_path)
+    starts, ends = index["arrays"].get(key, (array("q"), array("q")))
+    total = len(starts)
+    if reverse:
+        positions = list(range(total - 1 - offset, max(-1, total - 1 - offset - limit), -1))
+    else:
+        positions = list(range(offset, min(total, offset + limit)))
+    items: List[Any] = []
+    if positions:
+        lo = min(positions)
+        hi = max(positions)
+        with open_input(file_path) as f:
+            f.seek(starts[lo])
+            block = f.read(ends[hi] - starts[lo])
+        record_bytes("json", len(block))
+        base = starts[lo]
+        for i in positions:
+            items.append(json.loads(block[starts[i] - base:ends[i] - base]))
+    return {
+        "key": key,
+        "items": items,
+        "total": total,
+        "offset": offset,
+        "limit": limit,
+        "reverse": reverse,
+        "has_more": offset + limit < total,
+    }
@@ -0,0 +1,266 @@
+"""metadata.json 版本时间线
+
+把 metadata 目录下的所有 *.metadata.json 版本串成时间线，相邻版本之间比较：
+- schema 变化（字段级：新增 / 删除 / 重命名 / 类型变化 / 必填变化）
+- 分区 spec 变化、表属性变化
+- snapshot 的新增与过期、当前 snapshot 的切换
+
+每个版本解析后只保留精简摘要，按文件 (size, mtime) 缓存在解析缓存中；
+再次扫描时只有新增（或被修改）的版本需要解析，未命中的版本并发解析。
+"""
+from __future__ import annotations
+
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config import SCAN_EXECUTOR, SCAN_MAX_WORKERS
+from app.services.column_metrics import schema_field_types
+from app.services.filesystem import is_dir, join_path, list_names
+from app.services.iceberg_parser import _classify_metadata_file, metadata_version_number
+from app.services.json_utils import parse_json_file
+from app.services.parse_cache import PARSE_CACHE
+from app.services.profiler import bind
+
+
+def _get(data: Dict[str, Any], key: str, default: Any = None) -> Any:
+    # 兼容 "current-snapshot-id" / "current_snapshot_id" 两种写法
+    value = data.get(key)
+    if value is None:
+        value = data.get(key.replace("-", "_"), default)
+    return value
+
+
+def _schema_fields(schema: Dict[str, Any]) -> Dict[int, Tuple[str, str, bool]]:
+    return {
+        field_id: (info["name"], info["type"] if isinstance(info["type"], str) else info["type"].get("type"),
+                   info["required"])
+        for field_id, info in schema_field_types(schema).items()
+    }
+
+
+def _spec_fields(spec: Dict[str, Any]) -> List[Tuple[Any, ...]]:
+    return [
+        (f.get("source-id", f.get("source_id")), f.get("transform"), f.get("name"), f.get("field-id", f.get("field_id")))
+        for f in spec.get("fields") or []
+        if isinstance(f, dict)
+    ]
+
+
+def summarize_metadata_version(file_path: str) -> Dict[str, Any]:
+    """解析一个 metadata.json，只保留时间线需要的精简信息（可在进程池中执行）"""
+    data = parse_json_file(file_path)
+    if not isinstance(data, dict):
+        raise ValueError("metadata.json 顶层必须是 JSON 对象")
+
+    schemas = _get(data, "schemas") or ([data["schema"]] if data.get("schema") else [])
+    schema_map = {}
+    for s in schemas:
+        if isinstance(s, dict):
+            schema_map[_get(s, "schema-id", 0)] = _schema_fields(s)
+    current_schema_id = _get(data, "current-schema-id")
+    if current_schema_id is None and schema_map:
+        current_schema_id = next(iter(schema_map))
+
+    specs = _get(data, "partition-specs") or []
+    spec_map = {}
+    for s in specs:
+        if isinstance(s, dict):
+            spec_map[_get(s, "spec-id", 0)] = _spec_fields(s)
+    default_spec_id = _get(data, "default-spec-id")
+    if not spec_map and isinstance(data.get("partition-spec"), list):
+        # v1 表只有 partition-spec（字段列表）
+        spec_map[0] = _spec_fields({"fields": data["partition-spec"]})
+        default_spec_id = 0
+
+    snapshot_ids = array("q", sorted(
+        int(_get(s, "snapshot-id")) for s in (data.get("snapshots") or [])
+        if isinstance(s, dict) and _get(s, "snapshot-id") is not None
+    ))
+    return {
+        "format_version": _get(data, "format-version"),
+        "table_uuid": _get(data, "table-uuid"),
+        "last_updated_ms": _get(data, "last-updated-ms"),
+        "last_sequence_number": _get(data, "last-sequence-number"),
+        "current_snapshot_id": _get(data, "current-snapshot-id"),
+        "current_schema_id": current_schema_id,
+        "schemas": schema_map,
+        "default_spec_id": default_spec_id,
+        "specs": spec_map,
+        "default_sort_order_id": _get(data, "default-sort-order-id"),
+        "properties": data.get("properties") or {},
+        "snapshot_ids": snapshot_ids,
+    }
+
+
+def _summary_cost(summary: Dict[str, Any]) -> int:
+    fields = sum(len(f) for f in summary["schemas"].values())
+    return 1024 + len(summary["snapshot_ids"]) * 8 + fields * 128 + len(summary["properties"]) * 128
+
+
+def _list_versions(metadata_dir: str) -> List[Tuple[str, str]]:
+    names = [n for n in list_names(metadata_dir) if _classify_metadata_file(n) == "metadata_files"]
+    names.sort(key=lambda n: (metadata_version_number(n), n))
+    return [(n, join_path(metadata_dir, n)) for n in names]
+
+
+def _cached_summary(file_path: str) -> Tuple[bool, Any]:
+    key = PARSE_CACHE.make_key("timeline", file_path)
+    if key is None:
+        return False, None
+    return PARSE_CACHE.get(key)
+
+
+def _diff_schema(old: Dict[int, Tuple[str, str, bool]], new: Dict[int, Tuple[str, str, bool]]) -> Optional[Dict[str, Any]]:
+    added = [{"id": i, "name": new[i][0], "type": new[i][1]} for i in sorted(new.keys() - old.keys())]
+    removed = [{"id": i, "name": old[i][0], "type": old[i][1]} for i in sorted(old.keys() - new.keys())]
+    renamed, type_changed, required_changed = [], [], []
+    for i in sorted(old.keys() & new.keys()):
+        (old_name, old_type, old_req), (new_name, new_type, new_req) = old[i], new[i]
+        if old_name != new_name:
+            renamed.append({"id": i, "from": old_name, "to": new_name})
+        if old_type != new_type:
+            type_changed.append({"id": i, "name": new_name, "from": old_type, "to": new_type})
+        if old_req != new_req:
+            required_changed.append({"id": i, "name": new_name, "from": old_req, "to": new_req})
+    if not (added or removed or renamed or type_changed or required_changed):
+        return None
+    return {
+        "added": added,
+        "removed": removed,
+        "renamed": renamed,
+        "type_changed": type_changed,
+        "required_changed": required_changed,
+    }
+
+
+def _diff_properties(old: Dict[str, Any], new: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    added = {k: new[k] for k in sorted(new.keys() - old.keys())}
+    removed = sorted(old.keys() - new.keys())
+    changed = {k: {"from": old[k], "to": new[k]} for k in sorted(old.keys() & new.keys()) if old[k] != new[k]}
+    if not (added or removed or changed):
+        return None
+    return {"added": added, "removed": removed, "changed": changed}
+
+
+def _version_changes(prev: Optional[Dict[str, Any]], cur: Dict[str, Any]) -> Dict[str, Any]:
+    changes: Dict[str, Any] = {}
+    if prev is None:
+        changes["snapshots"] = {"added": list(cur["snapshot_ids"]), "expired": []}
+        return changes
+
+    if prev["current_schema_id"] != cur["current_schema_id"] or prev["schemas"] != cur["schemas"]:
+        old_fields = prev["schemas"].get(prev["current_schema_id"], {})
+        new_fields = cur["schemas"].get(cur["current_schema_id"], {})
+        field_diff = _diff_schema(old_fields, new_fields)
+        if field_diff is not None or prev["current_schema_id"] != cur["current_schema_id"]:
+            changes["schema"] = {
+                "from_schema_id": prev["current_schema_id"],
+                "to_schema_id": cur["current_schema_id"],
+                **(field_diff or {}),
+            }
+
+    if prev["default_spec_id"] != cur["default_spec_id"] or prev["specs"] != cur["specs"]:
+        changes["partition_spec"] = {
+            "from_spec_id": prev["default_spec_id"],
+            "to_spec_id": cur["default_spec_id"],
+            "added_spec_ids": sorted(cur["specs"].keys() - prev["specs"].keys()),
+            "fields": [
+                {"source_id": f[0], "transform": f[1], "name": f[2], "field_id": f[3]}
+                for f in cur["specs"].get(cur["default_spec_id"], [])
+            ],
+        }
+
+    if prev["default_sort_order_id"] != cur["default_sort_order_id"]:
+        changes["sort_order"] = {"from": prev["default_sort_order_id"], "to": cur["default_sort_order_id"]}
+
+    prop_diff = _diff_properties(prev["properties"], cur["properties"])
+    if prop_diff is not None:
+        changes["properties"] = prop_diff
+
+    if prev["snapshot_ids"] != cur["snapshot_ids"]:
+        old_ids, new_ids = set(prev["snapshot_ids"]), set(cur["snapshot_ids"])
+        changes["snapshots"] = {"added": sorted(new_ids - old_ids), "expired": sorted(old_ids - new_ids)}
+
+    if prev["current_snapshot_id"] != cur["current_snapshot_id"]:
+        changes["current_snapshot"] = {"from": prev["current_snapshot_id"], "to": cur["current_snapshot_id"]}
+    if prev["format_version"] != cur["format_version"]:
+        changes["format_version"] = {"from": prev["format_version"], "to": cur["format_version"]}
+    return changes
+
+
+def build_metadata_timeline(metadata_dir: str, max_workers: Optional[int] = None,
+                            executor: Optional[str] = None) -> Dict[str, Any]:
+    """
+    生成 metadata 目录的版本时间线
+
+    Returns:
+        dict: versions（按版本号排列，每个版本附带与上一版本相比的 changes）、
+              parsed / cached（本次解析 / 命中缓存的版本数）、failed、elapsed_ms
+    """
+    started = time.perf_counter()
+    if not is_dir(metadata_dir):
+        return {"success": False, "error": f"目录不存在: {metadata_dir}"}
+
+    versions = _list_versions(metadata_dir)
+    summaries: Dict[str, Dict[str, Any]] = {}
+    missing: List[str] = []
+    for _, path in versions:
+        found, value = _cached_summary(path)
+        if found:
+            summaries[path] = value
+        else:
+            missing.append(path)
+
+    failed: List[Dict[str, Any]] = []
+    if missing:
+        if (executor or SCAN_EXECUTOR) == "process":
+            pool_cls, summarize = ProcessPoolExecutor, summarize_metadata_version
+        else:
+            pool_cls, summarize = ThreadPoolExecutor, bind(summarize_metadata_version)
+        workers = max(1, min(max_workers or SCAN_MAX_WORKERS, len(missing)))
+        with pool_cls(max_workers=workers) as pool:
+            futures = [(path, pool.submit(summarize, path)) for path in missing]
+            for path, future in futures:
+                try:
+                    summary = future.result()
+                except Exception as e:
+                    failed.append({"path": path, "error": str(e)})
+                    continue
+                summaries[path] = summary
+                key = PARSE_CACHE.make_key("timeline", path)
+                if key is not None and PARSE_CACHE.max_bytes > 0:
+                    PARSE_CACHE.put(key, summary, _summary_cost(summary))
+
+    timeline: List[Dict[str, Any]] = []
+    prev: Optional[Dict[str, Any]] = None
+    for name, path in versions:
+        cur = summaries.get(path)
+        if cur is None:
+            continue
+        timeline.append({
+            "version": metadata_version_number(name),
+            "name": name,
+            "path": path,
+            "last_updated_ms": cur["last_updated_ms"],
+            "last_sequence_number": cur["last_sequence_number"],
+            "current_snapshot_id": cur["current_snapshot_id"],
+            "current_schema_id": cur["current_schema_id"],
+            "schema_ids": sorted(cur["schemas"].keys()),
+            "default_spec_id": cur["default_spec_id"],
+            "snapshots_count": len(cur["snapshot_ids"]),
+            "changes": _version_changes(prev, cur),
+        })
+        prev = cur
+
+    return {
+        "success": True,
+        "error": None,
+        "versions": timeline,
+        "versions_total": len(versions),
+        "parsed": len(missing),
+        "cached": len(versions) - len(missing),
+        "failed": failed,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 3),
+    }
@@ -0,0 +1,246 @@
+"""运行指标（Prometheus 文本格式）
+
+不依赖 prometheus_client，只实现这里需要的 Counter / Histogram 与文本输出：
+
+- 路由级的请求数与耗时直方图（由 app.api.middleware 记录）
+- 解析各阶段的耗时（avro_open / avro_decode / avro_convert / parquet_read / json_parse / encode_* 等）
+- 读取的字节数、解码的记录数、远程文件系统的请求数
+- 解析缓存命中率与执行器排队深度在输出时从 PARSE_CACHE / BLOCKING_EXECUTOR 读取，不额外记录
+
+打点只在阶段粒度上进行（不在逐条记录的循环里），METRICS_ENABLED=0 时 stage() 不做任何计时。
+进程池模式下在子进程中执行的阶段不会计入（各进程的计数不共享）。
+"""
+from __future__ import annotations
+
+import math
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager, nullcontext
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from app.config import METRICS_ENABLED
+
+# 耗时直方图的默认分桶（秒）
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape_label(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    """只增不减的计数器，按标签值分组"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, *labels: str) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            yield f"{self.name}{_label_text(self.labelnames, labels)} {_format_value(value)}"
+
+
+class Histogram:
+    """累计分桶直方图，按标签值分组"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels → [各分桶计数..., +Inf 计数, 总和]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            # 只记录落入的分桶，输出时再累加
+            state[bisect_left(self.buckets, value)] += 1
+            state[-1] += value
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            items = sorted((labels, list(state)) for labels, state in self._values.items())
+        for labels, state in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), state[:-1]):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{_label_text(self.labelnames, labels, le)} {cumulative}"
+            yield f"{self.name}_sum{_label_text(self.labelnames, labels)} {_format_value(state[-1])}"
+            yield f"{self.name}_count{_label_text(self.labelnames, labels)} {cumulative}"
+
+
+class Registry:
+    """指标注册表；collectors 在输出时调用，返回 (名称, 类型, 说明, [(标签, 值)])"""
+
+    def __init__(self):
+        self._metrics: List[object] = []
+        self._collectors: List[Callable[[], List[Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]]]] = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector) -> None:
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        for collector in self._collectors:
+            for name, kind, documentation, samples in collector():
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_label_text(list(labels), list(labels.values()))} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+HTTP_REQUESTS = REGISTRY.register(Counter(
+    "iceberg_http_requests_total", "HTTP 请求数", ("method", "route", "status"),
+))
+HTTP_DURATION = REGISTRY.register(Histogram(
+    "iceberg_http_request_duration_seconds", "HTTP 请求耗时（流式响应包含发送时间）", ("method", "route"),
+))
+STAGE_DURATION = REGISTRY.register(Histogram(
+    "iceberg_stage_duration_seconds", "解析 / 编码各阶段耗时", ("stage",),
+))
+BYTES_READ = REGISTRY.register(Counter(
+    "iceberg_bytes_read_total", "读取的文件字节数", ("kind",),
+))
+RECORDS_DECODED = REGISTRY.register(Counter(
+    "iceberg_records_decoded_total", "解码的记录（行）数", ("kind",),
+))
+REMOTE_REQUESTS = REGISTRY.register(Counter(
+    "iceberg_remote_requests_total", "远程文件系统（HTTP / S3）请求数", ("method", "status"),
+))
+EXECUTOR_WAIT = REGISTRY.register(Histogram(
+    "iceberg_executor_wait_seconds", "阻塞任务在执行器中排队等待的时间", ("op",),
+))
+
+
+@contextmanager
+def _timed(stage: str) -> Iterator[None]:
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_DURATION.observe(time.perf_counter() - started, stage)
+
+
+def stage(name: str):
+    """记录一个阶段的耗时: with stage("avro_decode"): ..."""
+    return _timed(name) if METRICS_ENABLED else nullcontext()
+
+
+def record_bytes(kind: str, nbytes: Optional[int]) -> None:
+    if METRICS_ENABLED and nbytes:
+        BYTES_READ.inc(nbytes, kind)
+
+
+def record_records(kind: str, count: Optional[int]) -> None:
+    if METRICS_ENABLED and count:
+        RECORDS_DECODED.inc(count, kind)
+
+
+def record_remote_request(method: str, status: str) -> None:
+    if METRICS_ENABLED:
+        REMOTE_REQUESTS.inc(1, method, status)
+
+
+def _cache_samples():
+    from app.services.parse_cache import PARSE_CACHE
+
+    stats = PARSE_CACHE.stats()
+    # 缓存已按基础解析类型（avro / json / preview ...）统计，标签集合有界
+    kinds: Dict[str, Dict[str, int]] = stats["kinds"]
+    return [
+        ("iceberg_parse_cache_hits_total", "counter", "解析缓存命中次数（按解析类型）",
+         [({"kind": k}, v["hits"]) for k, v in kinds.items()]),
+        ("iceberg_parse_cache_misses_total", "counter", "解析缓存未命中次数（按解析类型）",
+         [({"kind": k}, v["misses"]) for k, v in kinds.items()]),
+        ("iceberg_parse_cache_evictions_total", "counter", "解析缓存淘汰次数", [({}, stats["evictions"])]),
+        ("iceberg_parse_cache_hit_ratio", "gauge", "解析缓存命中率", [({}, stats["hit_rate"])]),
+        ("iceberg_parse_cache_entries", "gauge", "解析缓存条目数", [({}, stats["entries"])]),
+        ("iceberg_parse_cache_bytes", "gauge", "解析缓存估算占用字节数", [({}, stats["current_bytes"])]),
+        ("iceberg_parse_cache_max_bytes", "gauge", "解析缓存字节预算", [({}, stats["max_bytes"])]),
+    ]
+
+
+def _executor_samples():
+    from app.services.executor import BLOCKING_EXECUTOR
+
+    ops = BLOCKING_EXECUTOR.stats()["ops"]
+
+    def per_op(field: str):
+        return [({"op": name}, s[field]) for name, s in ops.items()]
+
+    return [
+        ("iceberg_executor_queue_depth", "gauge", "每种操作排队等待的任务数", per_op("waiting")),
+        ("iceberg_executor_running", "gauge", "每种操作正在执行的任务数", per_op("running")),
+        ("iceberg_executor_limit", "gauge", "每种操作的并发上限", per_op("limit")),
+        ("iceberg_executor_completed_total", "counter", "每种操作已完成的任务数", per_op("completed")),
+        ("iceberg_executor_rejected_total", "counter", "每种操作因排队已满被拒绝的任务数", per_op("rejected")),
+    ]
+
+
+def _connection_pool_samples():
+    from app.services.filesystem import CONNECTION_POOL
+
+    stats = CONNECTION_POOL.stats()
+    return [
+        ("iceberg_remote_connections_created_total", "counter", "远程连接池新建的连接数", [({}, stats["created"])]),
+        ("iceberg_remote_connections_reused_total", "counter", "远程连接池复用连接的次数", [({}, stats["reused"])]),
+        ("iceberg_remote_connections_idle", "gauge", "远程连接池中空闲的连接数", [({}, stats["idle"])]),
+    ]
+
+
+REGISTRY.add_collector(_cache_samples)
+REGISTRY.add_collector(_executor_samples)
+REGISTRY.add_collector(_connection_pool_samples)
+
+
+def render_metrics() -> str:
+    """Prometheus 文本格式（text/plain; version=0.0.4）"""
+    return REGISTRY.render()
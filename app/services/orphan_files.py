@@ -0,0 +1,351 @@
+"""孤儿文件检测
+
+把表中所有 snapshot 引用的数据文件与删除文件合并成一个集合，与 data 目录下实际存在的文件比较，
+没有被任何 snapshot 引用的文件即为孤儿文件候选（写入失败残留、过期 snapshot 未清理的文件等）。
+
+- 所有 snapshot 的 manifest list 中重复出现的 manifest 只解析一次（manifest 写入后不会修改）
+- manifest 并发投影读取，只解码 status / file_path 字段，不写入解析缓存
+- 引用的文件数超过 ORPHAN_MAX_PATHS_IN_MEMORY 时，引用集合与目录遍历结果按路径哈希分桶写入临时文件，
+  逐个桶比较，内存占用只与单个桶的大小有关
+"""
+from __future__ import annotations
+
+import math
+import os
+import tempfile
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+from app.config import FANOUT_MAX_WORKERS, ORPHAN_MAX_PATHS_IN_MEMORY
+from app.services.filesystem import is_remote
+from app.services.iceberg_parser import (
+    as_records,
+    latest_metadata_file,
+    parse_avro_file,
+    read_manifest_list,
+)
+from app.services.json_utils import parse_json_file
+from app.services.profiler import bind
+from app.services.snapshot_stats import ENTRY_STATUS_DELETED
+
+# 判断文件是否被引用只需要这两个字段
+_ENTRY_FIELDS: Tuple[str, ...] = ("status", "data_file.file_path")
+# v1 使用 added_data_files_count / existing_data_files_count，v2 改名为 added_files_count / existing_files_count
+_MANIFEST_LIST_FIELDS: Tuple[str, ...] = (
+    "manifest_path",
+    "added_data_files_count",
+    "existing_data_files_count",
+    "added_files_count",
+    "existing_files_count",
+)
+_MISSING_EXAMPLES = 20
+
+
+def normalize_file_path(path: str) -> str:
+    """统一 manifest 中记录的路径与本地遍历得到的路径：去掉 file: / file:// 前缀并规范化"""
+    if path.startswith("file:"):
+        path = path[5:]
+        if path.startswith("//"):
+            path = "/" + path.lstrip("/")
+    if "://" in path:
+        return path
+    return os.path.normpath(path)
+
+
+def _referenced_files(manifest_path: str) -> Tuple[List[str], Optional[str]]:
+    """manifest 中仍然有效（非 DELETED）的文件路径"""
+    result = parse_avro_file(manifest_path, fields=_ENTRY_FIELDS)
+    if not result.get("success"):
+        return [], result.get("error")
+    paths = []
+    for entry in as_records(result.get("data")):
+        if entry.get("status") == ENTRY_STATUS_DELETED:
+            continue
+        data_file = entry.get("data_file") or {}
+        path = data_file.get("file_path")
+        if path:
+            paths.append(normalize_file_path(path))
+    return paths, None
+
+
+def _live_files_count(manifest: Dict[str, Any]) -> int:
+    added = manifest.get("added_files_count", manifest.get("added_data_files_count")) or 0
+    existing = manifest.get("existing_files_count", manifest.get("existing_data_files_count")) or 0
+    return added + existing
+
+
+def _manifest_list_of(snapshot: Dict[str, Any]) -> Optional[str]:
+    return snapshot.get("manifest-list") or snapshot.get("manifest_list")
+
+
+def _data_dir(table_root: str, metadata_data: Dict[str, Any]) -> str:
+    # write.data.path 指向本地目录时以它为准，否则为 <表根目录>/data
+    properties = metadata_data.get("properties") or {}
+    for key in ("write.data.path", "write.object-storage.path", "write.folder-storage.path"):
+        value = properties.get(key)
+        if isinstance(value, str) and value:
+            local = normalize_file_path(value)
+            if "://" not in local and os.path.isdir(local):
+                return local
+    return os.path.join(table_root, "data")
+
+
+def _walk_files(root: str) -> Iterator[Tuple[str, int, int]]:
+    """深度优先遍历目录，逐个产出 (路径, 大小, mtime_ms)"""
+    stack = [root]
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        elif entry.is_file(follow_symlinks=False):
+                            st = entry.stat(follow_symlinks=False)
+                            yield os.path.normpath(entry.path), st.st_size, st.st_mtime_ns // 1_000_000
+                    except OSError:
+                        continue
+        except OSError:
+            continue
+
+
+class _Spool:
+    """按路径哈希分桶的临时文件：引用的路径与遍历到的文件各一组"""
+
+    def __init__(self, buckets: int):
+        self.buckets = buckets
+        self._dir = tempfile.TemporaryDirectory(prefix="orphan-files-")
+        self._ref = [open(os.path.join(self._dir.name, f"ref-{i}"), "w", encoding="utf-8") for i in range(buckets)]
+        self._found = [open(os.path.join(self._dir.name, f"found-{i}"), "w", encoding="utf-8")
+                       for i in range(buckets)]
+
+    def _bucket(self, path: str) -> int:
+        return zlib.crc32(path.encode("utf-8", "surrogateescape")) % self.buckets
+
+    def add_referenced(self, path: str) -> None:
+        if "\n" not in path:
+            self._ref[self._bucket(path)].write(path + "\n")
+
+    def add_found(self, path: str, size: int, mtime_ms: int) -> None:
+        if "\n" not in path:
+            self._found[self._bucket(path)].write(f"{size}\t{mtime_ms}\t{path}\n")
+
+    def finish_writing(self) -> None:
+        for f in self._ref + self._found:
+            f.close()
+
+    def iter_buckets(self) -> Iterator[Tuple[Set[str], Iterator[Tuple[str, int, int]]]]:
+        """逐个桶产出 (该桶引用的路径集合, 该桶遍历到的文件)"""
+        for i in range(self.buckets):
+            with open(os.path.join(self._dir.name, f"ref-{i}"), "r", encoding="utf-8") as f:
+                referenced = {line[:-1] for line in f}
+            yield referenced, self._read_found(i)
+
+    def _read_found(self, i: int) -> Iterator[Tuple[str, int, int]]:
+        with open(os.path.join(self._dir.name, f"found-{i}"), "r", encoding="utf-8") as f:
+            for line in f:
+                size, mtime_ms, path = line[:-1].split("\t", 2)
+                yield path, int(size), int(mtime_ms)
+
+    def close(self) -> None:
+        for f in self._ref + self._found:
+            if not f.closed:
+                f.close()
+        self._dir.cleanup()
+
+
+def iter_orphan_files(table_root: str, older_than_ms: Optional[int] = None,
+                      max_workers: Optional[int] = None,
+                      max_paths_in_memory: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """
+    检测表 data 目录中的孤儿文件，逐个产出事件
+
+    Args:
+        table_root: 表根目录（包含 metadata/ 与 data/）
+        older_than_ms: 只把修改时间早于该时间戳（毫秒）的文件作为候选，较新的文件可能属于正在进行的写入
+        max_paths_in_memory: 超过该数量的引用路径时改为分桶比较（默认 ORPHAN_MAX_PATHS_IN_MEMORY）
+
+    事件类型：
+        - {"type": "start", ...}: 所有 snapshot 的 manifest list 读取完成，给出去重后的 manifest 数
+        - {"type": "progress", ...}: 每解析完一个 manifest
+        - {"type": "orphan", ...}: 孤儿文件候选（file_path、file_size_in_bytes、modified_ms）
+        - {"type": "result", ...}: 汇总（孤儿文件数与字节数、引用文件数、缺失文件数等）
+        - {"type": "error", ...}: metadata 不存在或无法读取
+    """
+    started = time.perf_counter()
+    if is_remote(table_root):
+        yield {"type": "error", "error": f"孤儿文件检测只支持本地表: {table_root}"}
+        return
+    metadata_dir = os.path.join(table_root, "metadata")
+    metadata_path = latest_metadata_file(metadata_dir)
+    if metadata_path is None:
+        yield {"type": "error", "error": f"找不到 metadata.json: {metadata_dir}"}
+        return
+    metadata_data = parse_json_file(metadata_path)
+    if not isinstance(metadata_data, dict):
+        yield {"type": "error", "error": "metadata.json 顶层必须是 JSON 对象"}
+        return
+    data_dir = os.path.normpath(_data_dir(table_root, metadata_data))
+    snapshots = [s for s in (metadata_data.get("snapshots") or []) if isinstance(s, dict)]
+    manifest_lists = sorted({ml for ml in (_manifest_list_of(s) for s in snapshots) if ml})
+    workers = max_workers or FANOUT_MAX_WORKERS
+
+    # 1. 所有 snapshot 的 manifest list，manifest 按路径去重
+    failed: List[Dict[str, Any]] = []
+    manifests: Dict[str, int] = {}
+    references = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(bind(read_manifest_list), ml, _MANIFEST_LIST_FIELDS): ml for ml in manifest_lists
+        }
+        for future in as_completed(futures):
+            try:
+                records, error = future.result()
+            except Exception as e:
+                records, error = [], str(e)
+            if error:
+                failed.append({"manifest_list": futures[future], "error": error})
+                continue
+            for m in records:
+                path = m.get("manifest_path")
+                if not path:
+                    continue
+                references += 1
+                if path not in manifests:
+                    manifests[path] = _live_files_count(m)
+
+    estimated_files = sum(manifests.values())
+    limit = max(1, max_paths_in_memory or ORPHAN_MAX_PATHS_IN_MEMORY)
+    buckets = max(1, math.ceil(estimated_files / limit))
+    yield {
+        "type": "start",
+        "metadata_path": metadata_path,
+        "data_dir": data_dir,
+        "snapshots": len(snapshots),
+        "manifest_lists": len(manifest_lists),
+        "manifests_total": len(manifests),
+        "manifests_deduplicated": references - len(manifests),
+        "estimated_referenced_files": estimated_files,
+        "buckets": buckets,
+    }
+
+    # 2. 并发解析去重后的 manifest，合并引用的文件
+    spool = _Spool(buckets) if buckets > 1 else None
+    referenced: Set[str] = set()
+    try:
+        done = 0
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            pending = iter(sorted(manifests))
+            futures = {}
+            # 只保留有限个未完成的任务，避免已解码的路径列表在队列中堆积
+            for path in pending:
+                futures[pool.submit(bind(_referenced_files), path)] = path
+                if len(futures) >= workers * 2:
+                    break
+            while futures:
+                future = next(as_completed(futures))
+                manifest_path = futures.pop(future)
+                try:
+                    paths, error = future.result()
+                except Exception as e:
+                    paths, error = [], str(e)
+                if error:
+                    failed.append({"manifest_path": manifest_path, "error": error})
+                elif spool is not None:
+                    for p in paths:
+                        spool.add_referenced(p)
+                else:
+                    referenced.update(paths)
+                done += 1
+                yield {
+                    "type": "progress",
+                    "manifests_done": done,
+                    "manifests_total": len(manifests),
+                    "manifest_path": manifest_path,
+                    "error": error,
+                }
+                next_path = next(pending, None)
+                if next_path is not None:
+                    futures[pool.submit(bind(_referenced_files), next_path)] = next_path
+
+        # 3. 遍历 data 目录并比较
+        totals = {
+            "files_scanned": 0,
+            "bytes_scanned": 0,
+            "orphan_files": 0,
+            "orphan_bytes": 0,
+            "recent_files_skipped": 0,
+            "referenced_files": 0,
+            "missing_files": 0,
+        }
+        missing_examples: List[str] = []
+        data_prefix = data_dir.rstrip(os.sep) + os.sep
+
+        def compare(bucket_refs: Set[str], found: Iterator[Tuple[str, int, int]]) -> Iterator[Dict[str, Any]]:
+            totals["referenced_files"] += len(bucket_refs)
+            for path, size, mtime_ms in found:
+                totals["files_scanned"] += 1
+                totals["bytes_scanned"] += size
+                if path in bucket_refs:
+                    bucket_refs.discard(path)
+                    continue
+                if older_than_ms is not None and mtime_ms >= older_than_ms:
+                    totals["recent_files_skipped"] += 1
+                    continue
+                totals["orphan_files"] += 1
+                totals["orphan_bytes"] += size
+                yield {"type": "orphan", "file_path": path, "file_size_in_bytes": size, "modified_ms": mtime_ms}
+            # 剩下的是被引用但 data 目录中不存在的文件（不在 data 目录下的引用不计入）
+            for path in bucket_refs:
+                if path.startswith(data_prefix):
+                    totals["missing_files"] += 1
+                    if len(missing_examples) < _MISSING_EXAMPLES:
+                        missing_examples.append(path)
+
+        if spool is None:
+            yield from compare(referenced, _walk_files(data_dir))
+        else:
+            for path, size, mtime_ms in _walk_files(data_dir):
+                spool.add_found(path, size, mtime_ms)
+            spool.finish_writing()
+            for bucket_refs, found in spool.iter_buckets():
+                yield from compare(bucket_refs, found)
+    finally:
+        if spool is not None:
+            spool.close()
+
+    yield {
+        "type": "result",
+        "metadata_path": metadata_path,
+        "data_dir": data_dir,
+        "snapshots": len(snapshots),
+        "manifests_total": len(manifests),
+        "manifests_read": len(manifests) - sum(1 for f in failed if "manifest_path" in f),
+        "failed": failed,
+        # 有 manifest 读取失败时引用集合不完整，孤儿文件列表不可信
+        "complete": not failed,
+        "buckets": buckets,
+        **totals,
+        "missing_examples": missing_examples,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 3),
+    }
+
+
+def find_orphan_files(table_root: str, older_than_ms: Optional[int] = None, limit: int = 1000,
+                      max_workers: Optional[int] = None) -> Dict[str, Any]:
+    """非流式版本：返回 {"success", "error", ...汇总, "orphans": 前 limit 个孤儿文件}"""
+    orphans: List[Dict[str, Any]] = []
+    for event in iter_orphan_files(table_root, older_than_ms, max_workers):
+        if event["type"] == "error":
+            return {"success": False, "error": event["error"]}
+        if event["type"] == "orphan":
+            if len(orphans) < limit:
+                orphans.append({k: v for k, v in event.items() if k != "type"})
+        elif event["type"] == "result":
+            result = {k: v for k, v in event.items() if k != "type"}
+            return {"success": True, "error": None, **result, "orphans": orphans,
+                    "orphans_truncated": result["orphan_files"] > len(orphans)}
+    return {"success": False, "error": "未得到检测结果"}
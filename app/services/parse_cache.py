@@ -0,0 +1,181 @@
+"""解析结果缓存
+
+Iceberg 的元数据文件一旦写入就不会再修改，因此可以按
+(解析类型, 真实路径, 文件大小, mtime) 缓存解析结果，重复打开同一个文件时直接命中。
+远程文件（s3:// 等）的大小与修改时间来自 HEAD / 列目录结果（见 app.services.filesystem）。
+
+- 按解码后对象的内存占用估算缓存占用（大列表抽样估算），总量超过预算时按 LRU 淘汰；
+  解码后的 Avro / JSON 通常是文件大小的几十倍，不能用文件大小代替
+- 同一路径的文件发生变化（size/mtime 不同）时旧条目会被替换
+- 缓存返回的是共享对象，调用方只能读取，不要原地修改
+"""
+from __future__ import annotations
+
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+from app.config import PARSE_CACHE_MAX_BYTES
+from app.services.filesystem import file_identity
+
+CacheKey = Tuple[str, str, int, int]
+
+# 估算列表占用时最多抽样的元素数
+_SIZE_SAMPLE = 16
+
+
+def estimate_size(obj: Any) -> int:
+    """
+    估算解码结果占用的内存字节数
+
+    元素多于 _SIZE_SAMPLE 的列表按等间隔抽样的平均大小乘以元素个数；
+    dict 的 key 大多是各条记录共享的字段名，不重复计入
+    """
+    if isinstance(obj, dict):
+        return sys.getsizeof(obj) + sum(estimate_size(v) for v in obj.values())
+    if isinstance(obj, (list, tuple)):
+        n = len(obj)
+        if n <= _SIZE_SAMPLE:
+            return sys.getsizeof(obj) + sum(estimate_size(v) for v in obj)
+        sample = obj[::n // _SIZE_SAMPLE][:_SIZE_SAMPLE]
+        return sys.getsizeof(obj) + sum(estimate_size(v) for v in sample) * n // len(sample)
+    return sys.getsizeof(obj)
+
+
+class ParseCache:
+    """按字节预算做 LRU 淘汰的线程安全缓存"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max(0, int(max_bytes))
+        self._entries: "OrderedDict[CacheKey, Tuple[Any, int]]" = OrderedDict()
+        self._keys_by_path: Dict[Tuple[str, str], CacheKey] = {}
+        self._current_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # 按基础解析类型（kind 中第一个冒号之前的部分）统计的 [命中, 未命中]；
+        # 完整的 kind 可能带分页、列名等参数，直接用作 key 会随请求无限增长
+        self.kind_counts: Dict[str, list] = {}
+
+    @staticmethod
+    def make_key(kind: str, file_path: str) -> Optional[CacheKey]:
+        """根据文件当前的 stat 生成缓存 key；文件不存在时返回 None"""
+        identity = file_identity(file_path or "")
+        if identity is None:
+            return None
+        return (kind, *identity)
+
+    def get(self, key: CacheKey) -> Tuple[bool, Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            base_kind = key[0].split(":", 1)[0]
+            counts = self.kind_counts.get(base_kind)
+            if counts is None:
+                counts = self.kind_counts[base_kind] = [0, 0]
+            if entry is None:
+                self.misses += 1
+                counts[1] += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            counts[0] += 1
+            return True, entry[0]
+
+    def put(self, key: CacheKey, value: Any, cost: int) -> None:
+        cost = max(1, int(cost))
+        if cost > self.max_bytes:
+            return
+        with self._lock:
+            path_key = (key[0], key[1])
+            stale = self._keys_by_path.get(path_key)
+            if stale is not None and stale != key:
+                self._drop(stale)
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (value, cost)
+            self._keys_by_path[path_key] = key
+            self._current_bytes += cost
+            while self._current_bytes > self.max_bytes and self._entries:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self.evictions += 1
+
+    def _drop(self, key: CacheKey) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self._current_bytes -= entry[1]
+        path_key = (key[0], key[1])
+        if self._keys_by_path.get(path_key) == key:
+            del self._keys_by_path[path_key]
+
+    def get_or_load(self, kind: str, file_path: str, loader: Callable[[], Any],
+                    cacheable: Callable[[Any], bool] = lambda _: True,
+                    cost: Optional[Callable[[Any], int]] = None) -> Any:
+        """
+        命中则返回缓存结果，否则调用 loader 解析并写入缓存
+
+        Args:
+            kind: 解析类型（不同解析方式的结果互不覆盖）
+            file_path: 文件路径（可带 file: 前缀）
+            loader: 无参的解析函数
+            cacheable: 判断解析结果是否可以缓存（例如解析失败的结果不缓存）
+            cost: 估算结果占用的字节数，默认用 estimate_size 估算解码后的大小
+        """
+        key = self.make_key(kind, file_path)
+        if key is None or self.max_bytes <= 0:
+            return loader()
+        found, value = self.get(key)
+        if found:
+            return value
+        value = loader()
+        if cacheable(value):
+            self.put(key, value, (cost or estimate_size)(value))
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_path.clear()
+            self._current_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "current_bytes": self._current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": (self.hits / total) if total else 0.0,
+                "kinds": {kind: {"hits": h, "misses": m} for kind, (h, m) in sorted(self.kind_counts.items())},
+            }
+
+
+PARSE_CACHE = ParseCache(PARSE_CACHE_MAX_BYTES)
+
+
+def _avro_cacheable(result: Any) -> bool:
+    return isinstance(result, dict) and bool(result.get("success"))
+
+
+def cached_parse_avro_file(file_path: str, fields: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+    """带缓存的 parse_avro_file，返回结构与 parse_avro_file 一致；投影读取按字段集合单独缓存"""
+    from app.services.iceberg_parser import parse_avro_file
+
+    kind = "avro:" + ",".join(sorted(fields)) if fields else "avro"
+    return PARSE_CACHE.get_or_load(
+        kind, file_path, lambda: parse_avro_file(file_path, fields), cacheable=_avro_cacheable
+    )
+
+
+def cached_parse_json_file(file_path: str) -> dict | list:
+    """带缓存的 parse_json_file，解析异常原样抛出（不会写入缓存）"""
+    from app.services.json_utils import parse_json_file
+
+    return PARSE_CACHE.get_or_load("json", file_path, lambda: parse_json_file(file_path))
+
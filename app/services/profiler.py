@@ -0,0 +1,301 @@
+"""按请求的采样 profiler
+
+请求带上 profile=1（或请求头 X-Profile: 1）且 PROFILING_ENABLED=1 时，由 app.api.middleware.ProfilingMiddleware
+为该请求创建一个 ProfileSession：
+
+- 阻塞任务执行器执行该请求提交的任务时，把工作线程登记到 session（见 executor.BlockingExecutor.run）
+- 服务内部的并发解析线程池通过 bind() 提交任务，同样登记到当前线程所属的 session
+- 采样线程按 PROFILE_SAMPLE_INTERVAL_MS 读取已登记线程的调用栈（sys._current_frames），按完整调用栈计数
+
+只采样属于该请求的线程，同时进行的其他请求不会混入；事件循环线程、进程池中的任务不采样。
+结果保存为 PROFILE_DIR/<id>.json（调用栈计数 + 热点函数汇总），可以导出为 collapsed stacks
+（flamegraph.pl / speedscope 均可直接打开）或 speedscope JSON。
+"""
+from __future__ import annotations
+
+import contextvars
+import functools
+import json
+import os
+import re
+import secrets
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.config import PROFILE_DIR, PROFILE_MAX_FILES, PROFILE_SAMPLE_INTERVAL_MS
+
+# (函数名, 文件, 函数起始行)
+Frame = Tuple[str, str, int]
+
+_PROFILE_ID_RE = re.compile(r"^[0-9A-Za-z_-]+$")
+
+# 当前请求的 session（由中间件设置，在请求的 async 调用链中可见）
+CURRENT_PROFILE: contextvars.ContextVar[Optional["ProfileSession"]] = contextvars.ContextVar(
+    "current_profile", default=None
+)
+# 正在为某个 session 执行任务的线程
+_THREAD_SESSION = threading.local()
+
+
+class ProfileSession:
+    """一次请求的采样数据"""
+
+    def __init__(self, name: str, interval_ms: float = PROFILE_SAMPLE_INTERVAL_MS):
+        self.name = name
+        self.interval = max(0.0005, interval_ms / 1000)
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._threads: Dict[int, int] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+        self.started = 0.0
+        self.elapsed = 0.0
+
+    def start(self) -> None:
+        self.started = time.perf_counter()
+        self._sampler = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+        self._sampler.start()
+
+    def stop(self) -> None:
+        if self._sampler is None:
+            return
+        self._stop.set()
+        self._sampler.join()
+        self._sampler = None
+        self.elapsed = time.perf_counter() - self.started
+
+    def _enter_thread(self) -> None:
+        tid = threading.get_ident()
+        with self._lock:
+            self._threads[tid] = self._threads.get(tid, 0) + 1
+
+    def _exit_thread(self) -> None:
+        tid = threading.get_ident()
+        with self._lock:
+            count = self._threads.get(tid, 0) - 1
+            if count <= 0:
+                self._threads.pop(tid, None)
+            else:
+                self._threads[tid] = count
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            with self._lock:
+                threads = list(self._threads)
+            if not threads:
+                continue
+            frames = sys._current_frames()
+            for tid in threads:
+                frame = frames.get(tid)
+                if frame is not None:
+                    stack = _stack_of(frame)
+                    if stack:
+                        self.stacks[stack] += 1
+                        self.samples += 1
+
+
+def _stack_of(frame: Any) -> Tuple[Frame, ...]:
+    """从叶子帧向上取调用栈（根在前），在 _call_in_session 处截断，不包含线程池本身的帧"""
+    stack: List[Frame] = []
+    while frame is not None:
+        code = frame.f_code
+        if code is _call_in_session.__code__:
+            break
+        stack.append((code.co_name, code.co_filename, code.co_firstlineno))
+        frame = frame.f_back
+    stack.reverse()
+    return tuple(stack)
+
+
+def _call_in_session(session: ProfileSession, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    previous = getattr(_THREAD_SESSION, "session", None)
+    _THREAD_SESSION.session = session
+    session._enter_thread()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        session._exit_thread()
+        _THREAD_SESSION.session = previous
+
+
+def in_session(session: Optional[ProfileSession], func: Callable[..., Any]) -> Callable[..., Any]:
+    """返回在 session 中执行 func 的包装函数（session 为 None 时原样返回）"""
+    if session is None:
+        return func
+    return functools.partial(_call_in_session, session, func)
+
+
+def bind(func: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    提交到线程池之前调用：当前线程正在为某个 session 工作时，让工作线程也登记到该 session
+
+    不能用于进程池（返回的包装函数不可 pickle）。
+    """
+    return in_session(getattr(_THREAD_SESSION, "session", None), func)
+
+
+# ---------------------------------------------------------------------------
+# 输出格式
+# ---------------------------------------------------------------------------
+
+def _frame_label(frame: Frame) -> str:
+    name, filename, line = frame
+    return f"{name} ({_short_path(filename)}:{line})"
+
+
+def _short_path(filename: str) -> str:
+    # 项目内的文件显示相对路径，第三方库从 site-packages 之后开始显示
+    root = str(Path(__file__).resolve().parents[2]) + os.sep
+    if filename.startswith(root):
+        return filename[len(root):]
+    marker = "site-packages" + os.sep
+    pos = filename.find(marker)
+    if pos >= 0:
+        return filename[pos + len(marker):]
+    return filename
+
+
+def top_frames(stacks: Dict[Tuple[Frame, ...], int], limit: int = 20) -> Dict[str, List[Dict[str, Any]]]:
+    """热点函数：self 为位于栈顶（正在执行）的采样数，total 为出现在调用栈中的采样数"""
+    total_samples = sum(stacks.values()) or 1
+    self_counts: Counter = Counter()
+    total_counts: Counter = Counter()
+    for stack, count in stacks.items():
+        self_counts[stack[-1]] += count
+        for frame in set(stack):
+            total_counts[frame] += count
+
+    def rows(counter: Counter) -> List[Dict[str, Any]]:
+        return [
+            {
+                "function": frame[0],
+                "file": _short_path(frame[1]),
+                "line": frame[2],
+                "self_samples": self_counts.get(frame, 0),
+                "total_samples": total_counts.get(frame, 0),
+                "self_pct": round(self_counts.get(frame, 0) * 100 / total_samples, 2),
+                "total_pct": round(total_counts.get(frame, 0) * 100 / total_samples, 2),
+            }
+            for frame, _ in counter.most_common(limit)
+        ]
+
+    return {"by_self": rows(self_counts), "by_total": rows(total_counts)}
+
+
+def to_collapsed(stacks: Dict[Tuple[Frame, ...], int]) -> str:
+    """collapsed stacks 格式：每行 "根;...;叶 采样数" """
+    lines = [
+        ";".join(_frame_label(f).replace(";", ",") for f in stack) + f" {count}"
+        for stack, count in sorted(stacks.items(), key=lambda item: -item[1])
+    ]
+    return "\n".join(lines) + ("\n" if lines else "")
+
+
+def to_speedscope(stacks: Dict[Tuple[Frame, ...], int], name: str, interval_ms: float) -> Dict[str, Any]:
+    """speedscope 的 sampled profile 格式（相同调用栈合并，weight 为采样数 × 采样间隔）"""
+    frame_index: Dict[Frame, int] = {}
+    frames: List[Dict[str, Any]] = []
+    samples: List[List[int]] = []
+    weights: List[float] = []
+    for stack, count in stacks.items():
+        indices = []
+        for frame in stack:
+            idx = frame_index.get(frame)
+            if idx is None:
+                idx = frame_index[frame] = len(frames)
+                frames.append({"name": frame[0], "file": _short_path(frame[1]), "line": frame[2]})
+            indices.append(idx)
+        samples.append(indices)
+        weights.append(count * interval_ms)
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "shared": {"frames": frames},
+        "profiles": [{
+            "type": "sampled",
+            "name": name,
+            "unit": "milliseconds",
+            "startValue": 0,
+            "endValue": sum(weights),
+            "samples": samples,
+            "weights": weights,
+        }],
+        "name": name,
+        "exporter": "iceberg_helper",
+    }
+
+
+# ---------------------------------------------------------------------------
+# 存储
+# ---------------------------------------------------------------------------
+
+def save_profile(session: ProfileSession, meta: Dict[str, Any]) -> Dict[str, Any]:
+    """保存采样结果，返回摘要（id、采样数、热点函数）；超出 PROFILE_MAX_FILES 时删除最旧的文件"""
+    profile_id = time.strftime("%Y%m%d-%H%M%S") + "-" + secrets.token_hex(3)
+    interval_ms = session.interval * 1000
+    summary = {
+        "id": profile_id,
+        "name": session.name,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "elapsed_ms": round(session.elapsed * 1000, 3),
+        "interval_ms": interval_ms,
+        "samples": session.samples,
+        **meta,
+        "top_frames": top_frames(session.stacks),
+    }
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    payload = {
+        "summary": summary,
+        "stacks": [[[list(f) for f in stack], count] for stack, count in session.stacks.items()],
+    }
+    path = os.path.join(PROFILE_DIR, f"{profile_id}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False)
+    _rotate_profiles()
+    return summary
+
+
+def _profile_files() -> List[str]:
+    try:
+        names = [n for n in os.listdir(PROFILE_DIR) if n.endswith(".json")]
+    except FileNotFoundError:
+        return []
+    return sorted(names, reverse=True)
+
+
+def _rotate_profiles() -> None:
+    for name in _profile_files()[max(1, PROFILE_MAX_FILES):]:
+        try:
+            os.remove(os.path.join(PROFILE_DIR, name))
+        except OSError:
+            pass
+
+
+def list_profiles(limit: int = 50) -> List[Dict[str, Any]]:
+    """最近保存的 profile 摘要（不含热点函数明细），按时间倒序"""
+    items = []
+    for name in _profile_files()[:limit]:
+        try:
+            with open(os.path.join(PROFILE_DIR, name), "r", encoding="utf-8") as f:
+                summary = json.load(f)["summary"]
+        except (OSError, ValueError, KeyError):
+            continue
+        items.append({k: v for k, v in summary.items() if k != "top_frames"})
+    return items
+
+
+def load_profile(profile_id: str) -> Tuple[Dict[str, Any], Dict[Tuple[Frame, ...], int]]:
+    """读取保存的 profile，返回 (摘要, 调用栈计数)"""
+    if not _PROFILE_ID_RE.match(profile_id or ""):
+        raise ValueError(f"无效的 profile id: {profile_id}")
+    path = os.path.join(PROFILE_DIR, f"{profile_id}.json")
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"profile 不存在: {profile_id}")
+    with open(path, "r", encoding="utf-8") as f:
+        payload = json.load(f)
+    stacks = {tuple(tuple(frame) for frame in stack): count for stack, count in payload["stacks"]}
+    return payload["summary"], stacks
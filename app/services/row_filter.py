@@ -0,0 +1,585 @@
+"""数据文件预览的行过滤表达式
+
+支持的语法（关键字不区分大小写）::
+
+    id = 5 AND ts > '2024-01-01T00:00:00'
+    (name != 'a' OR amount >= 12.5) AND dt IN ('2024-01-01', '2024-01-02')
+    NOT (id < 10) AND name IS NOT NULL
+
+- 比较: = (==)、!= (<>)、<、<=、>、>=；右侧为字面量
+- IN / NOT IN、IS NULL / IS NOT NULL、AND / OR / NOT、括号
+- 字面量: 整数、小数、'字符串'（'' 转义单引号）、true / false
+- 列名可以用 "..." 或 `...` 引起来
+
+解析后按数据文件的 Arrow schema 把字面量转换成列类型（字符串可以写日期、时间戳、decimal；
+带时区的时间戳列中不带偏移的时间按 UTC 处理），NOT 在解析时下推到比较上。
+表达式有两种用途：
+
+- may_match(stats): 按 row group / stripe 的 min / max / null 数判断是否可能有匹配行，不可能时跳过
+- to_expression(): 转换成 pyarrow.compute 表达式，在读取的 batch 上过滤
+
+比较中的 null 与 SQL 一致：任何与 null 的比较都不匹配。
+"""
+from __future__ import annotations
+
+import re
+import time
+from abc import ABC, abstractmethod
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from app.services.filesystem import input_source, open_input
+from app.services.iceberg_parser import _check_columns, _parquet_chunk_bytes
+from app.services.metrics import record_bytes, record_records, stage
+
+# 比较运算符的取反（NOT 下推）
+_NEGATE_OP = {"=": "!=", "!=": "=", "<": ">=", "<=": ">", ">": "<=", ">=": "<"}
+
+_TOKEN_RE = re.compile(r"""
+    \s*(?:
+        (?P<number>-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?)
+      | (?P<string>'(?:[^']|'')*')
+      | (?P<quoted>"[^"]+"|`[^`]+`)
+      | (?P<op><=|>=|!=|<>|==|=|<|>)
+      | (?P<punct>[(),])
+      | (?P<word>[A-Za-z_][\w.]*)
+    )""", re.VERBOSE)
+
+_KEYWORDS = {"AND", "OR", "NOT", "IN", "IS", "NULL", "TRUE", "FALSE"}
+
+# 行统计：(min, max, null 数, 行数)，未知的部分为 None
+ColumnStats = Tuple[Any, Any, Optional[int], Optional[int]]
+
+
+class Predicate(ABC):
+    """过滤表达式节点"""
+
+    @abstractmethod
+    def columns(self) -> List[str]:
+        """表达式引用的列"""
+
+    @abstractmethod
+    def negate(self) -> "Predicate":
+        """NOT 下推后的等价表达式"""
+
+    @abstractmethod
+    def bind(self, schema: Any) -> "Predicate":
+        """把字面量转换成 schema 中对应列的类型"""
+
+    @abstractmethod
+    def may_match(self, stats: Dict[str, ColumnStats]) -> bool:
+        """按 row group / stripe 统计判断是否可能有匹配行"""
+
+    @abstractmethod
+    def to_expression(self) -> Any:
+        """转换成 pyarrow.compute 表达式"""
+
+
+def _coerce(column: str, value: Any, schema: Any) -> Any:
+    """把字面量转换成列类型的 Arrow scalar"""
+    import pyarrow as pa  # type: ignore
+
+    field = schema.field(column)
+    target = field.type
+    try:
+        if pa.types.is_decimal(target) and not isinstance(value, str):
+            return pa.scalar(Decimal(str(value))).cast(target)
+        if pa.types.is_timestamp(target) and target.tz and isinstance(value, str):
+            try:
+                return pa.scalar(value).cast(target)
+            except pa.ArrowInvalid:
+                # 没有时区偏移：按 UTC 解释
+                return pa.scalar(value).cast(pa.timestamp(target.unit)).cast(target)
+        return pa.scalar(value).cast(target)
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError, ValueError) as e:
+        raise ValueError(f"过滤条件中的值 {value!r} 无法转换为列 {column} 的类型 {target}: {e}")
+
+
+def _ordered(a: Any, b: Any, op: str) -> bool:
+    if op == "<":
+        return a < b
+    if op == "<=":
+        return a <= b
+    if op == ">":
+        return a > b
+    return a >= b
+
+
+class Comparison(Predicate):
+    def __init__(self, column: str, op: str, value: Any):
+        self.column = column
+        self.op = op
+        self.value = value
+        self.scalar: Any = None
+
+    def columns(self) -> List[str]:
+        return [self.column]
+
+    def negate(self) -> Predicate:
+        return Comparison(self.column, _NEGATE_OP[self.op], self.value)
+
+    def bind(self, schema: Any) -> Predicate:
+        bound = Comparison(self.column, self.op, self.value)
+        bound.scalar = _coerce(self.column, self.value, schema)
+        bound.value = bound.scalar.as_py()
+        return bound
+
+    def may_match(self, stats: Dict[str, ColumnStats]) -> bool:
+        lo, hi, nulls, rows = stats.get(self.column, (None, None, None, None))
+        if nulls is not None and rows is not None and nulls >= rows:
+            return False
+        if lo is None or hi is None:
+            return True
+        v = self.value
+        try:
+            if self.op == "=":
+                return lo <= v <= hi
+            if self.op == "!=":
+                return not (lo == hi == v)
+            if self.op in ("<", "<="):
+                return _ordered(lo, v, self.op)
+            return _ordered(hi, v, self.op)
+        except TypeError:
+            return True
+
+    def to_expression(self) -> Any:
+        import pyarrow.compute as pc  # type: ignore
+
+        field = pc.field(self.column)
+        value = self.scalar
+        return {
+            "=": lambda: field == value,
+            "!=": lambda: field != value,
+            "<": lambda: field < value,
+            "<=": lambda: field <= value,
+            ">": lambda: field > value,
+            ">=": lambda: field >= value,
+        }[self.op]()
+
+
+class InList(Predicate):
+    def __init__(self, column: str, values: List[Any], negated: bool = False):
+        self.column = column
+        self.values = values
+        self.negated = negated
+        self.scalars: List[Any] = []
+
+    def columns(self) -> List[str]:
+        return [self.column]
+
+    def negate(self) -> Predicate:
+        return InList(self.column, self.values, not self.negated)
+
+    def bind(self, schema: Any) -> Predicate:
+        bound = InList(self.column, self.values, self.negated)
+        bound.scalars = [_coerce(self.column, v, schema) for v in self.values]
+        bound.values = [s.as_py() for s in bound.scalars]
+        return bound
+
+    def may_match(self, stats: Dict[str, ColumnStats]) -> bool:
+        lo, hi, nulls, rows = stats.get(self.column, (None, None, None, None))
+        if nulls is not None and rows is not None and nulls >= rows:
+            return False
+        if lo is None or hi is None:
+            return True
+        try:
+            if self.negated:
+                return not (lo == hi and lo in self.values)
+            return any(lo <= v <= hi for v in self.values)
+        except TypeError:
+            return True
+
+    def to_expression(self) -> Any:
+        import pyarrow as pa  # type: ignore
+        import pyarrow.compute as pc  # type: ignore
+
+        value_set = pa.array([s.as_py() for s in self.scalars], self.scalars[0].type)
+        expr = pc.field(self.column).isin(value_set)
+        # NOT IN 对 null 不匹配（SQL 语义），isin 对 null 返回 false，需要单独排除
+        return (~expr & pc.field(self.column).is_valid()) if self.negated else expr
+
+
+class IsNull(Predicate):
+    def __init__(self, column: str, negated: bool = False):
+        self.column = column
+        self.negated = negated
+
+    def columns(self) -> List[str]:
+        return [self.column]
+
+    def negate(self) -> Predicate:
+        return IsNull(self.column, not self.negated)
+
+    def bind(self, schema: Any) -> Predicate:
+        schema.field(self.column)
+        return self
+
+    def may_match(self, stats: Dict[str, ColumnStats]) -> bool:
+        _, _, nulls, rows = stats.get(self.column, (None, None, None, None))
+        if nulls is None:
+            return True
+        if self.negated:
+            return rows is None or nulls < rows
+        return nulls > 0
+
+    def to_expression(self) -> Any:
+        import pyarrow.compute as pc  # type: ignore
+
+        field = pc.field(self.column)
+        return field.is_valid() if self.negated else field.is_null()
+
+
+class And(Predicate):
+    def __init__(self, children: List[Predicate]):
+        self.children = children
+
+    def columns(self) -> List[str]:
+        return [c for child in self.children for c in child.columns()]
+
+    def negate(self) -> Predicate:
+        return Or([c.negate() for c in self.children])
+
+    def bind(self, schema: Any) -> Predicate:
+        return And([c.bind(schema) for c in self.children])
+
+    def may_match(self, stats: Dict[str, ColumnStats]) -> bool:
+        return all(c.may_match(stats) for c in self.children)
+
+    def to_expression(self) -> Any:
+        expr = self.children[0].to_expression()
+        for child in self.children[1:]:
+            expr = expr & child.to_expression()
+        return expr
+
+
+class Or(Predicate):
+    def __init__(self, children: List[Predicate]):
+        self.children = children
+
+    def columns(self) -> List[str]:
+        return [c for child in self.children for c in child.columns()]
+
+    def negate(self) -> Predicate:
+        return And([c.negate() for c in self.children])
+
+    def bind(self, schema: Any) -> Predicate:
+        return Or([c.bind(schema) for c in self.children])
+
+    def may_match(self, stats: Dict[str, ColumnStats]) -> bool:
+        return any(c.may_match(stats) for c in self.children)
+
+    def to_expression(self) -> Any:
+        expr = self.children[0].to_expression()
+        for child in self.children[1:]:
+            expr = expr | child.to_expression()
+        return expr
+
+
+class _Parser:
+    def __init__(self, text: str):
+        self.text = text
+        self.tokens: List[Tuple[str, Any]] = []
+        pos = 0
+        stripped = text.rstrip()
+        while pos < len(stripped):
+            match = _TOKEN_RE.match(stripped, pos)
+            if not match:
+                raise ValueError(f"过滤条件无法解析（位置 {pos}）: {text}")
+            kind = match.lastgroup
+            raw = match.group(kind)
+            if kind == "number":
+                value: Any = float(raw) if any(ch in raw for ch in ".eE") else int(raw)
+                self.tokens.append(("literal", value))
+            elif kind == "string":
+                self.tokens.append(("literal", raw[1:-1].replace("''", "'")))
+            elif kind == "quoted":
+                self.tokens.append(("ident", raw[1:-1]))
+            elif kind == "op":
+                self.tokens.append(("op", {"==": "=", "<>": "!="}.get(raw, raw)))
+            elif kind == "punct":
+                self.tokens.append((raw, raw))
+            elif raw.upper() in ("TRUE", "FALSE"):
+                self.tokens.append(("literal", raw.upper() == "TRUE"))
+            elif raw.upper() in _KEYWORDS:
+                self.tokens.append((raw.upper(), raw))
+            else:
+                self.tokens.append(("ident", raw))
+            pos = match.end()
+        self.pos = 0
+
+    def _peek(self) -> Optional[str]:
+        return self.tokens[self.pos][0] if self.pos < len(self.tokens) else None
+
+    def _take(self, kind: str) -> Any:
+        if self._peek() != kind:
+            found = self.tokens[self.pos][1] if self.pos < len(self.tokens) else "结尾"
+            raise ValueError(f"过滤条件无法解析: 期望 {kind}，实际为 {found!r}: {self.text}")
+        value = self.tokens[self.pos][1]
+        self.pos += 1
+        return value
+
+    def parse(self) -> Predicate:
+        if not self.tokens:
+            raise ValueError("过滤条件不能为空")
+        node = self._or()
+        if self.pos != len(self.tokens):
+            raise ValueError(f"过滤条件无法解析: 多余的 {self.tokens[self.pos][1]!r}: {self.text}")
+        return node
+
+    def _or(self) -> Predicate:
+        children = [self._and()]
+        while self._peek() == "OR":
+            self.pos += 1
+            children.append(self._and())
+        return children[0] if len(children) == 1 else Or(children)
+
+    def _and(self) -> Predicate:
+        children = [self._not()]
+        while self._peek() == "AND":
+            self.pos += 1
+            children.append(self._not())
+        return children[0] if len(children) == 1 else And(children)
+
+    def _not(self) -> Predicate:
+        if self._peek() == "NOT":
+            self.pos += 1
+            return self._not().negate()
+        return self._primary()
+
+    def _primary(self) -> Predicate:
+        if self._peek() == "(":
+            self.pos += 1
+            node = self._or()
+            self._take(")")
+            return node
+        column = self._take("ident")
+        kind = self._peek()
+        if kind == "op":
+            op = self._take("op")
+            if self._peek() == "NULL":
+                raise ValueError(f"与 null 比较请使用 IS NULL / IS NOT NULL: {self.text}")
+            return Comparison(column, op, self._take("literal"))
+        if kind == "IS":
+            self.pos += 1
+            negated = self._peek() == "NOT"
+            if negated:
+                self.pos += 1
+            self._take("NULL")
+            return IsNull(column, negated)
+        negated = kind == "NOT"
+        if negated:
+            self.pos += 1
+        self._take("IN")
+        self._take("(")
+        values = [self._take("literal")]
+        while self._peek() == ",":
+            self.pos += 1
+            values.append(self._take("literal"))
+        self._take(")")
+        return InList(column, values, negated)
+
+
+def parse_filter(text: str) -> Predicate:
+    """解析过滤表达式（未绑定类型）；语法错误时抛出 ValueError"""
+    return _Parser(text).parse()
+
+
+def bind_filter(predicate: Predicate, schema: Any) -> Predicate:
+    """检查过滤条件中的列并把字面量转换成列类型"""
+    _check_columns(list(schema.names), predicate.columns())
+    return predicate.bind(schema)
+
+
+def parquet_row_group_stats(md: Any, index: int, columns: Sequence[str]) -> Dict[str, ColumnStats]:
+    """Parquet row group 中指定列的 (min, max, null 数, 行数)"""
+    rg = md.row_group(index)
+    wanted = set(columns)
+    stats: Dict[str, ColumnStats] = {}
+    for j in range(rg.num_columns):
+        col = rg.column(j)
+        name = col.path_in_schema
+        if name not in wanted:
+            continue
+        s = col.statistics
+        if s is None:
+            continue
+        lo, hi = (s.min, s.max) if s.has_min_max else (None, None)
+        stats[name] = (lo, hi, s.null_count if s.has_null_count else None, rg.num_rows)
+    return stats
+
+
+def _orc_stripe_stats(file_path: str, columns: Sequence[str]) -> Optional[List[Dict[str, ColumnStats]]]:
+    """通过 pyorc 读取各 stripe 中指定列的统计；pyorc 不可用时返回 None"""
+    try:
+        import pyorc  # type: ignore
+    except Exception:
+        return None
+    with open_input(file_path) as f:
+        reader = pyorc.Reader(f)
+        column_ids = {str(name): td.column_id for name, td in reader.schema.fields.items()}
+        result: List[Dict[str, ColumnStats]] = []
+        for i in range(reader.num_of_stripes):
+            stripe = reader.read_stripe(i)
+            rows = len(stripe)
+            stats: Dict[str, ColumnStats] = {}
+            for name in columns:
+                if name not in column_ids:
+                    continue
+                s = stripe[column_ids[name]].statistics
+                # 时间戳的 minimum / maximum 精确到毫秒，lower_bound / upper_bound 才是准确的边界
+                lo = s.get("lower_bound", s.get("minimum"))
+                hi = s.get("upper_bound", s.get("maximum"))
+                values = s.get("number_of_values")
+                nulls = rows - values if values is not None else None
+                stats[name] = (lo, hi, nulls, rows)
+            result.append(stats)
+    return result
+
+
+def _collect(table: Any, expression: Any, fields: List[str], rows: List[Dict[str, Any]],
+             skip: int, limit: int, kind: str) -> Tuple[int, int]:
+    """过滤一个 batch，把 offset 之后的匹配行追加到 rows；返回 (剩余 skip, 匹配行数)"""
+    matched = table.filter(expression)
+    count = matched.num_rows
+    if skip >= count:
+        return skip - count, count
+    matched = matched.slice(skip, limit - len(rows))
+    with stage(f"{kind}_to_pylist"):
+        rows.extend(matched.select(fields).to_pylist())
+    return 0, count
+
+
+def filter_parquet_rows(file_path: str, row_filter: str, limit: int = 100, offset: int = 0,
+                        columns: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+    """
+    读取 Parquet 中满足过滤条件的行
+
+    - 按 row group 的列统计跳过不可能匹配的 row group
+    - 只读取返回列与过滤列，在每个 batch 上用 Arrow 表达式过滤
+    - 凑够 offset + limit 个匹配行后停止
+
+    Returns:
+        dict: rows、fields、filter（row group 的跳过 / 读取数与扫描、匹配的行数）
+    """
+    import pyarrow as pa  # type: ignore
+    import pyarrow.parquet as pq  # type: ignore
+
+    started = time.perf_counter()
+    predicate = parse_filter(row_filter)
+    with input_source(file_path) as source:
+        with stage("parquet_footer"):
+            pf = pq.ParquetFile(source)
+            schema = pf.schema_arrow
+            columns = _check_columns(schema.names, columns)
+            fields = columns or list(schema.names)
+            md = pf.metadata
+        record_bytes("parquet", md.serialized_size)
+        predicate = bind_filter(predicate, schema)
+        expression = predicate.to_expression()
+        filter_columns = list(dict.fromkeys(predicate.columns()))
+        read_columns = fields + [c for c in filter_columns if c not in fields]
+
+        candidates = [
+            i for i in range(md.num_row_groups)
+            if predicate.may_match(parquet_row_group_stats(md, i, filter_columns))
+        ]
+        rows: List[Dict[str, Any]] = []
+        skip = max(0, offset)
+        scanned = 0
+        matched = 0
+        read: List[int] = []
+        batch_size = max(1, min(limit + skip, 65536))
+        for i in candidates:
+            if len(rows) >= limit:
+                break
+            read.append(i)
+            batches = pf.iter_batches(batch_size=batch_size, row_groups=[i], columns=read_columns)
+            while len(rows) < limit:
+                with stage("parquet_read"):
+                    batch = next(batches, None)
+                if batch is None:
+                    break
+                scanned += batch.num_rows
+                skip, count = _collect(pa.Table.from_batches([batch]), expression, fields, rows, skip, limit, "parquet")
+                matched += count
+        record_bytes("parquet", _parquet_chunk_bytes(md, read, scanned, read_columns))
+        record_records("parquet", scanned)
+
+    return {
+        "rows": rows,
+        "fields": fields,
+        "filter": {
+            "expression": row_filter,
+            "row_groups_total": md.num_row_groups,
+            "row_groups_skipped": md.num_row_groups - len(candidates),
+            "row_groups_read": len(read),
+            "rows_scanned": scanned,
+            "rows_matched": matched,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 3),
+        },
+    }
+
+
+def filter_orc_rows(file_path: str, row_filter: str, limit: int = 100, offset: int = 0,
+                    columns: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+    """
+    读取 ORC 中满足过滤条件的行（需要 pyarrow）
+
+    安装了 pyorc 时按 stripe 的列统计跳过不可能匹配的 stripe，否则逐个 stripe 读取并过滤。
+
+    Returns:
+        dict: rows、fields、filter（stripe 的跳过 / 读取数与扫描、匹配的行数）
+    """
+    import pyarrow as pa  # type: ignore
+
+    try:
+        import pyarrow.orc as o  # type: ignore
+    except Exception as e:
+        raise RuntimeError("ORC 过滤预览需要 pyarrow 的 ORC 支持: pip install pyarrow") from e
+
+    started = time.perf_counter()
+    predicate = parse_filter(row_filter)
+    with stage("orc_read"), input_source(file_path) as source:
+        of = o.ORCFile(source)
+        schema = of.schema
+        columns = _check_columns(schema.names, columns)
+        fields = columns or list(schema.names)
+        predicate = bind_filter(predicate, schema)
+        expression = predicate.to_expression()
+        filter_columns = list(dict.fromkeys(predicate.columns()))
+        read_columns = fields + [c for c in filter_columns if c not in fields]
+
+        stripe_stats = _orc_stripe_stats(file_path, filter_columns)
+        candidates = [
+            i for i in range(of.nstripes)
+            if stripe_stats is None or i >= len(stripe_stats) or predicate.may_match(stripe_stats[i])
+        ]
+        rows: List[Dict[str, Any]] = []
+        skip = max(0, offset)
+        scanned = 0
+        matched = 0
+        read = 0
+        for i in candidates:
+            if len(rows) >= limit:
+                break
+            read += 1
+            batch = of.read_stripe(i, columns=read_columns)
+            scanned += batch.num_rows
+            skip, count = _collect(pa.Table.from_batches([batch]), expression, fields, rows, skip, limit, "orc")
+            matched += count
+    record_records("orc", scanned)
+
+    return {
+        "rows": rows,
+        "fields": fields,
+        "filter": {
+            "expression": row_filter,
+            "stripes_total": of.nstripes,
+            "stripes_skipped": of.nstripes - len(candidates),
+            "stripes_read": read,
+            "statistics_available": stripe_stats is not None,
+            "rows_scanned": scanned,
+            "rows_matched": matched,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 3),
+        },
+    }
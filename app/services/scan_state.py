@@ -0,0 +1,305 @@
+"""metadata 目录的增量扫描状态
+
+每个 metadata 目录保留一份上次扫描的结果，再次 list-dir 时只处理新增/变化/删除的文件：
+- Linux 且安装了 inotify_simple 时，通过 inotify 事件得知哪些文件发生了变化，无需重新遍历目录
+- 否则退化为遍历目录并比较 size/mtime
+- 每次有变化时版本号递增，客户端可以用 token 获取“自某个版本以来”的增量
+"""
+from __future__ import annotations
+
+import os
+import stat
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from app.config import SCAN_MAX_WORKERS, SCAN_MODE, SCAN_STATE_MAX_DIRS, SCAN_STATE_MAX_VERSIONS
+from app.services.filesystem import is_remote
+from app.services.iceberg_parser import (
+    _classify_metadata_file,
+    _fill_snapshot_manifest_paths,
+    _get_latest_version,
+    scan_metadata_directory,
+)
+
+try:  # inotify 为可选依赖，仅 Linux 可用
+    from inotify_simple import INotify, flags as inotify_flags  # type: ignore
+except Exception:  # pragma: no cover - 依赖缺失时走 size/mtime 比较
+    INotify = None
+    inotify_flags = None
+
+CATEGORIES = ("metadata_files", "snapshots", "data_avro", "data_parquet", "other_files")
+
+
+class _DirectoryWatcher:
+    """对单个目录的 inotify 封装；返回 None 表示需要做一次完整比较（例如事件队列溢出）"""
+
+    def __init__(self, directory: str):
+        self._inotify = INotify()
+        mask = (inotify_flags.CREATE | inotify_flags.DELETE | inotify_flags.MODIFY
+                | inotify_flags.CLOSE_WRITE | inotify_flags.MOVED_FROM | inotify_flags.MOVED_TO
+                | inotify_flags.DELETE_SELF | inotify_flags.MOVE_SELF)
+        self._inotify.add_watch(directory, mask)
+
+    def changed_names(self) -> Optional[Set[str]]:
+        names: Set[str] = set()
+        for event in self._inotify.read(timeout=0):
+            if event.mask & (inotify_flags.Q_OVERFLOW | inotify_flags.DELETE_SELF
+                             | inotify_flags.MOVE_SELF | inotify_flags.IGNORED):
+                return None
+            if event.name:
+                names.add(event.name)
+        return names
+
+    def close(self) -> None:
+        try:
+            self._inotify.close()
+        except Exception:
+            pass
+
+
+class DirectoryScanState:
+    """单个 metadata 目录的扫描结果与变更记录"""
+
+    def __init__(self, metadata_dir: str, mode: str):
+        self.metadata_dir = metadata_dir
+        self.mode = mode
+        self.epoch = uuid.uuid4().hex[:8]
+        self.version = 0
+        self.watch_mode = "stat"
+        # name -> (size, mtime_ns, category, file_info)
+        self._entries: Dict[str, Tuple[int, int, str, Dict[str, Any]]] = {}
+        # (version, {name: "added" | "changed" | "removed"})
+        self._changes: List[Tuple[int, Dict[str, str]]] = []
+        self._watcher: Optional[_DirectoryWatcher] = None
+        self._lock = threading.Lock()
+        self._scanned = False
+
+    @property
+    def token(self) -> str:
+        return f"{self.epoch}-{self.version}"
+
+    def _start_watcher(self) -> None:
+        if INotify is None:
+            return
+        try:
+            self._watcher = _DirectoryWatcher(self.metadata_dir)
+            self.watch_mode = "inotify"
+        except Exception:
+            self._watcher = None
+            self.watch_mode = "stat"
+
+    def _stat_names(self, names: Iterable[str]) -> Dict[str, Tuple[int, int]]:
+        result: Dict[str, Tuple[int, int]] = {}
+        for name in names:
+            if _classify_metadata_file(name) is None:
+                continue
+            try:
+                st = os.stat(os.path.join(self.metadata_dir, name))
+            except OSError:
+                continue
+            if stat.S_ISREG(st.st_mode):
+                result[name] = (st.st_size, st.st_mtime_ns)
+        return result
+
+    def _stat_all(self) -> Dict[str, Tuple[int, int]]:
+        result: Dict[str, Tuple[int, int]] = {}
+        with os.scandir(self.metadata_dir) as it:
+            for entry in it:
+                if not entry.is_file() or _classify_metadata_file(entry.name) is None:
+                    continue
+                st = entry.stat()
+                result[entry.name] = (st.st_size, st.st_mtime_ns)
+        return result
+
+    def refresh(self) -> Dict[str, Any]:
+        """同步磁盘上的变化，返回本次刷新的统计信息"""
+        with self._lock:
+            started = time.perf_counter()
+            if not self._scanned:
+                self._start_watcher()
+                current = self._stat_all()
+                candidates: Optional[Set[str]] = None
+            else:
+                changed = self._watcher.changed_names() if self._watcher is not None else None
+                if changed is None:
+                    current = self._stat_all()
+                    candidates = None
+                else:
+                    current = self._stat_names(changed)
+                    candidates = changed
+
+            if candidates is None:
+                names_to_check = set(current) | set(self._entries)
+            else:
+                names_to_check = candidates
+
+            ops: Dict[str, str] = {}
+            new_infos: List[Tuple[str, int, int, str, Dict[str, Any]]] = []
+            for name in names_to_check:
+                fingerprint = current.get(name)
+                old = self._entries.get(name)
+                if fingerprint is None:
+                    if old is not None:
+                        ops[name] = "removed"
+                    continue
+                if old is not None and (old[0], old[1]) == fingerprint:
+                    continue
+                category = _classify_metadata_file(name)
+                file_info = {
+                    "name": name,
+                    "path": os.path.join(self.metadata_dir, name),
+                    "size": fingerprint[0],
+                }
+                new_infos.append((name, fingerprint[0], fingerprint[1], category, file_info))
+                ops[name] = "changed" if old is not None else "added"
+
+            # 只有新增/变化的 snapshot 才需要解析 manifest_paths
+            _fill_snapshot_manifest_paths(
+                [info for _, _, _, cat, info in new_infos if cat == "snapshots"],
+                self.mode,
+                SCAN_MAX_WORKERS,
+            )
+            for name, op in ops.items():
+                if op == "removed":
+                    del self._entries[name]
+            for name, size, mtime_ns, category, file_info in new_infos:
+                self._entries[name] = (size, mtime_ns, category, file_info)
+
+            if ops and self._scanned:
+                self.version += 1
+                self._changes.append((self.version, ops))
+                if len(self._changes) > SCAN_STATE_MAX_VERSIONS:
+                    del self._changes[: len(self._changes) - SCAN_STATE_MAX_VERSIONS]
+            first_scan = not self._scanned
+            self._scanned = True
+            return {
+                "first_scan": first_scan,
+                "watch_mode": self.watch_mode,
+                "checked": len(names_to_check),
+                "changed": len(ops),
+                "refresh_ms": round((time.perf_counter() - started) * 1000, 3),
+            }
+
+    def listing(self) -> Dict[str, Any]:
+        """当前完整的文件分类（与 scan_metadata_directory 的 files 结构一致）"""
+        with self._lock:
+            files: Dict[str, List[Dict[str, Any]]] = {c: [] for c in CATEGORIES}
+            for name in sorted(self._entries):
+                _, _, category, file_info = self._entries[name]
+                files[category].append(file_info)
+            return {
+                "files": files,
+                "latest_version": _get_latest_version(files["metadata_files"]),
+                "token": self.token,
+            }
+
+    def changes_since(self, token: str) -> Optional[Dict[str, Any]]:
+        """
+        计算自 token 对应版本以来的增量；token 无效或变更记录已被截断时返回 None，
+        调用方应当改为返回完整列表
+        """
+        try:
+            epoch, version_text = token.rsplit("-", 1)
+            since = int(version_text)
+        except (AttributeError, ValueError):
+            return None
+        with self._lock:
+            if epoch != self.epoch or since > self.version:
+                return None
+            if since < self.version and (not self._changes or self._changes[0][0] > since + 1):
+                return None
+
+            # 每个文件在 since 之后第一次出现的操作决定它在 since 时是否已存在
+            first_ops: Dict[str, str] = {}
+            for version, ops in self._changes:
+                if version <= since:
+                    continue
+                for name, op in ops.items():
+                    first_ops.setdefault(name, op)
+
+            added: List[Dict[str, Any]] = []
+            changed: List[Dict[str, Any]] = []
+            removed: List[str] = []
+            for name in sorted(first_ops):
+                existed_before = first_ops[name] != "added"
+                entry = self._entries.get(name)
+                if entry is not None:
+                    item = {"category": entry[2], **entry[3]}
+                    (changed if existed_before else added).append(item)
+                elif existed_before:
+                    removed.append(name)
+
+            files_meta = [e[3] for e in self._entries.values() if e[2] == "metadata_files"]
+            return {
+                "since": token,
+                "token": self.token,
+                "added": added,
+                "changed": changed,
+                "removed": removed,
+                "latest_version": _get_latest_version(sorted(files_meta, key=lambda f: f["name"])),
+            }
+
+    def close(self) -> None:
+        if self._watcher is not None:
+            self._watcher.close()
+            self._watcher = None
+
+
+_STATES: "OrderedDict[Tuple[str, str], DirectoryScanState]" = OrderedDict()
+_STATES_LOCK = threading.Lock()
+
+
+def get_scan_state(metadata_dir: str, mode: Optional[str] = None) -> DirectoryScanState:
+    """获取（或创建）目录的扫描状态；超过 SCAN_STATE_MAX_DIRS 时淘汰最久未使用的目录"""
+    key = (os.path.realpath(metadata_dir), (mode or SCAN_MODE).lower())
+    with _STATES_LOCK:
+        state = _STATES.get(key)
+        if state is None:
+            state = DirectoryScanState(metadata_dir, key[1])
+            _STATES[key] = state
+            while len(_STATES) > SCAN_STATE_MAX_DIRS:
+                _, evicted = _STATES.popitem(last=False)
+                evicted.close()
+        else:
+            _STATES.move_to_end(key)
+        return state
+
+
+def scan_metadata_directory_incremental(metadata_dir: str, mode: Optional[str] = None,
+                                        since: Optional[str] = None) -> Dict[str, Any]:
+    """
+    基于扫描状态列出 metadata 目录
+
+    - 不传 since：返回完整分类列表（结构与 scan_metadata_directory 一致）以及 token
+    - 传入 since：返回自该 token 以来的 added / changed / removed；
+      token 失效（服务重启、变更记录被截断）时退化为完整列表，并带 full=True
+    - 远程目录（s3:// 等）无法监听变化，不保留扫描状态，每次返回完整列表（token 为 None）
+    """
+    mode = (mode or SCAN_MODE).lower()
+    if mode not in {"eager", "parallel", "lazy"}:
+        return {"success": False, "error": f"不支持的扫描模式: {mode}", "files": {}}
+    if is_remote(metadata_dir):
+        result = scan_metadata_directory(metadata_dir, mode)
+        if result["success"]:
+            result.update(full=True, token=None)
+        return result
+    if not os.path.exists(metadata_dir):
+        return {"success": False, "error": f"目录不存在: {metadata_dir}", "files": {}}
+    if not os.path.isdir(metadata_dir):
+        return {"success": False, "error": f"路径不是目录: {metadata_dir}", "files": {}}
+
+    try:
+        state = get_scan_state(metadata_dir, mode)
+        refresh = state.refresh()
+        timing = {"mode": mode, **refresh}
+        if since:
+            delta = state.changes_since(since)
+            if delta is not None:
+                return {"success": True, "error": None, "full": False, **delta, "timing": timing}
+        listing = state.listing()
+        return {"success": True, "error": None, "full": True, **listing, "timing": timing}
+    except Exception as e:
+        return {"success": False, "error": f"扫描目录失败: {str(e)}", "files": {}}
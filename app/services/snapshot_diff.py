@@ -0,0 +1,228 @@
+"""两个 snapshot 之间的差异
+
+先比较两个 snapshot 的 manifest list：两边路径相同的 manifest 内容相同（manifest 写入后不会修改），
+直接跳过；只并发解析两边各自独有的 manifest，由此得到新增 / 删除的数据文件与删除文件，
+以及按分区的记录数、字节数变化。相邻 snapshot 之间的差异通常只涉及少数几个 manifest。
+"""
+from __future__ import annotations
+
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from app.config import FANOUT_MAX_WORKERS
+from app.services.iceberg_parser import (
+    extract_manifest_info,
+    extract_snapshot_manifests,
+    find_snapshot,
+    read_manifest_entries,
+)
+from app.services.profiler import bind
+from app.services.snapshot_stats import CONTENT_DATA, ENTRY_STATUS_DELETED, partition_key
+
+
+def _parent_snapshot_id(metadata_data: Dict[str, Any], snapshot_id: Any) -> Any:
+    snapshot = find_snapshot(metadata_data, snapshot_id)
+    if snapshot is None:
+        return None
+    return snapshot.get("parent-snapshot-id") or snapshot.get("parent_snapshot_id")
+
+
+def _live_files(manifest_path: str) -> Tuple[Dict[str, Dict[str, Any]], Optional[str]]:
+    """manifest 中仍然有效（非 DELETED）的文件，按 file_path 索引"""
+    entries, error = read_manifest_entries(manifest_path)
+    if error:
+        return {}, error
+    files = {}
+    for df in extract_manifest_info(entries)["data_files"]:
+        if df["status"] == ENTRY_STATUS_DELETED or not df["file_path"]:
+            continue
+        files[df["file_path"]] = df
+    return files, None
+
+
+class _PartitionDelta:
+    def __init__(self):
+        self.partitions: Dict[str, Dict[str, Any]] = {}
+
+    def add(self, df: Dict[str, Any], sign: int) -> None:
+        key = partition_key(df["partition"])
+        bucket = self.partitions.get(key)
+        if bucket is None:
+            bucket = self.partitions[key] = {
+                "partition": df["partition"],
+                "data_files": 0,
+                "delete_files": 0,
+                "records": 0,
+                "delete_records": 0,
+                "bytes": 0,
+            }
+        records = df["record_count"] or 0
+        bucket["bytes"] += sign * (df["file_size_in_bytes"] or 0)
+        if df["content"] == CONTENT_DATA:
+            bucket["data_files"] += sign
+            bucket["records"] += sign * records
+        else:
+            bucket["delete_files"] += sign
+            bucket["delete_records"] += sign * records
+
+    def items(self, max_partitions: Optional[int] = None) -> List[Dict[str, Any]]:
+        items = sorted(self.partitions.values(), key=lambda p: abs(p["bytes"]), reverse=True)
+        return items[:max_partitions] if max_partitions else items
+
+
+def _file_item(change: str, df: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "change": change,
+        "file_path": df["file_path"],
+        "content": df["content"],
+        "file_format": df["file_format"],
+        "partition": df["partition"],
+        "record_count": df["record_count"],
+        "file_size_in_bytes": df["file_size_in_bytes"],
+        "snapshot_id": df["snapshot_id"],
+    }
+
+
+def iter_snapshot_diff(metadata_data: Dict[str, Any], from_snapshot_id: Any = None,
+                       to_snapshot_id: Any = None, offset: int = 0, limit: Optional[int] = 100,
+                       max_workers: Optional[int] = None,
+                       max_partitions: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """
+    计算 from → to 的差异，逐个产出事件
+
+    to 默认为当前 snapshot，from 默认为 to 的父 snapshot。
+
+    事件类型：
+        - {"type": "start", ...}: 两边的 manifest 比较完成（共享 / 新增 / 移除的 manifest）
+        - {"type": "progress", ...}: 每解析完一个差异 manifest
+        - {"type": "file", ...}: 新增 / 删除的文件（按 change、file_path 排序后取 offset / limit 一页）
+        - {"type": "result", ...}: 汇总与分区变化
+        - {"type": "error", ...}: snapshot 不存在或 manifest list 解析失败
+    """
+    started = time.perf_counter()
+    to_resolved = extract_snapshot_manifests(metadata_data, to_snapshot_id)
+    if to_resolved["snapshot"] is None:
+        yield {"type": "error", "error": f"snapshot 不存在: {to_resolved['snapshot_id']}"}
+        return
+    if from_snapshot_id is None:
+        from_snapshot_id = _parent_snapshot_id(metadata_data, to_resolved["snapshot_id"])
+    from_resolved = None
+    if from_snapshot_id is not None:
+        from_resolved = extract_snapshot_manifests(metadata_data, from_snapshot_id)
+        if from_resolved["snapshot"] is None:
+            yield {"type": "error", "error": f"snapshot 不存在: {from_snapshot_id}"}
+            return
+    for resolved in (from_resolved, to_resolved):
+        if resolved is not None and resolved["manifest_list_error"]:
+            yield {"type": "error", "error": resolved["manifest_list_error"]}
+            return
+
+    # 没有父 snapshot 时与空表比较
+    from_manifests = {m["manifest_path"]: m for m in (from_resolved or {}).get("manifests", []) if m.get("manifest_path")}
+    to_manifests = {m["manifest_path"]: m for m in to_resolved["manifests"] if m.get("manifest_path")}
+    shared = from_manifests.keys() & to_manifests.keys()
+    removed_manifests = sorted(from_manifests.keys() - shared)
+    added_manifests = sorted(to_manifests.keys() - shared)
+    total = len(removed_manifests) + len(added_manifests)
+    yield {
+        "type": "start",
+        "from_snapshot_id": from_resolved["snapshot_id"] if from_resolved else None,
+        "to_snapshot_id": to_resolved["snapshot_id"],
+        "shared_manifests": len(shared),
+        "added_manifests": added_manifests,
+        "removed_manifests": removed_manifests,
+        "manifests_total": total,
+    }
+
+    from_files: Dict[str, Dict[str, Any]] = {}
+    to_files: Dict[str, Dict[str, Any]] = {}
+    failed: List[Dict[str, Any]] = []
+    done = 0
+    with ThreadPoolExecutor(max_workers=max_workers or FANOUT_MAX_WORKERS) as pool:
+        futures = {pool.submit(bind(_live_files), path): (path, from_files) for path in removed_manifests}
+        futures.update({pool.submit(bind(_live_files), path): (path, to_files) for path in added_manifests})
+        for future in as_completed(futures):
+            path, target = futures[future]
+            try:
+                files, error = future.result()
+            except Exception as e:
+                files, error = {}, str(e)
+            done += 1
+            if error:
+                failed.append({"manifest_path": path, "error": error})
+            else:
+                target.update(files)
+            yield {
+                "type": "progress",
+                "manifests_done": done,
+                "manifests_total": total,
+                "manifest_path": path,
+                "error": error,
+            }
+
+    # 同一个文件可能从旧 manifest 改写到新 manifest 中（例如 manifest 合并），两边都出现的不算变化
+    added = [to_files[p] for p in sorted(to_files.keys() - from_files.keys())]
+    removed = [from_files[p] for p in sorted(from_files.keys() - to_files.keys())]
+
+    delta = _PartitionDelta()
+    totals = {
+        "added_data_files": 0, "removed_data_files": 0,
+        "added_delete_files": 0, "removed_delete_files": 0,
+        "added_records": 0, "removed_records": 0,
+        "added_delete_records": 0, "removed_delete_records": 0,
+        "added_bytes": 0, "removed_bytes": 0,
+    }
+    for change, files, sign in (("added", added, 1), ("removed", removed, -1)):
+        for df in files:
+            delta.add(df, sign)
+            is_data = df["content"] == CONTENT_DATA
+            totals[f"{change}_{'data' if is_data else 'delete'}_files"] += 1
+            totals[f"{change}_{'records' if is_data else 'delete_records'}"] += df["record_count"] or 0
+            totals[f"{change}_bytes"] += df["file_size_in_bytes"] or 0
+    totals["records_delta"] = totals["added_records"] - totals["removed_records"]
+    totals["bytes_delta"] = totals["added_bytes"] - totals["removed_bytes"]
+
+    changes = len(added) + len(removed)
+    end = changes if limit is None else min(changes, offset + limit)
+    for i in range(offset, end):
+        if i < len(added):
+            yield {"type": "file", **_file_item("added", added[i])}
+        else:
+            yield {"type": "file", **_file_item("removed", removed[i - len(added)])}
+
+    yield {
+        "type": "result",
+        "from_snapshot_id": from_resolved["snapshot_id"] if from_resolved else None,
+        "to_snapshot_id": to_resolved["snapshot_id"],
+        "shared_manifests": len(shared),
+        "added_manifests": added_manifests,
+        "removed_manifests": removed_manifests,
+        "manifests_read": total - len(failed),
+        "manifests_failed": failed,
+        "complete": not failed,
+        "totals": totals,
+        "partitions": delta.items(max_partitions),
+        "files_total": changes,
+        "offset": offset,
+        "limit": limit,
+        "has_more": end < changes,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 3),
+    }
+
+
+def diff_snapshots(metadata_data: Dict[str, Any], from_snapshot_id: Any = None, to_snapshot_id: Any = None,
+                   offset: int = 0, limit: Optional[int] = 100, max_workers: Optional[int] = None,
+                   max_partitions: Optional[int] = None) -> Dict[str, Any]:
+    """非流式版本：返回 {"success", "error", ...汇总, "files": 当前页}"""
+    files: List[Dict[str, Any]] = []
+    for event in iter_snapshot_diff(metadata_data, from_snapshot_id, to_snapshot_id, offset, limit,
+                                    max_workers, max_partitions):
+        if event["type"] == "error":
+            return {"success": False, "error": event["error"]}
+        if event["type"] == "file":
+            files.append({k: v for k, v in event.items() if k != "type"})
+        elif event["type"] == "result":
+            result = {k: v for k, v in event.items() if k != "type"}
+            return {"success": True, "error": None, **result, "files": files}
+    return {"success": False, "error": "未得到差异结果"}
@@ -0,0 +1,199 @@
+"""Snapshot 级别的统计汇总
+
+读取某个 snapshot 的 manifest list，并发解析其中所有 manifest，汇总成表级统计：
+数据文件 / 删除文件数量、记录数、字节数，以及按分区的文件数与大小。
+
+解析过程以事件流的形式产出进度（附带当前的部分汇总），便于接口流式返回。
+"""
+from __future__ import annotations
+
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, Iterator, List, Optional
+
+from app.config import FANOUT_MAX_WORKERS, SMALL_FILE_BYTES
+from app.services.iceberg_parser import (
+    _normalize_partition,
+    extract_snapshot_manifests,
+    read_manifest_entries,
+)
+from app.services.profiler import bind
+
+# manifest_entry.status: 0 EXISTING / 1 ADDED / 2 DELETED
+ENTRY_STATUS_DELETED = 2
+
+# data_file.content: 0 DATA / 1 POSITION_DELETES / 2 EQUALITY_DELETES
+CONTENT_DATA = 0
+CONTENT_POSITION_DELETES = 1
+CONTENT_EQUALITY_DELETES = 2
+
+
+def partition_key(partition: Dict[str, Any]) -> str:
+    """分区值的稳定字符串表示，用作聚合 key"""
+    return json.dumps(partition, sort_keys=True, ensure_ascii=False, default=str)
+
+
+class SnapshotAggregator:
+    """累加 manifest entry 得到表级与分区级统计"""
+
+    def __init__(self, small_file_bytes: Optional[int] = None):
+        # 小于该字节数的数据文件计为小文件
+        self.small_file_bytes = SMALL_FILE_BYTES if small_file_bytes is None else small_file_bytes
+        self.totals: Dict[str, int] = {
+            "data_files": 0,
+            "small_data_files": 0,
+            "delete_files": 0,
+            "position_delete_files": 0,
+            "equality_delete_files": 0,
+            "records": 0,
+            "delete_records": 0,
+            "data_bytes": 0,
+            "delete_bytes": 0,
+            "deleted_entries": 0,
+        }
+        self.partitions: Dict[str, Dict[str, Any]] = {}
+
+    def add_entries(self, entries: List[Dict[str, Any]]) -> None:
+        totals = self.totals
+        for entry in entries:
+            if entry.get("status") == ENTRY_STATUS_DELETED:
+                totals["deleted_entries"] += 1
+                continue
+            df = entry.get("data_file")
+            if not isinstance(df, dict):
+                continue
+            content = df.get("content") or CONTENT_DATA
+            records = df.get("record_count") or 0
+            size = df.get("file_size_in_bytes") or 0
+            partition = _normalize_partition(df.get("partition") or {})
+            key = partition_key(partition)
+            bucket = self.partitions.get(key)
+            if bucket is None:
+                bucket = self.partitions[key] = {
+                    "partition": partition,
+                    "data_files": 0,
+                    "delete_files": 0,
+                    "records": 0,
+                    "delete_records": 0,
+                    "bytes": 0,
+                }
+            bucket["bytes"] += size
+            if content == CONTENT_DATA:
+                totals["data_files"] += 1
+                totals["records"] += records
+                totals["data_bytes"] += size
+                if size < self.small_file_bytes:
+                    totals["small_data_files"] += 1
+                bucket["data_files"] += 1
+                bucket["records"] += records
+            else:
+                totals["delete_files"] += 1
+                totals["delete_records"] += records
+                totals["delete_bytes"] += size
+                if content == CONTENT_POSITION_DELETES:
+                    totals["position_delete_files"] += 1
+                elif content == CONTENT_EQUALITY_DELETES:
+                    totals["equality_delete_files"] += 1
+                bucket["delete_files"] += 1
+                bucket["delete_records"] += records
+
+    def summary(self) -> Dict[str, Any]:
+        totals = dict(self.totals)
+        totals["total_bytes"] = totals["data_bytes"] + totals["delete_bytes"]
+        totals["partitions_count"] = len(self.partitions)
+        totals["small_file_ratio"] = (
+            round(totals["small_data_files"] / totals["data_files"], 4) if totals["data_files"] else 0.0
+        )
+        return totals
+
+    def partition_stats(self, max_partitions: Optional[int] = None) -> List[Dict[str, Any]]:
+        """按字节数从大到小排列的分区统计"""
+        items = sorted(self.partitions.values(), key=lambda p: p["bytes"], reverse=True)
+        return items[:max_partitions] if max_partitions else items
+
+
+def iter_snapshot_stats(metadata_data: Dict[str, Any], snapshot_id: Any = None,
+                        max_workers: Optional[int] = None,
+                        max_partitions: Optional[int] = None,
+                        small_file_bytes: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """
+    并发解析 snapshot 的所有 manifest，逐个产出进度事件，最后产出汇总结果
+
+    small_file_bytes 为小文件阈值（默认 SMALL_FILE_BYTES），用于统计 small_data_files / small_file_ratio。
+
+    事件类型：
+        - {"type": "start", ...}: manifest list 解析完成
+        - {"type": "progress", ...}: 每完成一个 manifest，附带部分汇总
+        - {"type": "result", ...}: 最终结果；部分 manifest 解析失败时 complete=False
+        - {"type": "error", ...}: 无法开始（snapshot 不存在、manifest list 解析失败）
+    """
+    started = time.perf_counter()
+    resolved = extract_snapshot_manifests(metadata_data, snapshot_id)
+    if resolved["snapshot"] is None:
+        yield {"type": "error", "error": f"snapshot 不存在: {resolved['snapshot_id']}"}
+        return
+    if resolved["manifest_list_error"]:
+        yield {"type": "error", "error": resolved["manifest_list_error"]}
+        return
+
+    manifests = [m for m in resolved["manifests"] if m.get("manifest_path")]
+    total = len(manifests)
+    yield {
+        "type": "start",
+        "snapshot_id": resolved["snapshot_id"],
+        "manifest_list": resolved["manifest_list"],
+        "manifests_total": total,
+    }
+
+    aggregator = SnapshotAggregator(small_file_bytes)
+    failed: List[Dict[str, Any]] = []
+    done = 0
+    with ThreadPoolExecutor(max_workers=max_workers or FANOUT_MAX_WORKERS) as pool:
+        futures = {pool.submit(bind(read_manifest_entries), m["manifest_path"]): m for m in manifests}
+        for future in as_completed(futures):
+            manifest = futures[future]
+            try:
+                entries, error = future.result()
+            except Exception as e:
+                entries, error = [], str(e)
+            done += 1
+            if error:
+                failed.append({"manifest_path": manifest["manifest_path"], "error": error})
+            else:
+                aggregator.add_entries(entries)
+            yield {
+                "type": "progress",
+                "manifests_done": done,
+                "manifests_total": total,
+                "manifest_path": manifest["manifest_path"],
+                "error": error,
+                "partial": aggregator.summary(),
+            }
+
+    yield {
+        "type": "result",
+        "snapshot_id": resolved["snapshot_id"],
+        "manifest_list": resolved["manifest_list"],
+        "manifests_total": total,
+        "manifests_read": total - len(failed),
+        "manifests_failed": failed,
+        "complete": not failed,
+        "totals": aggregator.summary(),
+        "partitions": aggregator.partition_stats(max_partitions),
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 3),
+    }
+
+
+def aggregate_snapshot_stats(metadata_data: Dict[str, Any], snapshot_id: Any = None,
+                             max_workers: Optional[int] = None,
+                             max_partitions: Optional[int] = None,
+                             small_file_bytes: Optional[int] = None) -> Dict[str, Any]:
+    """非流式版本：返回 {"success", "error", ...最终结果}"""
+    for event in iter_snapshot_stats(metadata_data, snapshot_id, max_workers, max_partitions, small_file_bytes):
+        if event["type"] == "error":
+            return {"success": False, "error": event["error"]}
+        if event["type"] == "result":
+            result = {k: v for k, v in event.items() if k != "type"}
+            return {"success": True, "error": None, **result}
+    return {"success": False, "error": "未得到汇总结果"}
@@ -0,0 +1,113 @@
+"""表健康报告
+
+对单个表根目录生成一份可机读的报告（供 app.cli 批量调用，不依赖 Web 服务）：
+
+- metadata 目录：文件数量与总大小（scan_metadata_directory，lazy 模式，不解析 snap-*.avro）
+- 最新 metadata.json：表 uuid、格式版本、当前 snapshot、snapshot 数量
+- 当前 snapshot：manifest 数量、数据 / 删除文件数量、记录数、字节数、小文件数量与占比
+  （aggregate_snapshot_stats，并发解析 manifest）
+
+build_table_report 是模块级函数，可以直接提交到进程池。
+"""
+from __future__ import annotations
+
+import time
+from typing import Any, Dict, Optional
+
+from app.services.filesystem import metadata_dir_of
+from app.services.iceberg_parser import (
+    extract_table_metadata_info,
+    latest_metadata_file,
+    scan_metadata_directory,
+)
+from app.services.json_utils import parse_json_file
+from app.services.snapshot_stats import aggregate_snapshot_stats
+
+# 报告中保留的当前 snapshot 统计字段
+_TOTALS_FIELDS = (
+    "data_files",
+    "delete_files",
+    "position_delete_files",
+    "equality_delete_files",
+    "records",
+    "delete_records",
+    "data_bytes",
+    "delete_bytes",
+    "total_bytes",
+    "small_data_files",
+    "small_file_ratio",
+    "partitions_count",
+)
+
+
+def build_table_report(table_root: str, small_file_bytes: Optional[int] = None,
+                       max_workers: Optional[int] = None) -> Dict[str, Any]:
+    """
+    生成单个表的报告
+
+    Args:
+        table_root: 表根目录（包含 metadata/ 子目录）或 metadata 目录本身
+        small_file_bytes: 小文件阈值（默认 SMALL_FILE_BYTES）
+        max_workers: 解析 manifest 的线程数
+
+    Returns:
+        dict: {"success", "error", "table_root", ...}；当前 snapshot 的部分 manifest 解析失败时
+        success 仍为 True，complete=False 并在 manifests_failed 中列出
+    """
+    started = time.perf_counter()
+    report: Dict[str, Any] = {"success": False, "error": None, "table_root": table_root}
+
+    def done(error: Optional[str] = None) -> Dict[str, Any]:
+        report["success"] = error is None
+        report["error"] = error
+        report["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 3)
+        return report
+
+    metadata_dir = metadata_dir_of(table_root)
+    scan = scan_metadata_directory(metadata_dir, mode="lazy")
+    if not scan["success"]:
+        return done(scan["error"])
+
+    files = scan["files"]
+    report["metadata_dir"] = metadata_dir
+    report["metadata_dir_bytes"] = sum(f["size"] for group in files.values() for f in group)
+    report["metadata_dir_files"] = {category: len(group) for category, group in files.items()}
+
+    # 按版本号选最新的 metadata.json（同时支持 v<N>.metadata.json 与 <N>-<uuid>.metadata.json）
+    metadata_path = latest_metadata_file(metadata_dir)
+    if not metadata_path:
+        return done("metadata 目录中没有 *.metadata.json")
+    report["metadata_path"] = metadata_path
+    try:
+        metadata_data = parse_json_file(metadata_path)
+    except Exception as e:
+        return done(f"解析 metadata 文件失败: {e}")
+
+    info = extract_table_metadata_info(metadata_data)
+    report.update({
+        "table_uuid": info["table_uuid"],
+        "location": info["location"],
+        "format_version": info["format_version"],
+        "current_snapshot_id": info["current_snapshot_id"],
+        "snapshot_count": len(info["snapshots"] or []),
+    })
+
+    if info["current_snapshot_id"] in (None, -1):
+        # 空表：没有当前 snapshot
+        report.update({"manifest_count": 0, "complete": True, **{k: 0 for k in _TOTALS_FIELDS}})
+        report["small_file_ratio"] = 0.0
+        return done()
+
+    stats = aggregate_snapshot_stats(
+        metadata_data, info["current_snapshot_id"], max_workers=max_workers,
+        small_file_bytes=small_file_bytes,
+    )
+    if not stats["success"]:
+        return done(stats["error"])
+
+    totals = stats["totals"]
+    report["manifest_count"] = stats["manifests_total"]
+    report.update({k: totals[k] for k in _TOTALS_FIELDS})
+    report["complete"] = stats["complete"]
+    report["manifests_failed"] = stats["manifests_failed"]
+    return done()
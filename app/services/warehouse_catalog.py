@@ -0,0 +1,276 @@
+"""仓库（warehouse）目录下的表发现与目录缓存
+
+从仓库根目录开始按层并发遍历子目录，包含 metadata/*.metadata.json 的目录视为一张 Iceberg 表
+（不再进入表目录内部）。每张表只读取最新版本 metadata.json 的表头（read_metadata_header），
+得到 location、格式版本、当前 snapshot 等，并统计 metadata 目录的文件数与大小。
+
+结果按仓库根目录缓存为目录（catalog）：
+- CATALOG_TTL_SECONDS 内的请求直接分页返回缓存结果
+- 过期或 refresh=True 时重新遍历目录；最新 metadata.json 没有变化（文件名、size、mtime 相同）的表
+  沿用上次的表头，不重新读取
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config import CATALOG_MAX_DEPTH, CATALOG_MAX_ROOTS, CATALOG_TTL_SECONDS, FANOUT_MAX_WORKERS
+from app.services.filesystem import is_remote
+from app.services.iceberg_parser import _classify_metadata_file, metadata_version_number
+from app.services.metadata_stream import read_metadata_header
+from app.services.profiler import bind
+
+# 表目录列表的排序字段
+SORT_KEYS = ("name", "metadata_bytes", "last_updated_ms", "format_version")
+
+
+def _list_dir(path: str) -> Tuple[List[str], Optional[Dict[str, Any]]]:
+    """
+    列出一个目录：是表目录时返回 ([], metadata 目录信息)，否则返回 (子目录列表, None)
+
+    隐藏目录（. 开头）不进入，不跟随符号链接，避免循环。
+    """
+    subdirs: List[str] = []
+    metadata_dir = None
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                if entry.name.startswith(".") or not entry.is_dir(follow_symlinks=False):
+                    continue
+                if entry.name == "metadata":
+                    metadata_dir = entry.path
+                subdirs.append(entry.path)
+    except OSError:
+        return [], None
+    if metadata_dir is not None:
+        info = _scan_metadata_dir(metadata_dir)
+        if info is not None:
+            return [], info
+    return subdirs, None
+
+
+def _scan_metadata_dir(metadata_dir: str) -> Optional[Dict[str, Any]]:
+    """metadata 目录的文件数、总大小与最新 metadata.json；没有 metadata.json 时返回 None"""
+    files = 0
+    total = 0
+    latest: Optional[Tuple[int, str, int, int]] = None
+    fallback: Optional[Tuple[int, str, int, int]] = None
+    try:
+        with os.scandir(metadata_dir) as it:
+            for entry in it:
+                if not entry.is_file():
+                    continue
+                st = entry.stat()
+                files += 1
+                total += st.st_size
+                if _classify_metadata_file(entry.name) != "metadata_files":
+                    continue
+                candidate = (metadata_version_number(entry.name), entry.name, st.st_size, st.st_mtime_ns)
+                # 无法解析版本号的文件只在没有其他版本时使用（与 latest_metadata_file 一致）
+                if candidate[0] == 999999:
+                    fallback = max(fallback, candidate) if fallback else candidate
+                elif latest is None or candidate[:2] > latest[:2]:
+                    latest = candidate
+    except OSError:
+        return None
+    latest = latest or fallback
+    if latest is None:
+        return None
+    return {
+        "metadata_dir": metadata_dir,
+        "metadata_files": files,
+        "metadata_bytes": total,
+        "latest_metadata": os.path.join(metadata_dir, latest[1]),
+        "latest_version": None if latest[0] == 999999 else latest[0],
+        "latest_size": latest[2],
+        "latest_mtime_ns": latest[3],
+    }
+
+
+def find_tables(warehouse_root: str, max_depth: int = CATALOG_MAX_DEPTH,
+                max_workers: Optional[int] = None) -> Tuple[List[Tuple[str, Dict[str, Any]]], int]:
+    """
+    按层并发遍历仓库目录，返回 ([(表根目录, metadata 目录信息)], 遍历的目录数)
+
+    max_depth 为表根目录相对仓库根目录的最大深度（仓库根目录本身为 0）。
+    """
+    tables: List[Tuple[str, Dict[str, Any]]] = []
+    frontier = [warehouse_root]
+    visited = 0
+    with ThreadPoolExecutor(max_workers=max_workers or FANOUT_MAX_WORKERS) as pool:
+        for depth in range(max_depth + 1):
+            if not frontier:
+                break
+            visited += len(frontier)
+            next_frontier: List[str] = []
+            for path, (subdirs, info) in zip(frontier, pool.map(bind(_list_dir), frontier)):
+                if info is not None:
+                    tables.append((path, info))
+                elif depth < max_depth:
+                    next_frontier.extend(subdirs)
+            frontier = next_frontier
+    tables.sort(key=lambda t: t[0])
+    return tables, visited
+
+
+def _table_entry(warehouse_root: str, table_root: str, info: Dict[str, Any]) -> Dict[str, Any]:
+    """读取最新 metadata.json 的表头，组成目录中的一条记录"""
+    entry: Dict[str, Any] = {
+        "name": os.path.relpath(table_root, warehouse_root).replace(os.sep, "/"),
+        "table_root": table_root,
+        **{k: v for k, v in info.items() if k != "latest_mtime_ns"},
+        "table_uuid": None,
+        "location": None,
+        "format_version": None,
+        "current_snapshot_id": None,
+        "last_updated_ms": None,
+        "error": None,
+    }
+    try:
+        header = read_metadata_header(info["latest_metadata"])["header"]
+    except Exception as e:
+        entry["error"] = f"读取表头失败: {e}"
+        return entry
+    entry.update({
+        "table_uuid": header.get("table-uuid"),
+        "location": header.get("location"),
+        "format_version": header.get("format-version"),
+        "current_snapshot_id": header.get("current-snapshot-id"),
+        "last_updated_ms": header.get("last-updated-ms"),
+    })
+    return entry
+
+
+class WarehouseCatalog:
+    """单个仓库根目录的表目录缓存"""
+
+    def __init__(self, warehouse_root: str):
+        self.warehouse_root = warehouse_root
+        self.tables: List[Dict[str, Any]] = []
+        # 表根目录 -> (最新 metadata 的 (路径, size, mtime), 记录)，用于刷新时跳过未变化的表
+        self._entries: Dict[str, Tuple[Tuple[str, int, int], Dict[str, Any]]] = {}
+        self.refreshed_at = 0.0
+        self.stats: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def is_stale(self) -> bool:
+        return not self.refreshed_at or time.time() - self.refreshed_at > CATALOG_TTL_SECONDS
+
+    def refresh(self, max_workers: Optional[int] = None, force: bool = True) -> bool:
+        """
+        重新遍历仓库目录，返回是否实际执行了遍历
+
+        force=False 时拿到锁后再检查一次是否过期：并发请求在锁上排队期间，
+        前一个请求可能已经刷新完成，此时直接复用结果
+        """
+        with self._lock:
+            if not force and not self.is_stale():
+                return False
+            started = time.perf_counter()
+            found, visited = find_tables(self.warehouse_root, max_workers=max_workers)
+            listed = time.perf_counter()
+
+            entries: Dict[str, Tuple[Tuple[str, int, int], Dict[str, Any]]] = {}
+            to_load: List[Tuple[str, Dict[str, Any], Tuple[str, int, int]]] = []
+            for table_root, info in found:
+                signature = (info["latest_metadata"], info["latest_size"], info["latest_mtime_ns"])
+                cached = self._entries.get(table_root)
+                if cached is not None and cached[0] == signature:
+                    # 表头未变化，只更新 metadata 目录的统计
+                    entry = dict(cached[1])
+                    entry["metadata_files"] = info["metadata_files"]
+                    entry["metadata_bytes"] = info["metadata_bytes"]
+                    entries[table_root] = (signature, entry)
+                else:
+                    to_load.append((table_root, info, signature))
+
+            if to_load:
+                load = bind(lambda item: _table_entry(self.warehouse_root, item[0], item[1]))
+                with ThreadPoolExecutor(max_workers=max_workers or FANOUT_MAX_WORKERS) as pool:
+                    for item, entry in zip(to_load, pool.map(load, to_load)):
+                        entries[item[0]] = (item[2], entry)
+
+            self._entries = entries
+            self.tables = [entries[root][1] for root, _ in found]
+            self.refreshed_at = time.time()
+            self.stats = {
+                "dirs_visited": visited,
+                "tables": len(self.tables),
+                "headers_read": len(to_load),
+                "errors": sum(1 for t in self.tables if t["error"]),
+                "timing": {
+                    "walk_ms": round((listed - started) * 1000, 3),
+                    "headers_ms": round((time.perf_counter() - listed) * 1000, 3),
+                },
+            }
+            return True
+
+
+_CATALOGS: "OrderedDict[str, WarehouseCatalog]" = OrderedDict()
+_CATALOGS_LOCK = threading.Lock()
+
+
+def get_catalog(warehouse_root: str) -> WarehouseCatalog:
+    """获取（或创建）仓库的目录缓存；超过 CATALOG_MAX_ROOTS 时淘汰最久未使用的仓库"""
+    key = os.path.realpath(warehouse_root)
+    with _CATALOGS_LOCK:
+        catalog = _CATALOGS.get(key)
+        if catalog is None:
+            catalog = _CATALOGS[key] = WarehouseCatalog(key)
+            while len(_CATALOGS) > CATALOG_MAX_ROOTS:
+                _CATALOGS.popitem(last=False)
+        else:
+            _CATALOGS.move_to_end(key)
+        return catalog
+
+
+def list_tables(warehouse_root: str, offset: int = 0, limit: int = 100, query: Optional[str] = None,
+                sort: str = "name", descending: bool = False, refresh: bool = False) -> Dict[str, Any]:
+    """
+    分页列出仓库中的表
+
+    Args:
+        query: 按表名（相对仓库根目录的路径）过滤，不区分大小写的子串匹配
+        sort: 排序字段，见 SORT_KEYS
+        refresh: 忽略缓存有效期，重新遍历仓库目录
+
+    Returns:
+        dict: tables、total、offset、limit、has_more、refreshed_at、stats
+    """
+    if is_remote(warehouse_root):
+        raise ValueError(f"仓库目录发现只支持本地路径: {warehouse_root}")
+    if not os.path.isdir(warehouse_root):
+        raise FileNotFoundError(f"目录不存在: {warehouse_root}")
+    if sort not in SORT_KEYS:
+        raise ValueError(f"不支持的排序字段: {sort}（可选: {', '.join(SORT_KEYS)}）")
+
+    catalog = get_catalog(warehouse_root)
+    refreshed = False
+    if refresh or catalog.is_stale():
+        refreshed = catalog.refresh(force=refresh)
+
+    tables = catalog.tables
+    if query:
+        needle = query.lower()
+        tables = [t for t in tables if needle in t["name"].lower()]
+    if sort != "name" or descending:
+        # None 排在最后
+        present = [t for t in tables if t.get(sort) is not None]
+        missing = [t for t in tables if t.get(sort) is None]
+        tables = sorted(present, key=lambda t: t[sort], reverse=descending) + missing
+    total = len(tables)
+    return {
+        "warehouse_root": catalog.warehouse_root,
+        "tables": tables[offset:offset + limit],
+        "total": total,
+        "offset": offset,
+        "limit": limit,
+        "has_more": offset + limit < total,
+        "refreshed": refreshed,
+        "refreshed_at": int(catalog.refreshed_at * 1000),
+        "stats": catalog.stats,
+    }
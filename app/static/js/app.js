@@ -819,7 +819,7 @@ async function loadFile(filePath, fileType, fileName) {
 
   try {
     const endpoint = fileType === 'avro' ? '/api/avro' : '/api/json';
-    const response = await fetch(`${endpoint}?file_path=${encodeURIComponent(filePath)}&formatted=true`);
+    const response = await fetch(`${endpoint}?file_path=${encodeURIComponent(filePath)}`);
     const result = await response.json();
 
     if (!result.success) {
@@ -0,0 +1,431 @@
+"""基准测试：在不同规模的合成表上测量各个服务函数与 API 接口
+
+用法:
+    python scripts/bench.py                              # small + medium，结果写入 bench_results/
+    python scripts/bench.py --scales small,medium,large --repeats 5
+    python scripts/bench.py --only parse_avro_file,/api/avro
+    python scripts/bench.py --compare bench_results/bench-20240101-000000.json
+
+- 合成表由 scripts/gen_fixture.py 生成，按规模缓存在 --fixtures-dir 中，参数不变时复用
+- 每个用例在独立的子进程中运行，记录耗时（min / median / mean / max）、吞吐量以及峰值 RSS
+- 每次运行前清空解析缓存，测的是冷启动（首次打开）的耗时
+- --compare 与之前的结果对比，median 变慢超过 --threshold 倍的用例视为回归，退出码为 1
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+ROOT = Path(__file__).resolve().parents[1]
+SCRIPTS = Path(__file__).resolve().parent
+
+SCALES: Dict[str, Dict[str, int]] = {
+    "small": {"snapshots": 10, "manifests_per_snapshot": 1, "entries_per_manifest": 100, "data_files": 5,
+              "rows_per_file": 1000},
+    "medium": {"snapshots": 50, "manifests_per_snapshot": 2, "entries_per_manifest": 500, "data_files": 10,
+               "rows_per_file": 10000},
+    "large": {"snapshots": 200, "manifests_per_snapshot": 2, "entries_per_manifest": 1000, "data_files": 20,
+              "rows_per_file": 50000},
+}
+
+
+# ---------------------------------------------------------------------------
+# 合成表
+# ---------------------------------------------------------------------------
+
+def prepare_fixture(fixtures_dir: Path, scale: str) -> Dict[str, Any]:
+    """生成（或复用）指定规模的合成表，返回用例需要的路径信息"""
+    sys.path.insert(0, str(SCRIPTS))
+    from gen_fixture import generate_table
+
+    params = dict(SCALES[scale], delete_every=10)
+    root = fixtures_dir / scale
+    marker = root / "fixture.json"
+    if marker.exists():
+        cached = json.loads(marker.read_text())
+        if cached.get("params") == params:
+            return cached
+    if root.exists():
+        shutil.rmtree(root)
+    started = time.perf_counter()
+    result = generate_table(root, **params)
+
+    import fastavro
+
+    manifests = sorted(Path(result["metadata_dir"]).glob("*-m0.avro"), key=lambda p: p.stat().st_size)
+    latest = json.loads(Path(result["latest_metadata"]).read_text())
+    snapshots = latest["snapshots"]
+    with manifests[-1].open("rb") as f:
+        manifest_entries = sum(1 for _ in fastavro.reader(f))
+    fixture = {
+        "params": params,
+        "scale": scale,
+        "root": result["root"],
+        "metadata_dir": result["metadata_dir"],
+        "latest_metadata": result["latest_metadata"],
+        "manifest": str(manifests[-1]),
+        "manifest_entries": manifest_entries,
+        "manifest_list": snapshots[-1]["manifest-list"].replace("file:", "", 1),
+        "manifests_total": result["manifests"],
+        "entries_total": result["entries"],
+        "snapshots_total": len(snapshots),
+        "current_snapshot_id": snapshots[-1]["snapshot-id"],
+        "first_snapshot_id": snapshots[0]["snapshot-id"],
+        "data_file": result["data_files"][0],
+        "data_file_rows": params["rows_per_file"],
+        "delete_file": result["delete_files"][0] if result["delete_files"] else None,
+        "generate_seconds": round(time.perf_counter() - started, 3),
+    }
+    marker.write_text(json.dumps(fixture, indent=2))
+    return fixture
+
+
+# ---------------------------------------------------------------------------
+# 用例
+# ---------------------------------------------------------------------------
+
+# 用例: name → (setup(fixture) -> (callable, items))，items 为一次调用处理的条目数（用于计算吞吐量）
+Case = Callable[[Dict[str, Any]], Tuple[Callable[[], Any], Optional[int]]]
+
+
+def _service_cases() -> Dict[str, Case]:
+    from app.services import metadata_index
+    from app.services.column_metrics import read_manifest_metrics
+    from app.services.iceberg_parser import (
+        extract_manifest_info,
+        parse_avro_file,
+        read_parquet_metadata,
+        read_parquet_rows,
+        scan_metadata_directory,
+    )
+    from app.services.metadata_stream import read_metadata_array, read_metadata_header
+    from app.services.metadata_timeline import build_metadata_timeline
+    from app.services.snapshot_diff import diff_snapshots
+    from app.services.snapshot_stats import aggregate_snapshot_stats
+    from app.services.json_utils import parse_json_file
+
+    def scan(fx):
+        return lambda: scan_metadata_directory(fx["metadata_dir"]), len(os.listdir(fx["metadata_dir"]))
+
+    def parse_manifest(fx):
+        return lambda: parse_avro_file(fx["manifest"]), fx["manifest_entries"]
+
+    def parse_manifest_list(fx):
+        return lambda: parse_avro_file(fx["manifest_list"]), fx["manifests_total"]
+
+    def manifest_info(fx):
+        data = parse_avro_file(fx["manifest"])["data"]
+        return lambda: extract_manifest_info(data), fx["manifest_entries"]
+
+    def parquet_rows(fx):
+        offset = fx["data_file_rows"] // 2
+        return lambda: read_parquet_rows(fx["data_file"], limit=100, offset=offset), 100
+
+    def parquet_metadata(fx):
+        return lambda: read_parquet_metadata(fx["data_file"]), None
+
+    def metadata_header(fx):
+        return lambda: read_metadata_header(fx["latest_metadata"]), None
+
+    def metadata_page(fx):
+        return lambda: read_metadata_array(fx["latest_metadata"], "snapshots", 0, 100, reverse=True), 100
+
+    def parse_metadata_json(fx):
+        return lambda: parse_json_file(fx["latest_metadata"]), fx["snapshots_total"]
+
+    def snapshot_stats(fx):
+        metadata = parse_json_file(fx["latest_metadata"])
+        return lambda: aggregate_snapshot_stats(metadata), fx["entries_total"]
+
+    def snapshot_diff(fx):
+        metadata = parse_json_file(fx["latest_metadata"])
+        return lambda: diff_snapshots(metadata), None
+
+    def timeline(fx):
+        return lambda: build_metadata_timeline(fx["metadata_dir"]), None
+
+    def manifest_metrics(fx):
+        return lambda: read_manifest_metrics(fx["manifest"]), fx["manifest_entries"]
+
+    def index_build(fx):
+        def run():
+            with tempfile.TemporaryDirectory() as tmp:
+                metadata_index.METADATA_INDEX_DIR = tmp
+                return metadata_index.update_index(fx["metadata_dir"])
+        return run, fx["entries_total"]
+
+    return {
+        "scan_metadata_directory": scan,
+        "parse_avro_file.manifest": parse_manifest,
+        "parse_avro_file.manifest_list": parse_manifest_list,
+        "extract_manifest_info": manifest_info,
+        "read_parquet_rows": parquet_rows,
+        "read_parquet_metadata": parquet_metadata,
+        "parse_json_file.metadata": parse_metadata_json,
+        "read_metadata_header": metadata_header,
+        "read_metadata_array": metadata_page,
+        "aggregate_snapshot_stats": snapshot_stats,
+        "diff_snapshots": snapshot_diff,
+        "build_metadata_timeline": timeline,
+        "read_manifest_metrics": manifest_metrics,
+        "update_index": index_build,
+    }
+
+
+def _route_params(fx: Dict[str, Any]) -> Dict[str, Tuple[str, Dict[str, Any], Optional[int]]]:
+    """每个 API 接口的请求参数: path → (method, params, items)"""
+    meta = fx["latest_metadata"]
+    return {
+        "/api/list-dir": ("get", {"path": fx["root"]}, None),
+        "/api/snapshot-manifests": ("get", {"file_path": fx["manifest_list"]}, fx["manifests_total"]),
+        "/api/avro": ("get", {"file_path": fx["manifest"]}, fx["manifest_entries"]),
+        "/api/json": ("get", {"file_path": meta}, fx["snapshots_total"]),
+        "/api/metadata-info": ("get", {"file_path": meta}, None),
+        "/api/cache-stats": ("get", {}, None),
+        "/api/executor-stats": ("get", {}, None),
+        "/api/metadata/info": ("get", {"file_path": meta}, None),
+        "/api/metadata/header": ("get", {"file_path": meta}, None),
+        "/api/metadata/entries": ("get", {"file_path": meta, "reverse": True}, 100),
+        "/api/metadata/view": ("get", {"file_path": meta}, fx["snapshots_total"]),
+        "/api/metadata/current-manifests": ("get", {"file_path": meta}, fx["manifests_total"]),
+        "/api/metadata/snapshot": ("get", {"file_path": fx["manifest_list"]}, fx["manifests_total"]),
+        "/api/metadata/manifest": ("get", {"file_path": fx["manifest"]}, fx["manifest_entries"]),
+        "/api/metadata/manifest-metrics": ("get", {"file_path": fx["manifest"]}, fx["manifest_entries"]),
+        "/api/metadata/snapshot-stats": ("get", {"file_path": meta}, fx["entries_total"]),
+        "/api/metadata/snapshot-diff": ("get", {"file_path": meta}, None),
+        "/api/metadata/timeline": ("get", {"path": fx["root"]}, None),
+        "/api/preview/datafile": ("get", {"file_path": fx["data_file"], "offset": fx["data_file_rows"] // 2}, 100),
+        "/api/index/build": ("post", {"path": fx["metadata_dir"]}, None),
+        "/api/index/summary": ("get", {"path": fx["metadata_dir"]}, None),
+        "/api/index/snapshots": ("get", {"path": fx["metadata_dir"]}, None),
+        "/api/index/files": ("get", {"path": fx["metadata_dir"]}, 100),
+        "/api/index/partitions": ("get", {"path": fx["metadata_dir"]}, None),
+        "/api/index/file": ("get", {"path": fx["metadata_dir"], "file_path": f"file:{fx['data_file']}"}, None),
+    }
+
+
+def _api_paths() -> List[str]:
+    from app.main import app
+
+    return sorted(p for p in app.openapi()["paths"] if p.startswith("/api/"))
+
+
+def _route_case(path: str) -> Case:
+    def setup(fx):
+        from fastapi.testclient import TestClient
+        from app.main import app
+
+        # 进入上下文后复用同一个事件循环线程，避免每个请求都重新启动
+        client = TestClient(app).__enter__()
+        if path.startswith("/api/index/") and path != "/api/index/build":
+            client.post("/api/index/build", params={"path": fx["metadata_dir"]}).raise_for_status()
+        method, params, items = _route_params(fx)[path]
+
+        def run():
+            response = client.request(method.upper(), path, params=params, headers={"Accept-Encoding": "gzip"})
+            response.raise_for_status()
+            return response.content
+        return run, items
+    return setup
+
+
+def all_cases() -> Dict[str, Case]:
+    cases = dict(_service_cases())
+    for path in _api_paths():
+        cases[path] = _route_case(path)
+    return cases
+
+
+# ---------------------------------------------------------------------------
+# 运行
+# ---------------------------------------------------------------------------
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 上单位为 KB，macOS 上为字节
+    return round(peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024, 2)
+
+
+def run_case(fixture: Dict[str, Any], name: str, repeats: int, max_seconds: float) -> Dict[str, Any]:
+    """在当前进程中运行单个用例（由子进程调用）"""
+    from app.services.parse_cache import PARSE_CACHE
+
+    result: Dict[str, Any] = {"scale": fixture["scale"], "name": name, "kind": "route" if name.startswith("/") else "service"}
+    if name.startswith("/") and name not in _route_params(fixture):
+        result["skipped"] = "未配置请求参数"
+        return result
+    # 服务函数用例不导入 app.main，峰值 RSS 不包含 Web 框架
+    case = _route_case(name) if name.startswith("/") else _service_cases()[name]
+    try:
+        func, items = case(fixture)
+    except Exception as e:
+        result["error"] = f"setup 失败: {e}"
+        return result
+    result["rss_baseline_mb"] = _peak_rss_mb()
+
+    times: List[float] = []
+    started = time.perf_counter()
+    try:
+        for _ in range(max(1, repeats)):
+            PARSE_CACHE.clear()
+            t0 = time.perf_counter()
+            func()
+            times.append(time.perf_counter() - t0)
+            if time.perf_counter() - started > max_seconds:
+                break
+    except Exception as e:
+        result["error"] = str(e)
+        return result
+
+    median = statistics.median(times)
+    result.update({
+        "repeats": len(times),
+        "times_ms": {
+            "min": round(min(times) * 1000, 3),
+            "median": round(median * 1000, 3),
+            "mean": round(statistics.fmean(times) * 1000, 3),
+            "max": round(max(times) * 1000, 3),
+        },
+        "ops_per_sec": round(1 / median, 3) if median > 0 else None,
+        "items": items,
+        "items_per_sec": round(items / median, 1) if items and median > 0 else None,
+        "peak_rss_mb": _peak_rss_mb(),
+    })
+    return result
+
+
+def _run_isolated(fixture_path: Path, name: str, repeats: int, max_seconds: float, env: Dict[str, str]) -> Dict[str, Any]:
+    cmd = [sys.executable, str(Path(__file__).resolve()), "--run-case", name, "--fixture", str(fixture_path),
+           "--repeats", str(repeats), "--max-seconds", str(max_seconds)]
+    proc = subprocess.run(cmd, capture_output=True, text=True, cwd=str(ROOT), env=env)
+    lines = [line for line in proc.stdout.splitlines() if line.startswith("{")]
+    if proc.returncode != 0 or not lines:
+        fixture = json.loads(fixture_path.read_text())
+        return {"scale": fixture["scale"], "name": name, "error": (proc.stderr or proc.stdout).strip()[-2000:]}
+    return json.loads(lines[-1])
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=str(ROOT), check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def compare_results(old: Dict[str, Any], new: Dict[str, Any], threshold: float) -> List[Dict[str, Any]]:
+    """按 (scale, name) 对比两次结果的 median 耗时，返回变慢超过阈值的用例"""
+    old_index = {(r["scale"], r["name"]): r for r in old.get("results", []) if "times_ms" in r}
+    regressions = []
+    print(f"\n{'scale':<8} {'case':<40} {'old ms':>10} {'new ms':>10} {'ratio':>7}")
+    for r in new.get("results", []):
+        prev = old_index.get((r["scale"], r["name"]))
+        if prev is None or "times_ms" not in r:
+            continue
+        old_ms, new_ms = prev["times_ms"]["median"], r["times_ms"]["median"]
+        ratio = new_ms / old_ms if old_ms else float("inf")
+        flag = "  <-- 回归" if ratio > threshold else ""
+        print(f"{r['scale']:<8} {r['name']:<40} {old_ms:>10.2f} {new_ms:>10.2f} {ratio:>7.2f}{flag}")
+        if ratio > threshold:
+            regressions.append({"scale": r["scale"], "name": r["name"], "old_ms": old_ms, "new_ms": new_ms,
+                                "ratio": round(ratio, 3)})
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Iceberg Metadata Viewer 基准测试")
+    parser.add_argument("--scales", default="small,medium", help=f"规模（逗号分隔）: {', '.join(SCALES)}")
+    parser.add_argument("--only", default="", help="只运行名称包含这些关键字的用例（逗号分隔）")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--max-seconds", type=float, default=30.0, help="单个用例的时间上限（至少运行一次）")
+    parser.add_argument("--fixtures-dir", type=Path, default=Path(tempfile.gettempdir()) / "iceberg_helper_bench")
+    parser.add_argument("--output", type=Path, default=None, help="结果 JSON 路径（默认 bench_results/bench-<时间>.json）")
+    parser.add_argument("--compare", type=Path, default=None, help="与之前的结果 JSON 对比")
+    parser.add_argument("--threshold", type=float, default=1.25, help="median 变慢超过该倍数视为回归")
+    parser.add_argument("--list", action="store_true", help="列出所有用例")
+    parser.add_argument("--run-case", default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--fixture", type=Path, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    sys.path.insert(0, str(ROOT))
+
+    if args.run_case:
+        fixture = json.loads(args.fixture.read_text())
+        print(json.dumps(run_case(fixture, args.run_case, args.repeats, args.max_seconds)))
+        return 0
+
+    names = list(all_cases())
+    if args.list:
+        print("\n".join(names))
+        return 0
+    if args.only:
+        keys = [k.strip() for k in args.only.split(",") if k.strip()]
+        names = [n for n in names if any(k in n for k in keys)]
+
+    scales = [s.strip() for s in args.scales.split(",") if s.strip()]
+    unknown = [s for s in scales if s not in SCALES]
+    if unknown:
+        parser.error(f"未知规模: {', '.join(unknown)}")
+
+    args.fixtures_dir.mkdir(parents=True, exist_ok=True)
+    index_dir = Path(tempfile.mkdtemp(prefix="bench-index-"))
+    env = dict(os.environ, PYTHONPATH=str(ROOT), METADATA_INDEX_DIR=str(index_dir))
+
+    results: List[Dict[str, Any]] = []
+    fixtures: Dict[str, Any] = {}
+    try:
+        for scale in scales:
+            print(f"[bench] 准备 {scale} 规模的合成表 ...", flush=True)
+            fixture = prepare_fixture(args.fixtures_dir, scale)
+            fixtures[scale] = {k: fixture[k] for k in ("params", "manifests_total", "entries_total", "snapshots_total")}
+            fixture_path = Path(fixture["root"]) / "fixture.json"
+            for name in names:
+                result = _run_isolated(fixture_path, name, args.repeats, args.max_seconds, env)
+                results.append(result)
+                if "times_ms" in result:
+                    print(f"[bench] {scale:<7} {name:<40} median {result['times_ms']['median']:>10.2f} ms"
+                          f"  peak RSS {result['peak_rss_mb']:>8.1f} MB", flush=True)
+                else:
+                    print(f"[bench] {scale:<7} {name:<40} {result.get('skipped') or 'ERROR: ' + str(result.get('error'))[:200]}",
+                          flush=True)
+    finally:
+        shutil.rmtree(index_dir, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "repeats": args.repeats,
+        },
+        "scales": fixtures,
+        "results": results,
+    }
+    output = args.output or ROOT / "bench_results" / f"bench-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2, ensure_ascii=False))
+    print(f"[bench] 结果已写入 {output}")
+
+    if args.compare:
+        regressions = compare_results(json.loads(args.compare.read_text()), report, args.threshold)
+        if regressions:
+            print(f"[bench] {len(regressions)} 个用例变慢超过 {args.threshold} 倍")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,459 @@
+"""生成合成的 Iceberg 表（metadata 树 + Parquet 数据文件），用于基准测试与本地调试
+
+用法:
+    python scripts/gen_fixture.py /tmp/bench_table --snapshots 100 --manifests-per-snapshot 2 \\
+        --entries-per-manifest 500 --data-files 20
+
+表结构:
+    id long, name string, ts timestamptz, amount decimal(10, 2), dt string（按 dt identity 分区）
+
+- 每个 snapshot 追加 manifests-per-snapshot 个 manifest，manifest list 包含此前所有 manifest（append 表）
+- 前 data-files 个数据文件真实写出 Parquet，其余 entry 只记录路径
+- delete-every > 0 时每隔若干 snapshot 写一个真实的 position delete 文件（content=1）
+- inherit-ids 时新增 entry 的 snapshot_id / sequence_number 写 null，需要从 manifest list 继承
+- 只保留最后 metadata-versions 个 metadata.json 版本（与 write.metadata.previous-versions-max 类似）
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import struct
+import sys
+import uuid
+from decimal import Decimal
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import fastavro
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+BASE_SNAPSHOT_ID = 3_000_000_000_000_000_000
+BASE_TIMESTAMP_MS = 1_700_000_000_000
+# position delete 文件中 file_path / pos 列的保留字段 id
+POSITION_DELETE_FILE_PATH_ID = 2147483546
+POSITION_DELETE_POS_ID = 2147483545
+
+TABLE_SCHEMA: Dict[str, Any] = {
+    "type": "struct",
+    "schema-id": 0,
+    "fields": [
+        {"id": 1, "name": "id", "required": True, "type": "long"},
+        {"id": 2, "name": "name", "required": False, "type": "string"},
+        {"id": 3, "name": "ts", "required": False, "type": "timestamptz"},
+        {"id": 4, "name": "amount", "required": False, "type": "decimal(10, 2)"},
+        {"id": 5, "name": "dt", "required": False, "type": "string"},
+    ],
+}
+
+PARTITION_SPEC: Dict[str, Any] = {
+    "spec-id": 0,
+    "fields": [{"name": "dt", "transform": "identity", "source-id": 5, "field-id": 1000}],
+}
+
+
+def _map_type(name: str, key_id: int, value_id: int, value_type: str) -> List[Any]:
+    return ["null", {
+        "type": "array",
+        "logicalType": "map",
+        "items": {
+            "type": "record",
+            "name": name,
+            "fields": [
+                {"name": "key", "type": "int", "field-id": key_id},
+                {"name": "value", "type": value_type, "field-id": value_id},
+            ],
+        },
+    }]
+
+
+MANIFEST_ENTRY_SCHEMA: Dict[str, Any] = {
+    "type": "record",
+    "name": "manifest_entry",
+    "fields": [
+        {"name": "status", "type": "int", "field-id": 0},
+        {"name": "snapshot_id", "type": ["null", "long"], "default": None, "field-id": 1},
+        {"name": "sequence_number", "type": ["null", "long"], "default": None, "field-id": 3},
+        {"name": "file_sequence_number", "type": ["null", "long"], "default": None, "field-id": 4},
+        {"name": "data_file", "field-id": 2, "type": {
+            "type": "record",
+            "name": "r2",
+            "fields": [
+                {"name": "content", "type": "int", "field-id": 134},
+                {"name": "file_path", "type": "string", "field-id": 100},
+                {"name": "file_format", "type": "string", "field-id": 101},
+                {"name": "partition", "field-id": 102, "type": {
+                    "type": "record",
+                    "name": "r102",
+                    "fields": [{"name": "dt", "type": ["null", "string"], "default": None, "field-id": 1000}],
+                }},
+                {"name": "record_count", "type": "long", "field-id": 103},
+                {"name": "file_size_in_bytes", "type": "long", "field-id": 104},
+                {"name": "column_sizes", "type": _map_type("k117_v118", 117, 118, "long"), "default": None, "field-id": 108},
+                {"name": "value_counts", "type": _map_type("k119_v120", 119, 120, "long"), "default": None, "field-id": 109},
+                {"name": "null_value_counts", "type": _map_type("k121_v122", 121, 122, "long"), "default": None, "field-id": 110},
+                {"name": "nan_value_counts", "type": _map_type("k138_v139", 138, 139, "long"), "default": None, "field-id": 137},
+                {"name": "lower_bounds", "type": _map_type("k126_v127", 126, 127, "bytes"), "default": None, "field-id": 125},
+                {"name": "upper_bounds", "type": _map_type("k129_v130", 129, 130, "bytes"), "default": None, "field-id": 128},
+                {"name": "key_metadata", "type": ["null", "bytes"], "default": None, "field-id": 131},
+                {"name": "split_offsets", "type": ["null", {"type": "array", "items": "long", "element-id": 133}],
+                 "default": None, "field-id": 132},
+                {"name": "equality_ids", "type": ["null", {"type": "array", "items": "int", "element-id": 136}],
+                 "default": None, "field-id": 135},
+                {"name": "sort_order_id", "type": ["null", "int"], "default": None, "field-id": 140},
+            ],
+        }},
+    ],
+}
+
+MANIFEST_FILE_SCHEMA: Dict[str, Any] = {
+    "type": "record",
+    "name": "manifest_file",
+    "fields": [
+        {"name": "manifest_path", "type": "string", "field-id": 500},
+        {"name": "manifest_length", "type": "long", "field-id": 501},
+        {"name": "partition_spec_id", "type": "int", "field-id": 502},
+        {"name": "content", "type": "int", "field-id": 517},
+        {"name": "sequence_number", "type": "long", "field-id": 515},
+        {"name": "min_sequence_number", "type": "long", "field-id": 516},
+        {"name": "added_snapshot_id", "type": "long", "field-id": 503},
+        {"name": "added_files_count", "type": "int", "field-id": 504},
+        {"name": "existing_files_count", "type": "int", "field-id": 505},
+        {"name": "deleted_files_count", "type": "int", "field-id": 506},
+        {"name": "added_rows_count", "type": "long", "field-id": 512},
+        {"name": "existing_rows_count", "type": "long", "field-id": 513},
+        {"name": "deleted_rows_count", "type": "long", "field-id": 514},
+        {"name": "partitions", "default": None, "field-id": 507, "type": ["null", {
+            "type": "array",
+            "element-id": 508,
+            "items": {
+                "type": "record",
+                "name": "r508",
+                "fields": [
+                    {"name": "contains_null", "type": "boolean", "field-id": 509},
+                    {"name": "contains_nan", "type": ["null", "boolean"], "default": None, "field-id": 518},
+                    {"name": "lower_bound", "type": ["null", "bytes"], "default": None, "field-id": 510},
+                    {"name": "upper_bound", "type": ["null", "bytes"], "default": None, "field-id": 511},
+                ],
+            },
+        }]},
+        {"name": "key_metadata", "type": ["null", "bytes"], "default": None, "field-id": 519},
+    ],
+}
+
+_PARSED_ENTRY_SCHEMA = fastavro.parse_schema(MANIFEST_ENTRY_SCHEMA)
+_PARSED_FILE_SCHEMA = fastavro.parse_schema(MANIFEST_FILE_SCHEMA)
+
+
+def _partition_value(index: int, partitions: int) -> str:
+    return f"2024-{index % partitions // 28 % 12 + 1:02d}-{index % partitions % 28 + 1:02d}"
+
+
+def _decimal_bytes(value: Decimal, scale: int = 2) -> bytes:
+    unscaled = int(value.scaleb(scale))
+    return unscaled.to_bytes(max(1, (unscaled.bit_length() + 8) // 8), "big", signed=True)
+
+
+def _write_data_file(path: Path, first_id: int, rows: int, dt: str, row_group_rows: int) -> int:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    ids = pa.array(range(first_id, first_id + rows), pa.int64())
+    table = pa.table({
+        "id": ids,
+        "name": pa.array([f"name-{i}" for i in range(first_id, first_id + rows)]),
+        "ts": pa.array([(BASE_TIMESTAMP_MS + i) * 1000 for i in range(first_id, first_id + rows)],
+                       pa.timestamp("us", tz="UTC")),
+        "amount": pa.array([Decimal(i % 100000) / 100 for i in range(first_id, first_id + rows)], pa.decimal128(10, 2)),
+        "dt": pa.array([dt] * rows),
+    })
+    pq.write_table(table, path, row_group_size=row_group_rows)
+    return path.stat().st_size
+
+
+def _write_position_deletes(path: Path, data_file_path: str, positions: List[int]) -> int:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    table = pa.table({
+        "file_path": pa.array([data_file_path] * len(positions)),
+        "pos": pa.array(positions, pa.int64()),
+    })
+    pq.write_table(table, path)
+    return path.stat().st_size
+
+
+def _data_entry(snapshot_id: int, seq: int, file_path: str, dt: str, first_id: int, rows: int,
+                size: int, content: int = 0, deleted_file_path: Optional[str] = None,
+                deleted_positions: Optional[List[int]] = None) -> Dict[str, Any]:
+    last_id = first_id + rows - 1
+    amount_lo = Decimal(first_id % 100000) / 100
+    amount_hi = Decimal(last_id % 100000) / 100
+    if content:
+        metrics: Dict[str, Any] = {}
+        if deleted_file_path and deleted_positions:
+            # 与 Java 写入端一致：position delete 记录 file_path / pos 两列的 bounds
+            metrics = {
+                "lower_bounds": [
+                    {"key": POSITION_DELETE_FILE_PATH_ID, "value": deleted_file_path.encode()},
+                    {"key": POSITION_DELETE_POS_ID, "value": struct.pack("<q", min(deleted_positions))},
+                ],
+                "upper_bounds": [
+                    {"key": POSITION_DELETE_FILE_PATH_ID, "value": deleted_file_path.encode()},
+                    {"key": POSITION_DELETE_POS_ID, "value": struct.pack("<q", max(deleted_positions))},
+                ],
+            }
+    else:
+        metrics = {
+            "column_sizes": [{"key": k, "value": size // 5} for k in range(1, 6)],
+            "value_counts": [{"key": k, "value": rows} for k in range(1, 6)],
+            "null_value_counts": [{"key": k, "value": 0} for k in range(1, 6)],
+            "nan_value_counts": [],
+            "lower_bounds": [
+                {"key": 1, "value": struct.pack("<q", first_id)},
+                {"key": 2, "value": f"name-{first_id}".encode()},
+                {"key": 3, "value": struct.pack("<q", (BASE_TIMESTAMP_MS + first_id) * 1000)},
+                {"key": 4, "value": _decimal_bytes(min(amount_lo, amount_hi))},
+                {"key": 5, "value": dt.encode()},
+            ],
+            "upper_bounds": [
+                {"key": 1, "value": struct.pack("<q", last_id)},
+                {"key": 2, "value": f"name-{last_id}".encode()},
+                {"key": 3, "value": struct.pack("<q", (BASE_TIMESTAMP_MS + last_id) * 1000)},
+                {"key": 4, "value": _decimal_bytes(max(amount_lo, amount_hi))},
+                {"key": 5, "value": dt.encode()},
+            ],
+        }
+    return {
+        "status": 1,
+        "snapshot_id": snapshot_id,
+        "sequence_number": seq,
+        "file_sequence_number": seq,
+        "data_file": {
+            "content": content,
+            "file_path": file_path,
+            "file_format": "PARQUET",
+            "partition": {"dt": dt},
+            "record_count": rows,
+            "file_size_in_bytes": size,
+            "split_offsets": [4] if not content else None,
+            "sort_order_id": 0 if not content else None,
+            **metrics,
+        },
+    }
+
+
+def _write_manifest(path: Path, entries: List[Dict[str, Any]], content: int) -> int:
+    with path.open("wb") as f:
+        fastavro.writer(f, _PARSED_ENTRY_SCHEMA, entries, codec="deflate", metadata={
+            "schema": json.dumps(TABLE_SCHEMA),
+            "schema-id": "0",
+            "partition-spec": json.dumps(PARTITION_SPEC["fields"]),
+            "partition-spec-id": "0",
+            "format-version": "2",
+            "content": "deletes" if content else "data",
+        })
+    return path.stat().st_size
+
+
+def _maybe_inherit(entries: List[Dict[str, Any]], inherit_ids: bool) -> List[Dict[str, Any]]:
+    # 与追加 manifest（fast append）一致：新增 entry 不写 snapshot_id / sequence number
+    if not inherit_ids:
+        return entries
+    return [
+        {**e, "snapshot_id": None, "sequence_number": None, "file_sequence_number": None} if e["status"] == 1 else e
+        for e in entries
+    ]
+
+
+def _manifest_file_record(path: Path, length: int, snapshot_id: int, seq: int, entries: List[Dict[str, Any]],
+                          content: int) -> Dict[str, Any]:
+    dts = sorted({e["data_file"]["partition"]["dt"] for e in entries})
+    return {
+        "manifest_path": f"file:{path}",
+        "manifest_length": length,
+        "partition_spec_id": 0,
+        "content": content,
+        "sequence_number": seq,
+        "min_sequence_number": seq,
+        "added_snapshot_id": snapshot_id,
+        "added_files_count": len(entries),
+        "existing_files_count": 0,
+        "deleted_files_count": 0,
+        "added_rows_count": sum(e["data_file"]["record_count"] for e in entries),
+        "existing_rows_count": 0,
+        "deleted_rows_count": 0,
+        "partitions": [{
+            "contains_null": False,
+            "contains_nan": False,
+            "lower_bound": dts[0].encode() if dts else None,
+            "upper_bound": dts[-1].encode() if dts else None,
+        }],
+        "key_metadata": None,
+    }
+
+
+def generate_table(root: Path, snapshots: int = 10, manifests_per_snapshot: int = 1,
+                   entries_per_manifest: int = 100, data_files: int = 10, rows_per_file: int = 1000,
+                   row_group_rows: int = 250, partitions: int = 10, delete_every: int = 0,
+                   metadata_versions: int = 10, inherit_ids: bool = False) -> Dict[str, Any]:
+    """
+    生成一张合成表，返回生成结果的统计（文件数、条目数、各类文件路径）
+
+    Args:
+        root: 表根目录（会创建 metadata/ 与 data/ 子目录）
+        data_files: 真实写出 Parquet 的数据文件数量，其余 entry 只记录路径
+        inherit_ids: 新增 entry 的 snapshot_id / sequence_number 写 null，由读取端从 manifest list 继承
+    """
+    root = root.resolve()
+    metadata_dir = root / "metadata"
+    data_dir = root / "data"
+    metadata_dir.mkdir(parents=True, exist_ok=True)
+    data_dir.mkdir(parents=True, exist_ok=True)
+
+    table_uuid = str(uuid.uuid4())
+    manifest_records: List[Dict[str, Any]] = []
+    snapshot_objs: List[Dict[str, Any]] = []
+    snapshot_log: List[Dict[str, Any]] = []
+    metadata_log: List[Dict[str, Any]] = []
+    real_files: List[str] = []
+    delete_files: List[str] = []
+    file_index = 0
+    total_entries = 0
+    metadata_files: List[str] = []
+
+    for s in range(snapshots):
+        snapshot_id = BASE_SNAPSHOT_ID + s
+        seq = s + 1
+        added_files = 0
+        added_records = 0
+        for m in range(manifests_per_snapshot):
+            entries = []
+            for _ in range(entries_per_manifest):
+                dt = _partition_value(file_index, partitions)
+                first_id = file_index * rows_per_file
+                path = data_dir / f"dt={dt}" / f"{file_index:08d}-{s}-{m}.parquet"
+                if file_index < data_files:
+                    size = _write_data_file(path, first_id, rows_per_file, dt, row_group_rows)
+                    real_files.append(str(path))
+                else:
+                    size = 4096 + rows_per_file * 16
+                entries.append(_data_entry(snapshot_id, seq, f"file:{path}", dt, first_id, rows_per_file, size))
+                file_index += 1
+            manifest_path = metadata_dir / f"{uuid.uuid4()}-m{m}.avro"
+            length = _write_manifest(manifest_path, _maybe_inherit(entries, inherit_ids), content=0)
+            manifest_records.append(_manifest_file_record(manifest_path, length, snapshot_id, seq, entries, 0))
+            added_files += len(entries)
+            added_records += sum(e["data_file"]["record_count"] for e in entries)
+            total_entries += len(entries)
+
+        if delete_every and (s + 1) % delete_every == 0 and real_files:
+            target = real_files[(s // delete_every) % len(real_files)]
+            target_dt = Path(target).parent.name.split("=", 1)[1]
+            positions = list(range(0, rows_per_file, 7))
+            delete_path = data_dir / f"dt={target_dt}" / f"{uuid.uuid4()}-deletes.parquet"
+            size = _write_position_deletes(delete_path, f"file:{target}", positions)
+            delete_files.append(str(delete_path))
+            entries = [_data_entry(snapshot_id, seq, f"file:{delete_path}", target_dt, 0, len(positions), size,
+                                   content=1, deleted_file_path=f"file:{target}", deleted_positions=positions)]
+            manifest_path = metadata_dir / f"{uuid.uuid4()}-m-deletes.avro"
+            length = _write_manifest(manifest_path, _maybe_inherit(entries, inherit_ids), content=1)
+            manifest_records.append(_manifest_file_record(manifest_path, length, snapshot_id, seq, entries, 1))
+            total_entries += 1
+
+        manifest_list = metadata_dir / f"snap-{snapshot_id}-1-{uuid.uuid4()}.avro"
+        with manifest_list.open("wb") as f:
+            fastavro.writer(f, _PARSED_FILE_SCHEMA, manifest_records, codec="deflate", metadata={
+                "snapshot-id": str(snapshot_id),
+                "parent-snapshot-id": str(snapshot_id - 1) if s else "null",
+                "sequence-number": str(seq),
+                "format-version": "2",
+            })
+
+        timestamp_ms = BASE_TIMESTAMP_MS + s * 60_000
+        snapshot_objs.append({
+            "sequence-number": seq,
+            "snapshot-id": snapshot_id,
+            **({"parent-snapshot-id": snapshot_id - 1} if s else {}),
+            "timestamp-ms": timestamp_ms,
+            "summary": {
+                "operation": "append",
+                "added-data-files": str(added_files),
+                "added-records": str(added_records),
+                "total-data-files": str(file_index),
+                "total-records": str(file_index * rows_per_file),
+            },
+            "manifest-list": f"file:{manifest_list}",
+            "schema-id": 0,
+        })
+        snapshot_log.append({"timestamp-ms": timestamp_ms, "snapshot-id": snapshot_id})
+
+        if s >= snapshots - metadata_versions:
+            metadata = {
+                "format-version": 2,
+                "table-uuid": table_uuid,
+                "location": f"file:{root}",
+                "last-sequence-number": seq,
+                "last-updated-ms": timestamp_ms,
+                "last-column-id": 5,
+                "current-schema-id": 0,
+                "schemas": [TABLE_SCHEMA],
+                "default-spec-id": 0,
+                "partition-specs": [PARTITION_SPEC],
+                "last-partition-id": 1000,
+                "default-sort-order-id": 0,
+                "sort-orders": [{"order-id": 0, "fields": []}],
+                "properties": {"write.format.default": "parquet", "generated-by": "gen_fixture"},
+                "current-snapshot-id": snapshot_id,
+                "refs": {"main": {"snapshot-id": snapshot_id, "type": "branch"}},
+                "snapshots": snapshot_objs,
+                "statistics": [],
+                "snapshot-log": snapshot_log,
+                "metadata-log": metadata_log,
+            }
+            name = f"{s + 1:05d}-{uuid.uuid4()}.metadata.json"
+            (metadata_dir / name).write_text(json.dumps(metadata, indent=2))
+            metadata_files.append(str(metadata_dir / name))
+        else:
+            name = f"{s + 1:05d}-{uuid.uuid4()}.metadata.json"
+        metadata_log.append({"timestamp-ms": timestamp_ms, "metadata-file": f"file:{metadata_dir / name}"})
+        metadata_log[:] = metadata_log[-100:]
+
+    return {
+        "root": str(root),
+        "metadata_dir": str(metadata_dir),
+        "snapshots": snapshots,
+        "manifests": len(manifest_records),
+        "entries": total_entries,
+        "data_files": real_files,
+        "delete_files": delete_files,
+        "metadata_files": metadata_files,
+        "latest_metadata": metadata_files[-1] if metadata_files else None,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="生成合成 Iceberg 表")
+    parser.add_argument("root", type=Path, help="表根目录")
+    parser.add_argument("--snapshots", type=int, default=10)
+    parser.add_argument("--manifests-per-snapshot", type=int, default=1)
+    parser.add_argument("--entries-per-manifest", type=int, default=100)
+    parser.add_argument("--data-files", type=int, default=10, help="真实写出 Parquet 的数据文件数量")
+    parser.add_argument("--rows-per-file", type=int, default=1000)
+    parser.add_argument("--row-group-rows", type=int, default=250)
+    parser.add_argument("--partitions", type=int, default=10)
+    parser.add_argument("--delete-every", type=int, default=0, help="每隔 N 个 snapshot 写一个 position delete 文件")
+    parser.add_argument("--metadata-versions", type=int, default=10, help="保留的 metadata.json 版本数")
+    parser.add_argument("--inherit-ids", action="store_true",
+                        help="新增 entry 的 snapshot_id / sequence_number 写 null（从 manifest list 继承）")
+    args = parser.parse_args(argv)
+
+    if args.snapshots < 1:
+        parser.error("--snapshots 至少为 1")
+    result = generate_table(
+        args.root, args.snapshots, args.manifests_per_snapshot, args.entries_per_manifest, args.data_files,
+        args.rows_per_file, args.row_group_rows, args.partitions, args.delete_every, args.metadata_versions,
+        args.inherit_ids,
+    )
+    print(json.dumps({k: v for k, v in result.items() if not isinstance(v, list)}, indent=2, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,236 @@
+"""本地 S3 兼容替身服务：把本地目录当作对象存储提供，用于测试远程文件系统
+
+用法:
+    python scripts/s3_standin.py /tmp/warehouse --port 9000 [--latency-ms 20]
+    S3_ENDPOINT_URL=http://127.0.0.1:9000 ./scripts/start.sh
+
+- 根目录下的每个子目录是一个 bucket：s3://<bucket>/<key> ↔ <root>/<bucket>/<key>
+- 支持 HEAD / GET（含 Range，返回 206）以及 ListObjectsV2（prefix / delimiter / max-keys / continuation-token）
+- 普通 HTTP 路径 http://127.0.0.1:9000/<bucket>/<key> 同样可读
+- HTTP/1.1 keep-alive；--latency-ms 为每个请求增加固定延迟，模拟对象存储的往返时间
+- 不校验签名；只读
+- 退出时输出请求数与发送的字节数
+
+也可以在测试脚本中启动: server = start_standin(root); ...; server.shutdown()
+"""
+from __future__ import annotations
+
+import argparse
+import email.utils
+import os
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+from xml.sax.saxutils import escape
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class StandinServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], root: str, latency_ms: float = 0.0):
+        super().__init__(address, StandinHandler)
+        self.root = os.path.realpath(root)
+        self.latency = max(0.0, latency_ms) / 1000
+        self.requests = 0
+        self.bytes_sent = 0
+        self.connections = 0
+        self._lock = threading.Lock()
+
+    @property
+    def endpoint(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, nbytes: int) -> None:
+        with self._lock:
+            self.requests += 1
+            self.bytes_sent += nbytes
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: StandinServer
+
+    def setup(self) -> None:
+        super().setup()
+        with self.server._lock:
+            self.server.connections += 1
+
+    def log_message(self, format: str, *args) -> None:  # noqa: A002 - 与基类签名一致
+        pass
+
+    # ---- 路径 ----
+
+    def _split(self) -> Tuple[str, str, dict]:
+        parts = urlsplit(self.path)
+        path = unquote(parts.path).lstrip("/")
+        bucket, _, key = path.partition("/")
+        return bucket, key, parse_qs(parts.query, keep_blank_values=True)
+
+    def _local(self, bucket: str, key: str) -> Optional[str]:
+        local = os.path.realpath(os.path.join(self.server.root, bucket, key))
+        if not local.startswith(self.server.root + os.sep):
+            return None
+        return local
+
+    # ---- 响应 ----
+
+    def _send(self, status: int, body: bytes = b"", headers: Optional[dict] = None, head: bool = False) -> None:
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        self.send_response(status)
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        if "Content-Length" not in (headers or {}):
+            self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if not head and body:
+            self.wfile.write(body)
+        self.server.count(0 if head else len(body))
+
+    def _error(self, status: int, code: str, head: bool = False) -> None:
+        body = f'<?xml version="1.0" encoding="UTF-8"?><Error><Code>{code}</Code></Error>'.encode()
+        self._send(status, body, {"Content-Type": "application/xml"}, head)
+
+    def do_HEAD(self) -> None:
+        self._object(head=True)
+
+    def do_GET(self) -> None:
+        bucket, key, query = self._split()
+        if "list-type" in query and not key:
+            self._list_objects(bucket, query)
+        else:
+            self._object(head=False)
+
+    def _object(self, head: bool) -> None:
+        bucket, key, _ = self._split()
+        local = self._local(bucket, key) if bucket and key else None
+        if local is None or not os.path.isfile(local):
+            self._error(404, "NoSuchKey", head)
+            return
+        st = os.stat(local)
+        size = st.st_size
+        headers = {
+            "Last-Modified": email.utils.formatdate(st.st_mtime, usegmt=True),
+            "ETag": f'"{st.st_mtime_ns:x}-{size:x}"',
+            "Accept-Ranges": "bytes",
+            "Content-Type": "application/octet-stream",
+        }
+        start, end, status = 0, size, 200
+        range_header = self.headers.get("Range")
+        if range_header:
+            match = _RANGE_RE.match(range_header.strip())
+            if not match or (not match.group(1) and not match.group(2)):
+                self._error(416, "InvalidRange", head)
+                return
+            first, last = match.group(1), match.group(2)
+            if first:
+                start = int(first)
+                end = min(size, int(last) + 1) if last else size
+            else:
+                start = max(0, size - int(last))
+            if start >= size:
+                self._error(416, "InvalidRange", head)
+                return
+            status = 206
+            headers["Content-Range"] = f"bytes {start}-{end - 1}/{size}"
+        headers["Content-Length"] = str(end - start)
+        body = b""
+        if not head:
+            with open(local, "rb") as f:
+                f.seek(start)
+                body = f.read(end - start)
+        self._send(status, body, headers, head)
+
+    def _list_objects(self, bucket: str, query: dict) -> None:
+        base = self._local(bucket, "") if bucket else None
+        if not base or not os.path.isdir(base):
+            self._error(404, "NoSuchBucket")
+            return
+        prefix = query.get("prefix", [""])[0]
+        delimiter = query.get("delimiter", [""])[0]
+        max_keys = int(query.get("max-keys", ["1000"])[0])
+        after = query.get("continuation-token", [""])[0] or query.get("start-after", [""])[0]
+
+        keys: List[Tuple[str, os.stat_result]] = []
+        # 只遍历前缀所在的目录，delimiter="/" 时不递归
+        start_dir = os.path.join(base, prefix.rsplit("/", 1)[0]) if "/" in prefix else base
+        for dirpath, dirnames, filenames in os.walk(start_dir):
+            rel_dir = os.path.relpath(dirpath, base).replace(os.sep, "/")
+            rel_dir = "" if rel_dir == "." else rel_dir + "/"
+            for name in filenames:
+                key = rel_dir + name
+                if key.startswith(prefix):
+                    keys.append((key, os.stat(os.path.join(dirpath, name))))
+            if delimiter == "/":
+                for name in dirnames:
+                    key = rel_dir + name + "/"
+                    if key.startswith(prefix):
+                        keys.append((key, None))
+                dirnames[:] = []
+
+        entries: List[Tuple[str, Optional[os.stat_result]]] = []
+        seen_prefixes = set()
+        for key, st in sorted(keys, key=lambda item: item[0]):
+            if delimiter and delimiter in key[len(prefix):]:
+                common = key[:len(prefix) + key[len(prefix):].index(delimiter) + len(delimiter)]
+                if common not in seen_prefixes:
+                    seen_prefixes.add(common)
+                    entries.append((common, None))
+            elif st is not None:
+                entries.append((key, st))
+        entries = [e for e in entries if e[0] > after]
+        page, truncated = entries[:max_keys], len(entries) > max_keys
+
+        parts = ['<?xml version="1.0" encoding="UTF-8"?>',
+                 '<ListBucketResult xmlns="http://s3.amazonaws.com/doc/2006-03-01/">',
+                 f"<Name>{escape(bucket)}</Name><Prefix>{escape(prefix)}</Prefix>",
+                 f"<KeyCount>{len(page)}</KeyCount><MaxKeys>{max_keys}</MaxKeys>",
+                 f"<IsTruncated>{'true' if truncated else 'false'}</IsTruncated>"]
+        if truncated:
+            parts.append(f"<NextContinuationToken>{escape(page[-1][0])}</NextContinuationToken>")
+        for key, st in page:
+            if st is None:
+                parts.append(f"<CommonPrefixes><Prefix>{escape(key)}</Prefix></CommonPrefixes>")
+            else:
+                modified = time.strftime("%Y-%m-%dT%H:%M:%S.000Z", time.gmtime(st.st_mtime))
+                parts.append(f"<Contents><Key>{escape(key)}</Key><LastModified>{modified}</LastModified>"
+                             f"<Size>{st.st_size}</Size></Contents>")
+        parts.append("</ListBucketResult>")
+        self._send(200, "".join(parts).encode("utf-8"), {"Content-Type": "application/xml"})
+
+
+def start_standin(root: str, host: str = "127.0.0.1", port: int = 0, latency_ms: float = 0.0) -> StandinServer:
+    """在后台线程中启动替身服务（port=0 时自动选择端口），返回 server（server.endpoint 为地址）"""
+    server = StandinServer((host, port), root, latency_ms)
+    threading.Thread(target=server.serve_forever, name="s3-standin", daemon=True).start()
+    return server
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="本地 S3 兼容替身服务")
+    parser.add_argument("root", help="根目录（每个子目录是一个 bucket）")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="每个请求增加的延迟（毫秒）")
+    args = parser.parse_args(argv)
+
+    server = StandinServer((args.host, args.port), args.root, args.latency_ms)
+    print(f"S3 替身服务: {server.endpoint}  root={server.root}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"请求数: {server.requests}  发送字节数: {server.bytes_sent}  连接数: {server.connections}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())